@@ -3,33 +3,34 @@
 """
 API Wrapper for Disease Prediction
 Called by Node.js server with symptom text as argument
+
+Thin client of prediction_worker.py: if a worker is listening it answers the
+request, otherwise the model is loaded in-process for this one call. With
+DIAGNOCHAIN_TRACE=1, in-process runs also write one stage-timing trace line
+to stderr; a worker keeps its metrics behind the "metrics" op instead.
+To re-score many stored records at once use bulk_score.py.
 """
 import sys
 import json
 import os
 
-# CRITICAL: Redirect stdout to suppress ALL print statements from imports
-import io
-original_stdout = sys.stdout
-sys.stdout = io.StringIO()
-
 # Set encoding to UTF-8 to prevent Windows console issues
 if sys.platform == 'win32':
     import codecs
     sys.stderr = codecs.getwriter('utf-8')(sys.stderr.buffer, 'strict')
 
-# Suppress TensorFlow warnings
-os.environ['TF_CPP_MIN_LOG_LEVEL'] = '3'
-os.environ['TRANSFORMERS_VERBOSITY'] = 'error'
+from metrics import METRICS, trace_enabled
+from prediction_worker import request_worker
 
-import warnings
-warnings.filterwarnings('ignore')
 
-# Import the predictor (this will trigger initialization messages)
-from train_model import DiseasePredictor
+def predict_in_process(symptoms_text):
+    # No worker running: load the model here (initialization messages are suppressed)
+    import io
+    from prediction_worker import PredictionWorker
+    worker = PredictionWorker(log=io.StringIO())
+    # Straight to the predictor: there is nothing to micro-batch with
+    return worker.predict_batch([symptoms_text])[0]
 
-# Restore stdout AFTER importing
-sys.stdout = original_stdout
 
 def main():
     if len(sys.argv) < 2:
@@ -40,41 +41,24 @@ def main():
     symptoms_text = sys.argv[1]
     
     try:
-        # Initialize predictor (all initialization messages are suppressed)
-        predictor = DiseasePredictor()
-        
-        # Get prediction
-        result = predictor.predict(symptoms_text)
-        
+        response = None
+        if os.environ.get('DIAGNOCHAIN_WORKER', '1') != '0':
+            try:
+                response = request_worker({"op": "predict", "symptoms": symptoms_text})
+            except (OSError, ValueError):
+                response = None
+        if response is None:
+            response = predict_in_process(symptoms_text)
+            if METRICS.enabled and trace_enabled():
+                print(METRICS.trace_line(), file=sys.stderr)
+
         # Check if result is an error
-        if isinstance(result, dict) and 'error' in result:
-            print(json.dumps(result, ensure_ascii=False))
+        if 'error' in response:
+            print(json.dumps({"error": response['error']}, ensure_ascii=False))
             sys.exit(1)
         
-        # Transform response format
-        predictions = []
-        
-        # Add primary diagnosis
-        primary = {
-            "disease": result.get("primary_diagnosis", "Unknown"),
-            "confidence": result.get("confidence", 0) / 100 if isinstance(result.get("confidence"), (int, float)) else 0,
-            "description": result.get("description", "No description available"),
-            "precautions": result.get("precautions", [])
-        }
-        predictions.append(primary)
-        
-        # Add alternatives
-        for alt in result.get("alternatives", []):
-            alt_pred = {
-                "disease": alt.get("disease", "Unknown"),
-                "confidence": alt.get("confidence", 0) / 100 if isinstance(alt.get("confidence"), (int, float)) else 0,
-                "description": predictor.description_list.get(alt.get("disease", ""), "No description available"),
-                "precautions": predictor.precautionDictionary.get(alt.get("disease", ""), [])
-            }
-            predictions.append(alt_pred)
-        
         # Output ONLY JSON (Node.js expects this)
-        print(json.dumps(predictions, ensure_ascii=False))
+        print(json.dumps(response['predictions'], ensure_ascii=False))
         
     except Exception as e:
         error_result = {"error": str(e)}
@@ -82,4 +66,4 @@ def main():
         sys.exit(1)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
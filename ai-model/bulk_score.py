@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Bulk re-scoring of stored symptom texts, e.g. the diagnosis_records history
+after retraining, without one api_predict.py process per record.
+
+Input (a file, or stdin with "-"):
+- JSONL: one object per line with a text field (--text-field, default
+  "symptoms") and optionally an id field (--id-field, default "id")
+- CSV: a header row naming the same columns
+The format follows the file extension unless --format says otherwise.
+
+Output: one JSON line per input record, in input order:
+    {"offset": 0, "id": "abc", "predictions": [...]}   (same list api_predict.py prints)
+    {"offset": 1, "id": "def", "error": "..."}
+"offset" is the record's 0-based position in the input. Records are read
+and scored in --batch-size batches through predict_batch, and each batch is
+written and flushed as soon as it and every batch before it are done, so
+memory stays bounded by --jobs x --batch-size records.
+
+--jobs N forks N scoring processes from the loaded predictor (shared
+copy-on-write, as in worker_pool.py); at most 2N batches are in flight.
+--start-offset skips records; --resume appends to an existing --output and
+starts after the last complete line in it. Progress and the final
+records/second go to stderr.
+
+Usage (from the ai-model folder):
+    python bulk_score.py history.jsonl --output rescored.jsonl --jobs 4
+    python bulk_score.py history.csv --output rescored.jsonl --resume
+    cat history.jsonl | python bulk_score.py - > rescored.jsonl
+"""
+import os
+import gc
+import io
+import sys
+import csv
+import json
+import time
+import argparse
+import itertools
+import contextlib
+from collections import deque
+
+from prediction_worker import format_results, load_predictor
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BATCH_SIZE = 256
+REPORT_INTERVAL = 5.0
+
+# Loaded before the scoring processes fork, so they inherit it
+_predictor = None
+
+
+def read_records(stream, fmt, text_field, id_field):
+    """Yields (id, text, error) per record; error is set for records that could not be read."""
+    if fmt == 'csv':
+        for row in csv.DictReader(stream):
+            text = row.get(text_field)
+            yield row.get(id_field), text, None if text else f"missing '{text_field}'"
+        return
+    for line in stream:
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+            if not isinstance(record, dict):
+                raise ValueError("not a JSON object")
+        except ValueError as e:
+            yield None, None, f"invalid record: {e}"
+            continue
+        text = record.get(text_field)
+        if not isinstance(text, str) or not text.strip():
+            yield record.get(id_field), None, f"missing '{text_field}'"
+        else:
+            yield record.get(id_field), text, None
+
+
+def batches(records, batch_size, start):
+    """[(offset, id, text, error), ...] lists of at most batch_size records from `start` on."""
+    numbered = ((offset,) + record for offset, record in enumerate(records))
+    numbered = itertools.islice(numbered, start, None)
+    while True:
+        batch = list(itertools.islice(numbered, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+def score_batch(batch):
+    """JSON lines for one batch; runs in the scoring processes."""
+    texts = [text for _, _, text, error in batch if error is None]
+    with contextlib.redirect_stdout(io.StringIO()):
+        results = iter(format_results(_predictor, _predictor.predict_batch(texts)) if texts else [])
+
+    lines = []
+    for offset, record_id, _, error in batch:
+        response = {"error": error} if error is not None else next(results)
+        lines.append(json.dumps(dict({"offset": offset, "id": record_id}, **response), ensure_ascii=False))
+    return "\n".join(lines) + "\n"
+
+
+def completed_records(path):
+    """Complete lines in an earlier output file; a partly written last line is cut off."""
+    if not os.path.exists(path):
+        return 0
+    count, end = 0, 0
+    with open(path, 'rb') as f:
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            count += 1
+            end += len(line)
+    if end != os.path.getsize(path):
+        with open(path, 'r+b') as f:
+            f.truncate(end)
+    return count
+
+
+def scored(batch_iter, jobs):
+    """Scored batches in input order, with at most 2 * jobs batches in flight."""
+    if jobs <= 1:
+        for batch in batch_iter:
+            yield len(batch), score_batch(batch)
+        return
+
+    import multiprocessing
+    # The children share the loaded predictor's pages instead of loading their own
+    gc.collect()
+    gc.freeze()
+    with multiprocessing.get_context('fork').Pool(jobs) as pool:
+        window = deque()
+        for batch in batch_iter:
+            window.append((len(batch), pool.apply_async(score_batch, (batch,))))
+            if len(window) >= 2 * jobs:
+                n, result = window.popleft()
+                yield n, result.get()
+        while window:
+            n, result = window.popleft()
+            yield n, result.get()
+
+
+def main():
+    global _predictor
+
+    parser = argparse.ArgumentParser(description="Re-score stored symptom texts in bulk")
+    parser.add_argument('input', help="JSONL or CSV file, or - for stdin")
+    parser.add_argument('--output', '-o', default='-', help="JSONL results file (default stdout)")
+    parser.add_argument('--format', choices=['jsonl', 'csv'], help="input format (default: from the extension)")
+    parser.add_argument('--text-field', default='symptoms')
+    parser.add_argument('--id-field', default='id')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument('--jobs', '-j', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--start-offset', type=int, default=0, help="skip this many input records")
+    parser.add_argument('--resume', action='store_true', help="continue after the records already in --output")
+    args = parser.parse_args()
+
+    if args.resume and args.output == '-':
+        parser.error("--resume needs --output")
+    if not hasattr(os, 'fork'):
+        args.jobs = 1
+    fmt = args.format or ('csv' if args.input.lower().endswith('.csv') else 'jsonl')
+
+    # Paths are resolved before moving to the ai-model folder, where the model lives
+    input_path = args.input if args.input == '-' else os.path.abspath(args.input)
+    output_path = args.output if args.output == '-' else os.path.abspath(args.output)
+    start = args.start_offset
+    if args.resume:
+        start += completed_records(output_path)
+
+    # Keep predictor progress messages off a stdout that may carry results
+    out = sys.stdout if output_path == '-' else open(output_path, 'a' if args.resume else 'w', encoding='utf-8')
+    sys.stdout = sys.stderr
+    os.chdir(SCRIPT_DIR)
+
+    _predictor = load_predictor(sys.stderr)
+
+    stream = sys.stdin if input_path == '-' else open(input_path, encoding='utf-8', newline='')
+    records = read_records(stream, fmt, args.text_field, args.id_field)
+
+    started = last_report = time.perf_counter()
+    done = 0
+    try:
+        for n, lines in scored(batches(records, max(1, args.batch_size), start), max(1, args.jobs)):
+            out.write(lines)
+            out.flush()
+            done += n
+            now = time.perf_counter()
+            if now - last_report >= REPORT_INTERVAL:
+                last_report = now
+                print(f"{done} records, {done / (now - started):.1f} records/s (next offset {start + done})",
+                      file=sys.stderr)
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+        if output_path != '-':
+            out.close()
+
+    elapsed = time.perf_counter() - started
+    print(f"Scored {done} records in {elapsed:.1f} s: {done / elapsed if elapsed else 0:.1f} records/s "
+          f"({args.jobs} jobs, batch size {args.batch_size}, next offset {start + done})",
+          file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+Per-class response data and top-k selection shared by
+DiseasePredictor.predict_batch and server/predict_api.py.
+
+- ResponseTable: (name, description, precautions) per class id, built once
+  when the model and knowledge base are loaded, so assembling a response is
+  array indexing instead of label decoding plus dict lookups per result
+- top_k: the k best columns of every row via np.argpartition, then a sort
+  of those k only
+- kb_name: the class name a symptom_Description.csv / symptom_precaution.csv
+  key belongs to, for keys spelled differently from dataset.csv's label
+"""
+import numpy as np
+
+# Knowledge-base key -> dataset.csv class name, where the two spellings differ
+KB_ALIASES = {
+    'Dimorphic hemorrhoids(piles)': 'Dimorphic hemmorhoids(piles)',
+}
+
+
+def kb_name(key):
+    key = key.strip()
+    return KB_ALIASES.get(key, key)
+
+
+def top_k(scores, k):
+    """(n, k) column indices of the largest scores per row, best first."""
+    k = min(k, scores.shape[1])
+    if k <= 0:
+        return np.zeros((scores.shape[0], 0), dtype=np.intp)
+    part = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    order = np.argsort(-np.take_along_axis(scores, part, axis=1), axis=1, kind='stable')
+    return np.take_along_axis(part, order, axis=1)
+
+
+class ResponseTable:
+    def __init__(self, classes, descriptions, precautions, default_description, default_precautions):
+        self.names = np.array([str(c) for c in classes], dtype=object)
+        self.descriptions = np.array(
+            [descriptions.get(name, default_description) for name in self.names], dtype=object
+        )
+        self.precautions = np.empty(len(self.names), dtype=object)
+        self.precautions[:] = [list(precautions.get(name, default_precautions)) for name in self.names]
+        self.rows = np.empty(len(self.names), dtype=object)
+        self.rows[:] = list(zip(self.names, self.descriptions, self.precautions))
+
+    def __len__(self):
+        return len(self.names)
+
+    def __getitem__(self, class_ids):
+        """(name, description, precautions) for one class id, or an array of them."""
+        return self.rows[class_ids]
@@ -0,0 +1,510 @@
+#!/usr/bin/env python3
+"""
+Inference-only export of the soft-voting ensemble in diagnochain_model.pkl.
+
+The VotingClassifier averages predict_proba of three members; each one is
+compiled into plain arrays and evaluated with NumPy only:
+
+- RandomForest: every tree flattened into shared node arrays
+  (left/right child, feature, threshold, per-node class distribution),
+  traversed for the whole batch and all trees at once; leaves are their
+  own children
+- linear SVC with Platt scaling: one-vs-one weight matrix and intercepts,
+  the sigmoid parameters (probA_/probB_) and libsvm's pairwise coupling
+- MultinomialNB: feature log-probabilities and class log-priors
+
+predict_proba also takes a scipy CSR matrix without densifying it: the linear
+members multiply it directly, and the forest looks features up in its
+sorted (row, column) keys, so cost follows the number of active symptoms.
+
+Artifact layouts:
+- diagnochain_model.arrays/ (default): one raw .npy file per array plus a
+  manifest.json holding cols, classes, member weights and the sha256 of the
+  pickle it came from. Arrays are opened with np.load(mmap_mode='r'), so
+  every worker process on a host shares one copy through the page cache.
+- diagnochain_model.npz: the same arrays in a single file, loaded into memory.
+Both CompiledModel and is_current check every array's shape against the
+classes and columns, so an inconsistent artifact falls back to the pickle.
+
+Usage (from the ai-model folder):
+    python compiled_model.py export     # diagnochain_model.pkl -> diagnochain_model.arrays/
+    python compiled_model.py export --out diagnochain_model.npz
+    python compiled_model.py check      # parity against model.predict_proba on Testing.csv
+"""
+import os
+import sys
+import json
+import shutil
+import hashlib
+import argparse
+
+import numpy as np
+
+# 2: array shapes are checked against the class and column counts
+FORMAT_VERSION = 2
+DEFAULT_MODEL_PATH = "diagnochain_model.pkl"
+DEFAULT_COMPILED_PATH = "diagnochain_model.arrays"
+MANIFEST_NAME = "manifest.json"
+# Stored in the manifest rather than as arrays
+METADATA_KEYS = ('cols', 'classes', 'member_names', 'member_weights', 'format_version')
+
+# libsvm constants used by svm_predict_probability
+MIN_PAIRWISE_PROB = 1e-7
+
+
+def _export_forest(rf):
+    lefts, rights, features, thresholds, values, roots = [], [], [], [], [], []
+    offset = 0
+    for tree in rf.estimators_:
+        t = tree.tree_
+        left = t.children_left.astype(np.int32)
+        right = t.children_right.astype(np.int32)
+        is_leaf = left < 0
+        # Leaves point at themselves, so traversal needs no leaf test
+        own = np.arange(t.node_count, dtype=np.int32) + offset
+        lefts.append(np.where(is_leaf, own, left + offset))
+        rights.append(np.where(is_leaf, own, right + offset))
+        features.append(np.where(is_leaf, 0, t.feature).astype(np.int32))
+        thresholds.append(t.threshold.astype(np.float64))
+
+        # Same normalization as DecisionTreeClassifier.predict_proba
+        value = t.value[:, 0, :].astype(np.float64)
+        normalizer = value.sum(axis=1, keepdims=True)
+        normalizer[normalizer == 0.0] = 1.0
+        values.append(value / normalizer)
+
+        roots.append(offset)
+        offset += t.node_count
+
+    return {
+        'rf_left': np.concatenate(lefts),
+        'rf_right': np.concatenate(rights),
+        'rf_feature': np.concatenate(features),
+        'rf_threshold': np.concatenate(thresholds),
+        'rf_value': np.concatenate(values),
+        'rf_roots': np.array(roots, dtype=np.int32),
+        'rf_max_depth': np.array(max(tree.tree_.max_depth for tree in rf.estimators_), dtype=np.int32),
+    }
+
+
+def _export_svc(svc):
+    if svc.kernel != 'linear' or not svc.probability:
+        raise ValueError("only SVC(kernel='linear', probability=True) can be compiled")
+    return {
+        'svc_coef': np.asarray(svc.coef_.toarray() if hasattr(svc.coef_, 'toarray') else svc.coef_, dtype=np.float64),
+        'svc_intercept': np.asarray(svc.intercept_, dtype=np.float64),
+        'svc_prob_a': np.asarray(svc.probA_, dtype=np.float64),
+        'svc_prob_b': np.asarray(svc.probB_, dtype=np.float64),
+    }
+
+
+def _export_nb(nb):
+    return {
+        'nb_feature_log_prob': np.asarray(nb.feature_log_prob_, dtype=np.float64),
+        'nb_class_log_prior': np.asarray(nb.class_log_prior_, dtype=np.float64),
+    }
+
+
+def check_member_classes(members, n_classes):
+    """
+    Every member must have been fitted on all label-encoded classes 0..n-1;
+    otherwise its probability columns no longer line up with the encoder's
+    disease names.
+    """
+    expected = np.arange(n_classes)
+    for name, member in dict(members).items():
+        classes = np.asarray(member.classes_)
+        if classes.shape != expected.shape or not np.array_equal(classes, expected):
+            missing = np.setdiff1d(expected, classes)
+            raise ValueError(f"ensemble member '{name}' was fitted on {len(classes)} of {n_classes} classes "
+                             f"(missing label indices {missing.tolist()}); its probability columns "
+                             f"would not match the label encoder")
+
+
+def shape_errors(shapes, n_classes, n_features):
+    """
+    Arrays ({name: shape}) whose shape disagrees with the number of classes
+    and columns, e.g. an SVC fitted on fewer classes than the encoder has;
+    empty for a consistent artifact.
+    """
+    n_pairs = n_classes * (n_classes - 1) // 2
+    n_nodes = tuple(shapes.get('rf_left', (-1,)))[0]
+    expected = {
+        'rf_left': (n_nodes,),
+        'rf_right': (n_nodes,),
+        'rf_feature': (n_nodes,),
+        'rf_threshold': (n_nodes,),
+        'rf_value': (n_nodes, n_classes),
+        'svc_coef': (n_pairs, n_features),
+        'svc_intercept': (n_pairs,),
+        'svc_prob_a': (n_pairs,),
+        'svc_prob_b': (n_pairs,),
+        'nb_feature_log_prob': (n_classes, n_features),
+        'nb_class_log_prior': (n_classes,),
+    }
+    errors = []
+    for name, shape in expected.items():
+        if name not in shapes:
+            errors.append(f"{name} is missing")
+        elif tuple(shapes[name]) != shape:
+            errors.append(f"{name} has shape {tuple(shapes[name])}, expected {shape}")
+    return errors
+
+
+def _unfrozen(member):
+    """The fitted estimator inside a FrozenEstimator (see assemble_voting)."""
+    return member.estimator if type(member).__name__ == 'FrozenEstimator' else member
+
+
+def compile_package(package):
+    """Turn the dict saved by DiseasePredictor.save_model into plain arrays."""
+    model = package['model']
+    members = {name: _unfrozen(member) for name, member in model.named_estimators_.items()}
+    if model.voting != 'soft' or set(members) != {'rf', 'svc', 'nb'}:
+        raise ValueError("expected a soft VotingClassifier with rf, svc and nb members")
+    check_member_classes(members, len(package['le'].classes_))
+
+    weights = model.weights if model.weights is not None else [1.0] * len(model.estimators)
+    names = [name for name, _ in model.estimators]
+
+    arrays = {
+        'format_version': np.array(FORMAT_VERSION, dtype=np.int32),
+        'cols': np.array(list(package['cols']), dtype=str),
+        'classes': np.array(package['le'].classes_, dtype=str),
+        'member_names': np.array(names, dtype=str),
+        'member_weights': np.array(weights, dtype=np.float64),
+    }
+    arrays.update(_export_forest(members['rf']))
+    arrays.update(_export_svc(members['svc']))
+    arrays.update(_export_nb(members['nb']))
+    return arrays
+
+
+def model_backend():
+    # DIAGNOCHAIN_MODEL_BACKEND: "compiled" (memory-mapped arrays) or "sklearn" (the pickle)
+    return os.environ.get('DIAGNOCHAIN_MODEL_BACKEND', 'compiled').strip().lower()
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def read_manifest(artifact_dir):
+    with open(os.path.join(artifact_dir, MANIFEST_NAME), encoding='utf-8') as f:
+        return json.load(f)
+
+
+def file_stat(path):
+    st = os.stat(path)
+    return [st.st_mtime_ns, st.st_size]
+
+
+def save_artifact_dir(arrays, out_dir, model_sha256=None, model_stat=None):
+    """
+    Write raw .npy files plus manifest.json, then swap the directory into
+    place. Workers that still map the old files keep reading them until
+    they reload.
+    """
+    parent = os.path.dirname(os.path.abspath(out_dir))
+    tmp_dir = os.path.join(parent, f".{os.path.basename(out_dir)}.tmp-{os.getpid()}")
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    manifest = {
+        'format_version': FORMAT_VERSION,
+        'model_sha256': model_sha256,
+        'model_stat': model_stat,
+        'cols': [str(c) for c in arrays['cols']],
+        'classes': [str(c) for c in arrays['classes']],
+        'member_names': [str(n) for n in arrays['member_names']],
+        'member_weights': [float(w) for w in arrays['member_weights']],
+        'arrays': {}
+    }
+    for name, array in arrays.items():
+        if name in METADATA_KEYS:
+            continue
+        filename = f"{name}.npy"
+        np.save(os.path.join(tmp_dir, filename), np.require(array, requirements="C"))
+        manifest['arrays'][name] = {'file': filename, 'dtype': str(array.dtype), 'shape': list(array.shape)}
+
+    with open(os.path.join(tmp_dir, MANIFEST_NAME), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+
+    old_dir = None
+    if os.path.exists(out_dir):
+        old_dir = os.path.join(parent, f".{os.path.basename(out_dir)}.old-{os.getpid()}")
+        shutil.rmtree(old_dir, ignore_errors=True)
+        os.rename(out_dir, old_dir)
+    os.rename(tmp_dir, out_dir)
+    if old_dir:
+        shutil.rmtree(old_dir, ignore_errors=True)
+    return out_dir
+
+
+def export_model(model_path=DEFAULT_MODEL_PATH, out_path=DEFAULT_COMPILED_PATH, package=None):
+    import warnings
+    if package is None:
+        import joblib
+        package = joblib.load(model_path)
+    with warnings.catch_warnings():
+        # probA_/probB_ carry a deprecation warning in recent scikit-learn
+        warnings.simplefilter("ignore")
+        arrays = compile_package(package)
+
+    if out_path.endswith('.npz'):
+        np.savez(out_path, **arrays)
+        return out_path
+    if not os.path.exists(model_path):
+        return save_artifact_dir(arrays, out_path)
+    return save_artifact_dir(arrays, out_path, file_sha256(model_path), file_stat(model_path))
+
+
+def is_current(artifact_dir, model_path=DEFAULT_MODEL_PATH):
+    """
+    True when artifact_dir was exported from the pickle now at model_path
+    and its array shapes fit its classes and columns. An unchanged mtime
+    and size is trusted, so a normal start never hashes the pickle;
+    otherwise its sha256 decides. Without a pickle there is nothing to
+    check the arrays against, so they are not current either.
+    """
+    try:
+        manifest = read_manifest(artifact_dir)
+    except (OSError, ValueError):
+        return False
+    if manifest.get('format_version') != FORMAT_VERSION:
+        return False
+    if not os.path.exists(model_path):
+        return False
+    shapes = {name: spec.get('shape', ()) for name, spec in manifest.get('arrays', {}).items()}
+    if shape_errors(shapes, len(manifest.get('classes', [])), len(manifest.get('cols', []))):
+        return False
+    if manifest.get('model_stat') and manifest['model_stat'] == file_stat(model_path):
+        return True
+    return manifest.get('model_sha256') == file_sha256(model_path)
+
+
+def _pairwise_coupling(r):
+    """
+    libsvm's multiclass_probability for a batch: r is (n, k, k) pairwise
+    probabilities, returns (n, k). Rows stop iterating independently, exactly
+    as each call of the C routine would.
+    """
+    n, k, _ = r.shape
+    max_iter = max(100, k)
+    eps = 0.005 / k
+
+    Q = -r.transpose(0, 2, 1) * r
+    diag = (r ** 2).sum(axis=1) - r[:, np.arange(k), np.arange(k)] ** 2
+    Q[:, np.arange(k), np.arange(k)] = diag
+
+    p = np.full((n, k), 1.0 / k)
+    active = np.arange(n)
+    for _ in range(max_iter):
+        if active.size == 0:
+            break
+        Qa, pa = Q[active], p[active]
+        Qp = np.einsum('ntj,nj->nt', Qa, pa)
+        pQp = (pa * Qp).sum(axis=1)
+        max_error = np.abs(Qp - pQp[:, None]).max(axis=1)
+        still = max_error >= eps
+        active = active[still]
+        if active.size == 0:
+            break
+        Qa, pa, Qp, pQp = Qa[still], pa[still], Qp[still], pQp[still]
+
+        for t in range(k):
+            Qtt = Qa[:, t, t]
+            diff = (-Qp[:, t] + pQp) / Qtt
+            pa[:, t] += diff
+            pQp = (pQp + diff * (diff * Qtt + 2 * Qp[:, t])) / (1 + diff) / (1 + diff)
+            Qp = (Qp + diff[:, None] * Qa[:, t, :]) / (1 + diff)[:, None]
+            pa /= (1 + diff)[:, None]
+        p[active] = pa
+    return p
+
+
+def _sparse_lookup(X):
+    """X[rows, cols] for a scipy CSR matrix, as float32, without densifying it."""
+    X = X.tocsr()
+    if not X.has_canonical_format:
+        X = X.copy()
+        X.sum_duplicates()  # also sorts the indices
+    n_cols = np.int64(X.shape[1])
+    row_of = np.repeat(np.arange(X.shape[0], dtype=np.int64), np.diff(X.indptr))
+    # Row-major and sorted, so one searchsorted finds any (row, col)
+    keys = np.append(row_of * n_cols + X.indices, -1)
+    data = np.append(X.data.astype(np.float32), np.float32(0))
+
+    def lookup(rows, cols):
+        query = rows * n_cols + cols
+        pos = np.searchsorted(keys[:-1], query)
+        return np.where(keys[pos] == query, data[pos], np.float32(0))
+    return lookup
+
+
+def _dense_lookup(X):
+    X = X.astype(np.float32)
+    return lambda rows, cols: X[rows, cols]
+
+
+class CompiledModel:
+    """Pure-NumPy replacement for the VotingClassifier's predict_proba."""
+
+    def __init__(self, arrays):
+        version = int(arrays['format_version'])
+        if version != FORMAT_VERSION:
+            raise ValueError(f"unsupported compiled model format {version}")
+        errors = shape_errors({name: np.shape(array) for name, array in arrays.items() if name not in METADATA_KEYS},
+                              len(arrays['classes']), len(arrays['cols']))
+        if errors:
+            raise ValueError(f"inconsistent compiled model: {'; '.join(errors)}")
+        self.arrays = arrays
+        self.manifest = None
+        self.cols = [str(c) for c in arrays['cols']]
+        self.classes_ = np.array([str(c) for c in arrays['classes']], dtype=object)
+        self.n_classes = len(self.classes_)
+
+        self.member_weights = dict(zip([str(n) for n in arrays['member_names']], arrays['member_weights']))
+        self.rf_left = arrays['rf_left']
+        self.rf_right = arrays['rf_right']
+        self.rf_feature = arrays['rf_feature']
+        self.rf_threshold = arrays['rf_threshold']
+        self.rf_value = arrays['rf_value']
+        self.rf_roots = arrays['rf_roots']
+        self.rf_max_depth = int(arrays['rf_max_depth'])
+        self.svc_coef = arrays['svc_coef']
+        self.svc_intercept = arrays['svc_intercept']
+        self.svc_prob_a = arrays['svc_prob_a']
+        self.svc_prob_b = arrays['svc_prob_b']
+        self.nb_feature_log_prob = arrays['nb_feature_log_prob']
+        self.nb_class_log_prior = arrays['nb_class_log_prior']
+
+        k = self.n_classes
+        self.pair_i, self.pair_j = np.triu_indices(k, 1)
+
+    @classmethod
+    def load(cls, path=DEFAULT_COMPILED_PATH, mmap=True):
+        if os.path.isdir(path):
+            return cls.load_dir(path, mmap)
+        with np.load(path) as data:
+            return cls({name: data[name] for name in data.files})
+
+    @classmethod
+    def load_dir(cls, artifact_dir, mmap=True):
+        manifest = read_manifest(artifact_dir)
+        arrays = {
+            'format_version': np.array(manifest['format_version']),
+            'cols': np.array(manifest['cols'], dtype=str),
+            'classes': np.array(manifest['classes'], dtype=str),
+            'member_names': np.array(manifest['member_names'], dtype=str),
+            'member_weights': np.array(manifest['member_weights'], dtype=np.float64),
+        }
+        for name, spec in manifest['arrays'].items():
+            # Scalars are not worth a mapping
+            mmap_mode = 'r' if mmap and spec['shape'] else None
+            arrays[name] = np.load(os.path.join(artifact_dir, spec['file']), mmap_mode=mmap_mode)
+        model = cls(arrays)
+        model.manifest = manifest
+        return model
+
+    def forest_proba(self, X):
+        lookup = _sparse_lookup(X) if hasattr(X, 'indptr') else _dense_lookup(X)
+        n = X.shape[0]
+        rows = np.arange(n, dtype=np.int64)[:, None]
+        node = np.broadcast_to(self.rf_roots, (n, len(self.rf_roots))).copy()
+        for _ in range(self.rf_max_depth):
+            go_left = lookup(rows, self.rf_feature[node]) <= self.rf_threshold[node]
+            node = np.where(go_left, self.rf_left[node], self.rf_right[node])
+        return self.rf_value[node].sum(axis=1) / len(self.rf_roots)
+
+    def svc_proba(self, X):
+        dec = X @ self.svc_coef.T + self.svc_intercept
+        f = dec * self.svc_prob_a + self.svc_prob_b
+        # Numerically stable sigmoid, same branches as libsvm's sigmoid_predict
+        pos = np.exp(-np.abs(f))
+        prob = np.where(f >= 0, pos / (1.0 + pos), 1.0 / (1.0 + pos))
+        prob = np.clip(prob, MIN_PAIRWISE_PROB, 1 - MIN_PAIRWISE_PROB)
+
+        r = np.zeros((X.shape[0], self.n_classes, self.n_classes))
+        r[:, self.pair_i, self.pair_j] = prob
+        r[:, self.pair_j, self.pair_i] = 1 - prob
+        return _pairwise_coupling(r)
+
+    def nb_proba(self, X):
+        jll = X @ self.nb_feature_log_prob.T + self.nb_class_log_prior
+        top = jll.max(axis=1, keepdims=True)
+        log_norm = top + np.log(np.exp(jll - top).sum(axis=1, keepdims=True))
+        return np.exp(jll - log_norm)
+
+    def predict_proba(self, X):
+        if hasattr(X, 'indptr'):
+            X = X.tocsr().astype(np.float64)
+        else:
+            X = np.asarray(X, dtype=np.float64)
+            if X.ndim == 1:
+                X = X[None, :]
+        members = {'rf': self.forest_proba, 'svc': self.svc_proba, 'nb': self.nb_proba}
+        total = sum(self.member_weights.values())
+        probs = sum(w * members[name](X) for name, w in self.member_weights.items())
+        return probs / total
+
+
+def _testing_matrix(cols, path='Testing.csv'):
+    import pandas as pd
+    testing = pd.read_csv(path)
+    testing.columns = [c.strip() for c in testing.columns]
+    X = np.zeros((len(testing), len(cols)))
+    for idx, col in enumerate(cols):
+        if col in testing.columns:
+            X[:, idx] = testing[col].to_numpy(dtype=np.float64)
+    return X
+
+
+def check_parity(model_path=DEFAULT_MODEL_PATH, compiled_path=DEFAULT_COMPILED_PATH, tolerance=1e-6):
+    import joblib
+    import warnings
+    warnings.filterwarnings("ignore")
+
+    package = joblib.load(model_path)
+    compiled = CompiledModel.load(compiled_path)
+    X = _testing_matrix(list(package['cols']))
+
+    expected = package['model'].predict_proba(X)
+    actual = compiled.predict_proba(X)
+    max_diff = float(np.abs(expected - actual).max())
+    same_top = bool((expected.argmax(axis=1) == actual.argmax(axis=1)).all())
+
+    # The CSR path must agree with the dense one
+    from scipy import sparse
+    sparse_diff = float(np.abs(compiled.predict_proba(sparse.csr_matrix(X)) - actual).max())
+
+    print(f"rows checked:        {len(X)}")
+    print(f"max |diff|:          {max_diff:.3e}")
+    print(f"sparse vs dense:     {sparse_diff:.3e}")
+    print(f"same top class:      {same_top}")
+    return max_diff <= tolerance and sparse_diff <= tolerance and same_top
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compile diagnochain_model.pkl into NumPy arrays")
+    parser.add_argument('command', choices=['export', 'check'])
+    parser.add_argument('--model', default=DEFAULT_MODEL_PATH)
+    parser.add_argument('--out', default=DEFAULT_COMPILED_PATH)
+    parser.add_argument('--tolerance', type=float, default=1e-6)
+    args = parser.parse_args()
+
+    if args.command == 'export':
+        path = export_model(args.model, args.out)
+        print(f"Compiled model saved to {os.path.abspath(path)}")
+    else:
+        ok = check_parity(args.model, args.out, args.tolerance)
+        print("PARITY OK" if ok else "PARITY FAILED")
+        sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
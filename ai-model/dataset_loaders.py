@@ -0,0 +1,256 @@
+"""
+Dataset loaders for training. Each loader streams one file format in chunks
+and yields (diseases, symptoms) per chunk:
+
+- diseases: Series of disease names, indexed 0..n-1 within the chunk
+  (NaN for rows that should be skipped)
+- symptoms: Series of cleaned symptom names whose index is the row they belong to
+
+Formats:
+- SymptomListLoader: dataset.csv, no header, disease followed by symptom cells
+- OneHotLoader: Training.csv, one 0/1 column per symptom plus 'prognosis'
+- QuotedListLoader: transformed_disease_symptoms_randomized.csv,
+  'disease,symptoms' where symptoms is one quoted comma-joined cell
+
+SparseDatasetBuilder merges any number of loaders into one CSR matrix over
+the union of their vocabularies, so nothing dense is ever allocated.
+Training reads dataset.csv only by default: a model trained on the merged
+files predicts differently and has not been validated against the medical
+rules yet. To opt in, list the files in DIAGNOCHAIN_DATASETS (comma-separated
+file names), e.g.
+DIAGNOCHAIN_DATASETS=dataset.csv,Training.csv,transformed_disease_symptoms_randomized.csv
+
+dataset_aliases.csv (kind,name,canonical) maps disease labels and symptom
+names from the other datasets onto the dataset.csv names that RULES, the
+symptom synonyms and the description/precaution tables use, e.g.
+'asthma' -> 'Bronchial Asthma' and 'shortness_of_breath' -> 'breathlessness'.
+The builder applies it to every chunk.
+"""
+import os
+import csv
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+CHUNKSIZE = 50000
+DEFAULT_DATASETS = ['dataset.csv']
+SEARCH_DIRS = ['.', 'Data', '..']
+ALIASES_FILE = 'dataset_aliases.csv'
+
+
+def clean_symptoms(values):
+    """' skin rash' -> 'skin_rash'; non-strings become NaN."""
+    return values.str.strip().str.replace(" ", "_", regex=False).str.lower()
+
+
+class DatasetLoader:
+    def __init__(self, path, chunksize=CHUNKSIZE):
+        self.path = path
+        self.chunksize = chunksize
+
+    def chunks(self):
+        raise NotImplementedError
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.path!r})"
+
+
+class SymptomListLoader(DatasetLoader):
+    def chunks(self):
+        for raw in pd.read_csv(self.path, header=None, dtype=str, chunksize=self.chunksize):
+            raw = raw.dropna(how='all').reset_index(drop=True)
+            diseases = raw.iloc[:, 0].str.strip()
+            symptoms = clean_symptoms(raw.iloc[:, 1:].melt(ignore_index=False)['value'].dropna())
+            yield diseases, symptoms
+
+
+class OneHotLoader(DatasetLoader):
+    label_column = 'prognosis'
+
+    def chunks(self):
+        # Read the header ourselves: pandas would rename repeated columns
+        # (Training.csv has 'fluid_overload' twice) to 'name.1'
+        with open(self.path, encoding='utf-8') as f:
+            header = pd.Series(next(csv.reader(f)), dtype=str)
+        label = int(np.flatnonzero(header.str.strip() == self.label_column)[0])
+        features = np.flatnonzero((header != '') & ~header.index.isin([label]))
+        names = clean_symptoms(header[features]).to_numpy()
+
+        for raw in pd.read_csv(self.path, header=None, skiprows=1, chunksize=self.chunksize):
+            # astype(str) would turn a missing label into a 'nan' class
+            raw = raw[raw[label].notna()].reset_index(drop=True)
+            diseases = raw[label].astype(str).str.strip()
+            rows, cols = np.nonzero(raw[features].to_numpy() > 0)
+            yield diseases, pd.Series(names[cols], index=rows)
+
+
+class QuotedListLoader(DatasetLoader):
+    def chunks(self):
+        for raw in pd.read_csv(self.path, dtype=str, chunksize=self.chunksize):
+            raw = raw.reset_index(drop=True)
+            diseases = raw['disease'].str.strip()
+            symptoms = raw['symptoms'].str.split(',').explode().dropna()
+            yield diseases, clean_symptoms(symptoms)
+
+
+LOADERS = {
+    'symptom_list': SymptomListLoader,
+    'one_hot': OneHotLoader,
+    'quoted_list': QuotedListLoader,
+}
+
+
+def detect_format(path):
+    """Guess the loader from the header line."""
+    with open(path, encoding='utf-8') as f:
+        header = [cell.strip().lower() for cell in f.readline().split(',')]
+    if header[:2] == ['disease', 'symptoms']:
+        return 'quoted_list'
+    if 'prognosis' in header:
+        return 'one_hot'
+    return 'symptom_list'
+
+
+def find_dataset(name):
+    for directory in SEARCH_DIRS:
+        path = os.path.join(directory, name)
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def configured_datasets():
+    names = os.environ.get('DIAGNOCHAIN_DATASETS')
+    if names:
+        return [n.strip() for n in names.split(',') if n.strip()]
+    return list(DEFAULT_DATASETS)
+
+
+def load_aliases(path=None):
+    """
+    (label aliases, symptom aliases) from a kind,name,canonical CSV; both
+    empty when the file is missing. Symptom names are cleaned like the data.
+    """
+    path = path or find_dataset(ALIASES_FILE)
+    if not path or not os.path.exists(path):
+        return {}, {}
+    aliases = pd.read_csv(path, dtype=str).dropna()
+    labels = aliases[aliases['kind'].str.strip() == 'label']
+    symptoms = aliases[aliases['kind'].str.strip() == 'symptom']
+    return (
+        dict(zip(labels['name'].str.strip(), labels['canonical'].str.strip())),
+        dict(zip(clean_symptoms(symptoms['name']), clean_symptoms(symptoms['canonical']))),
+    )
+
+
+def create_loader(path, fmt=None, chunksize=CHUNKSIZE):
+    return LOADERS[fmt or detect_format(path)](path, chunksize=chunksize)
+
+
+class SparseDataset:
+    def __init__(self, X, labels, cols):
+        self.X = X
+        self.labels = labels
+        self.cols = cols
+
+    @property
+    def shape(self):
+        return self.X.shape
+
+
+class SparseDatasetBuilder:
+    """
+    Accumulates (row, symptom) pairs from loaders; build() returns a SparseDataset.
+    label_aliases / symptom_aliases rename names before they are counted.
+    """
+
+    def __init__(self, label_aliases=None, symptom_aliases=None):
+        self.label_aliases = dict(label_aliases or {})
+        self.symptom_aliases = dict(symptom_aliases or {})
+        self.vocabulary = {}
+        self.row_parts = []
+        self.col_parts = []
+        self.labels = []
+        self.n_rows = 0
+
+    def add_chunk(self, diseases, symptoms):
+        if self.label_aliases:
+            diseases = diseases.replace(self.label_aliases)
+        if self.symptom_aliases:
+            symptoms = symptoms.replace(self.symptom_aliases)
+        symptoms = symptoms[symptoms.notna() & (symptoms != '')]
+        for name in symptoms.unique():
+            self.vocabulary.setdefault(name, len(self.vocabulary))
+
+        valid = diseases.notna().to_numpy()
+        row_ids = np.cumsum(valid) - 1 + self.n_rows
+        keep = valid[symptoms.index.to_numpy()]
+        symptoms = symptoms[keep]
+
+        self.row_parts.append(row_ids[symptoms.index.to_numpy()])
+        self.col_parts.append(np.fromiter((self.vocabulary[s] for s in symptoms), dtype=np.int64, count=len(symptoms)))
+        self.labels.append(diseases.to_numpy()[valid])
+        self.n_rows += int(valid.sum())
+
+    def add_loader(self, loader):
+        for diseases, symptoms in loader.chunks():
+            self.add_chunk(diseases, symptoms)
+
+    def build(self, dtype=np.float64):
+        cols = sorted(self.vocabulary)
+        remap = np.empty(len(cols), dtype=np.int64)
+        remap[[self.vocabulary[name] for name in cols]] = np.arange(len(cols))
+
+        rows = np.concatenate(self.row_parts) if self.row_parts else np.zeros(0, dtype=np.int64)
+        col_ids = remap[np.concatenate(self.col_parts)] if self.col_parts else np.zeros(0, dtype=np.int64)
+        X = sparse.csr_matrix(
+            (np.ones(len(rows), dtype=dtype), (rows, col_ids)),
+            shape=(self.n_rows, len(cols))
+        )
+        # A symptom listed twice in one row is still just present
+        X.sum_duplicates()
+        X.data[:] = 1
+        labels = np.concatenate(self.labels) if self.labels else np.zeros(0, dtype=object)
+        return SparseDataset(X, labels.astype(object), cols)
+
+
+def append_records(dataset, records):
+    """Add (disease, [symptom, ...]) rows, e.g. synthetic ones; symptoms outside dataset.cols are dropped."""
+    records = list(records)
+    index = {name: i for i, name in enumerate(dataset.cols)}
+    rows, cols = [], []
+    for row, (_, symptoms) in enumerate(records):
+        for name in set(symptoms):
+            if name in index:
+                rows.append(row)
+                cols.append(index[name])
+    extra = sparse.csr_matrix(
+        (np.ones(len(rows), dtype=dataset.X.dtype), (rows, cols)),
+        shape=(len(records), len(dataset.cols))
+    )
+    labels = np.concatenate([dataset.labels, np.array([disease for disease, _ in records], dtype=object)])
+    return SparseDataset(sparse.vstack([dataset.X, extra], format='csr'), labels, dataset.cols)
+
+
+def drop_rare_classes(dataset, min_rows):
+    """Drop diseases with fewer than min_rows rows (too few to appear on both sides of a split)."""
+    names, counts = np.unique(dataset.labels, return_counts=True)
+    rare = names[counts < min_rows]
+    if not len(rare):
+        return dataset, []
+    keep = ~np.isin(dataset.labels, rare)
+    return SparseDataset(dataset.X[keep], dataset.labels[keep], dataset.cols), list(rare)
+
+
+def load_sparse_dataset(loaders, aliases=None):
+    """aliases: (label aliases, symptom aliases); dataset_aliases.csv when None."""
+    builder = SparseDatasetBuilder(*(load_aliases() if aliases is None else aliases))
+    for loader in loaders:
+        builder.add_loader(loader)
+    return builder.build()
+
+
+def load_dataset_files(paths, aliases=None):
+    """Merge files of any supported format, detected from their headers."""
+    return load_sparse_dataset([create_loader(path) for path in paths], aliases)
@@ -0,0 +1,372 @@
+"""
+Import-light inference: InferencePredictor answers predictions from the
+compiled model arrays (compiled_model.py) with NumPy only at import time;
+SciPy's CSR matrices are loaded by the first vectorize. pandas,
+scikit-learn, joblib and transformers are never imported here;
+train_model.DiseasePredictor adds the pickle fallback and training on top
+of this class, and NER still loads lazily on first use.
+
+prediction_worker.py and api_predict.py use this class whenever the
+compiled arrays match diagnochain_model.pkl (see can_load_compiled), so a
+CLI prediction does not pay for the training stack. bench_startup.py in
+benchmarks/ reports the difference.
+"""
+import os
+import sys
+import csv
+import threading
+
+import numpy as np
+
+from ner_extractor import create_ner, ner_mode as configured_ner_mode, ner_policy as configured_ner_policy
+from symptom_index import get_extractor, normalize_text
+from compiled_model import DEFAULT_COMPILED_PATH, DEFAULT_MODEL_PATH, CompiledModel, file_sha256, is_current, model_backend
+from class_responses import ResponseTable, kb_name, top_k
+from medical_rules import RULES, RuleEngine
+from metrics import METRICS
+from result_cache import MISSING, NER_CACHE_SIZE, RESULT_CACHE_SIZE, RESULT_CACHE_TTL, TEXT_CACHE_SIZE, LRUCache
+
+
+def can_load_compiled(model_path=DEFAULT_MODEL_PATH, compiled_path=DEFAULT_COMPILED_PATH):
+    """True when InferencePredictor can start without the training stack."""
+    return model_backend() == 'compiled' and is_current(compiled_path, model_path)
+
+
+class InferencePredictor:
+    """Extraction, the compiled model, medical rules and the knowledge base, loaded once."""
+
+    def __init__(self, ner_mode=None):
+        print(f"Initializing {type(self).__name__}...")
+        self.description_list = {}
+        self.precautionDictionary = {}
+        self.severityDictionary = {}
+        self.symptoms_dict = {}
+        self.cols = []
+        self.classes = None
+        self.model = None
+        self.model_path = DEFAULT_MODEL_PATH
+        self.compiled_model_path = DEFAULT_COMPILED_PATH
+        
+        # NER loads lazily on first use; DIAGNOCHAIN_NER=off|process changes that
+        self.ner_mode = ner_mode or configured_ner_mode()
+        print(f"AI NER mode: {self.ner_mode}")
+        self.ai_ner = create_ner(self.ner_mode)
+        self.ner_policy = configured_ner_policy()
+        self.ner_counts = {"needed": 0, "skipped": 0}
+        self.ner_counts_lock = threading.Lock()
+
+        # Repeated texts and symptom sets skip extraction / the model
+        self.text_cache = LRUCache(TEXT_CACHE_SIZE)
+        self.result_cache = LRUCache(RESULT_CACHE_SIZE, RESULT_CACHE_TTL)
+        self.ner_cache = LRUCache(NER_CACHE_SIZE)
+
+        self.load_model()
+        self.update_model_version()
+
+        self.rule_engine = RuleEngine(RULES, self.cols, self.classes)
+        self.symptom_extractor = get_extractor(list(self.cols))
+        self.load_knowledge_base()
+        self.responses = ResponseTable(
+            self.classes, self.description_list, self.precautionDictionary,
+            "No description available", []
+        )
+        uncovered = [str(c) for c in self.classes
+                     if c not in self.description_list or c not in self.precautionDictionary]
+        if uncovered:
+            print(f"No description or precautions for: {', '.join(uncovered)}")
+        print("Initialization complete!")
+
+    def load_model(self):
+        """Only the compiled arrays; train_model.DiseasePredictor can also use or train the pickle."""
+        if not self.load_compiled_model():
+            raise FileNotFoundError(
+                f"No current compiled model at {self.compiled_model_path}; "
+                "run python train_model.py (or compiled_model.py export) first"
+            )
+
+    def load_compiled_model(self):
+        """
+        Use the memory-mapped arrays when they were exported from the current
+        pickle; every worker on the host then shares one copy of the weights.
+        """
+        if model_backend() != 'compiled' or not is_current(self.compiled_model_path, self.model_path):
+            return False
+        try:
+            self.model = CompiledModel.load(self.compiled_model_path)
+        except (OSError, ValueError) as e:
+            print(f"Compiled model at {self.compiled_model_path} is unusable: {e}")
+            return False
+        self.cols = self.model.cols
+        self.classes = self.model.classes_
+        self.symptoms_dict = {symptom: idx for idx, symptom in enumerate(self.cols)}
+        print(f"Compiled model loaded from {self.compiled_model_path}")
+        return True
+
+    def model_file_state(self):
+        try:
+            st = os.stat(self.model_path)
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def update_model_version(self):
+        """Identify the model on disk and drop everything cached for the previous one."""
+        self.model_state = self.model_file_state()
+        manifest = getattr(self.model, 'manifest', None) or {}
+        self.model_version = manifest.get('model_sha256')
+        if not self.model_version and self.model_state is not None:
+            self.model_version = file_sha256(self.model_path)
+        self.text_cache.clear()
+        self.result_cache.clear()
+        self.ner_cache.clear()
+
+    def check_model_file(self):
+        """Invalidate the caches when diagnochain_model.pkl was retrained."""
+        if self.model_file_state() != self.model_state:
+            self.update_model_version()
+
+    def cache_stats(self):
+        return {
+            "model_version": self.model_version,
+            "texts": self.text_cache.stats(),
+            "results": self.result_cache.stats(),
+            "ner": dict(self.ner_counts, policy=self.ner_policy, memo=self.ner_cache.stats())
+        }
+
+    def load_knowledge_base(self):
+        # Try to load from Data folder or current folder
+        desc_paths = ['symptom_Description.csv', 'Data/symptom_Description.csv']
+        prec_paths = ['symptom_precaution.csv', 'Data/symptom_precaution.csv']
+        sev_paths = ['Symptom_severity.csv', 'Data/Symptom_severity.csv']
+        
+        # Load descriptions
+        for path in desc_paths:
+            if os.path.exists(path):
+                try:
+                    with open(path, encoding='utf-8') as csv_file:
+                        # No header row: the first line is already a disease
+                        reader = csv.reader(csv_file)
+                        for row in reader:
+                            if len(row) >= 2:
+                                self.description_list[kb_name(row[0])] = row[1]
+                    print(f"Loaded descriptions from {path}")
+                    break
+                except:
+                    pass
+        
+        # Manual additions
+        self.description_list['Influenza'] = "Influenza (The Flu) is a viral infection attacking the respiratory system."
+        self.description_list['Acute Sinusitis'] = "Acute Sinusitis is the inflammation of the sinuses."
+        
+        # Load precautions
+        for path in prec_paths:
+            if os.path.exists(path):
+                try:
+                    with open(path, encoding='utf-8') as csv_file:
+                        reader = csv.reader(csv_file)
+                        for row in reader:
+                            if len(row) >= 5:
+                                self.precautionDictionary[kb_name(row[0])] = [row[1], row[2], row[3], row[4]]
+                    print(f"Loaded precautions from {path}")
+                    break
+                except:
+                    pass
+        
+        self.precautionDictionary['Influenza'] = ["stay hydrated", "rest", "antiviral medication", "monitor temperature"]
+        self.precautionDictionary['Acute Sinusitis'] = ["steam inhalation", "warm compress", "saline spray", "hydrate"]
+        
+        # Load severity
+        for path in sev_paths:
+            if os.path.exists(path):
+                try:
+                    with open(path, encoding='utf-8') as csv_file:
+                        reader = csv.reader(csv_file)
+                        for row in reader:
+                            if len(row) >= 2:
+                                try:
+                                    self.severityDictionary[row[0]] = int(row[1])
+                                except:
+                                    pass
+                    print(f"Loaded severity from {path}")
+                    break
+                except:
+                    pass
+
+    def extract_symptoms_robust(self, user_input):
+        return self.extract_symptoms_batch([user_input])[0]
+
+    def extract_symptoms_batch(self, user_inputs):
+        """
+        Dictionary + AI extraction for many texts. NER only runs on texts with
+        content words the dictionary could not explain (see ner_policy), as
+        one batch on its own thread, and is memoized per normalized text.
+        """
+        extractor = self.symptom_extractor
+        texts = [normalize_text(user_input) for user_input in user_inputs]
+
+        # 2. Exact Phrase Matching + 3. Fuzzy Logic for Typos
+        results, need_ner = [], []
+        with METRICS.span('extract_dictionary'):
+            for user_input, text in zip(user_inputs, texts):
+                extracted, uncovered = extractor.extract_with_coverage(text)
+                results.append(extracted)
+                need_ner.append(bool(user_input) and self.ai_ner.enabled and (self.ner_policy == 'always' or bool(uncovered)))
+
+        # 1. AI NER for what is left, mapped onto the model's columns
+        ner_found = {}
+        pending = {}
+        for user_input, text, needed in zip(user_inputs, texts, need_ner):
+            if not needed or text in ner_found or text in pending:
+                continue
+            cached = self.ner_cache.get(text)
+            if cached is MISSING:
+                pending[text] = user_input
+            else:
+                ner_found[text] = cached
+        if pending:
+            METRICS.incr('ner_invocations', len(pending))
+            with METRICS.span('ner'):
+                entity_lists = self.ai_ner.extract_symptoms_batch(list(pending.values()))
+            for text, entities in zip(pending, entity_lists):
+                print(f"AI found: {entities}", file=sys.stderr)
+                ner_found[text] = frozenset(extractor.normalize_entities(entities))
+                self.ner_cache.put(text, ner_found[text])
+
+        with self.ner_counts_lock:
+            self.ner_counts["needed"] += sum(need_ner)
+            self.ner_counts["skipped"] += len(need_ner) - sum(need_ner)
+
+        for text, needed, extracted in zip(texts, need_ner, results):
+            if needed:
+                # Add AI findings to your extracted list
+                extracted.update(ner_found[text])
+        METRICS.incr('symptoms_extracted', sum(len(extracted) for extracted in results))
+        return [list(extracted) for extracted in results]
+
+    def vectorize(self, symptoms_lists):
+        """One binary CSR input row per symptom list (columns follow self.cols)."""
+        return self.symptom_extractor.vectorize(symptoms_lists)
+
+    def apply_medical_logic(self, input_matrix, n_symptoms, probs):
+        """
+        Rule-based sanity checks (medical_rules.RULES) for the whole batch,
+        added to the full (n, classes) probability matrix.
+        """
+        return self.rule_engine.apply(input_matrix, n_symptoms, probs)
+
+    def predict(self, user_input):
+        return self.predict_batch([user_input])[0]
+
+    def extract_symptoms_cached(self, user_inputs):
+        """extract_symptoms_batch with the raw-text cache in front of it."""
+        symptoms_lists = [self.text_cache.get(text) for text in user_inputs]
+        misses = list(dict.fromkeys(text for text, cached in zip(user_inputs, symptoms_lists) if cached is MISSING))
+        if misses:
+            extracted = dict(zip(misses, self.extract_symptoms_batch(misses)))
+            for text, symptoms in extracted.items():
+                self.text_cache.put(text, tuple(symptoms))
+            symptoms_lists = [
+                extracted[text] if cached is MISSING else cached
+                for text, cached in zip(user_inputs, symptoms_lists)
+            ]
+        return [list(symptoms) for symptoms in symptoms_lists]
+
+    def predict_batch(self, user_inputs):
+        """
+        Predict many symptom texts with a single predict_proba call.
+        Returns one result (or error dict) per input, in order. Symptom sets
+        seen before under the same model are answered from the result cache.
+        """
+        with METRICS.span('predict_batch'):
+            return self._predict_batch(user_inputs)
+
+    def _predict_batch(self, user_inputs):
+        self.check_model_file()
+        symptoms_lists = self.extract_symptoms_cached(user_inputs)
+        results = [None] * len(user_inputs)
+        METRICS.incr('predictions', len(user_inputs))
+
+        # Cache key -> positions of the inputs that need it computed
+        misses = {}
+        for i, symptoms_list in enumerate(symptoms_lists):
+            if not symptoms_list:
+                results[i] = {"error": "No recognizable symptoms. Please list your symptoms clearly (e.g., 'Fever and Cough')"}
+                continue
+            key = (self.model_version, frozenset(symptoms_list))
+            cached = self.result_cache.get(key)
+            if cached is MISSING:
+                misses.setdefault(key, []).append(i)
+            else:
+                results[i] = dict(cached, symptoms_detected=symptoms_list)
+
+        if misses:
+            keys = list(misses)
+            fresh = self.predict_symptom_lists([symptoms_lists[misses[key][0]] for key in keys])
+            for key, result in zip(keys, fresh):
+                self.result_cache.put(key, result)
+                for i in misses[key]:
+                    results[i] = dict(result, symptoms_detected=symptoms_lists[i])
+        return results
+
+    def predict_symptom_lists(self, symptoms_lists):
+        """Model + medical logic for non-empty symptom lists, one result per list."""
+        results = []
+
+        # Vectorize
+        with METRICS.span('vectorize'):
+            input_matrix = self.vectorize(symptoms_lists)
+            n_symptoms = np.array([len(set(symptoms_list)) for symptoms_list in symptoms_lists])
+
+        # Predict
+        with METRICS.span('predict_proba'):
+            probs = self.model.predict_proba(input_matrix)
+        candidates = probs > 0.001
+
+        # --- 🧠 MEDICAL LOGIC & SANITY CHECKS ---
+        # Applied to every class, so a boosted disease can rise into the top 3
+        with METRICS.span('rules'):
+            adjusted = self.apply_medical_logic(input_matrix, n_symptoms, probs)
+
+        # --- FINAL SORTING ---
+        # Filter out negatives and keep top 3
+        adjusted[~candidates] = -np.inf
+        top_indices = top_k(adjusted, 3)
+        confidences = np.take_along_axis(adjusted, top_indices, axis=1)
+        keep = confidences > 0
+
+        # Normalize percentages
+        totals = np.where(keep, confidences, 0).sum(axis=1, keepdims=True)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            percentages = np.round((confidences / totals) * 100, 2)
+
+        with METRICS.span('kb_lookup'):
+            for row, symptoms_list in enumerate(symptoms_lists):
+                picked = top_indices[row][keep[row]]
+                if len(picked):
+                    pcts = percentages[row][keep[row]]
+                    disease, description, precautions = self.responses[picked[0]]
+                    primary = {"disease": disease, "confidence": float(pcts[0])}
+                    alternatives = [
+                        {"disease": name, "confidence": float(pct)}
+                        for name, pct in zip(self.responses.names[picked[1:]], pcts[1:])
+                    ]
+                else:
+                    # CRITICAL FIX: Handle case where all diseases were filtered out
+                    # Fallback to most generic diagnosis
+                    primary = {"disease": "Viral Fever", "confidence": 100.0}
+                    METRICS.incr('fallback_viral_fever')
+                    alternatives = []
+                    description = self.description_list.get(primary['disease'], "No description available")
+                    precautions = self.precautionDictionary.get(primary['disease'], [])
+
+                # Build response
+                results.append({
+                    "symptoms_detected": symptoms_list,
+                    "primary_diagnosis": primary['disease'],
+                    "confidence": primary['confidence'],
+                    "description": description,
+                    "precautions": precautions,
+                    "alternatives": alternatives
+                })
+
+        return results
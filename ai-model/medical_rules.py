@@ -0,0 +1,104 @@
+"""
+Post-model "medical logic" for DiseasePredictor as a declarative rule table.
+
+Each Rule adds `delta` to one disease's probability when the symptom
+conditions hold:
+
+- all_of: every listed symptom is present
+- any_of: at least one listed symptom is present (ignored when empty)
+- none_of: none of the listed symptoms is present
+- max_symptoms: at most this many symptoms were extracted
+
+RuleEngine compiles the table against a model's columns and classes into
+three (feature x rule) condition matrices and one (rule x class) adjustment
+matrix, as plain NumPy arrays: the table has a handful of rules, so they
+stay small, and a CSR input multiplies them without being densified.
+Evaluating a batch is then a few matrix products over the full probability
+vectors, before any top-k selection.
+Symptoms or diseases the model does not know make a condition
+unsatisfiable or a rule a no-op, exactly as the old hard-coded checks did.
+"""
+import numpy as np
+
+
+class Rule:
+    def __init__(self, disease, delta, all_of=(), any_of=(), none_of=(), max_symptoms=None):
+        self.disease = disease
+        self.delta = delta
+        self.all_of = tuple(all_of)
+        self.any_of = tuple(any_of)
+        self.none_of = tuple(none_of)
+        self.max_symptoms = max_symptoms
+
+    def __repr__(self):
+        return f"Rule({self.disease!r}, {self.delta:+})"
+
+
+RULES = [
+    # 1. ASTHMA CHECK
+    Rule('Bronchial Asthma', -0.50, none_of=['breathlessness']),
+    # 2. COMMON COLD BOOST
+    Rule('Common Cold', +0.4, all_of=['cough'], any_of=['headache', 'continuous_sneezing', 'runny_nose']),
+    # 3. INFLUENZA CHECK
+    Rule('Influenza', +0.3, all_of=['high_fever', 'chills']),
+    Rule('Common Cold', -0.2, all_of=['high_fever', 'chills']),
+    # 4. PARALYSIS & AIDS PENALTY
+    Rule('Paralysis (brain hemorrhage)', -0.8, none_of=['vomiting', 'weakness_of_one_body_side', 'altered_sensorium']),
+    Rule('AIDS', -0.8, none_of=['muscle_wasting', 'patches_in_throat', 'extra_marital_contacts']),
+    # 5. VIRAL FEVER DEFAULT
+    Rule('Viral Fever', +0.3, all_of=['high_fever'], max_symptoms=3),
+]
+
+
+def _condition_matrix(rules, attr, col_index):
+    matrix = np.zeros((len(col_index), len(rules)))
+    for rule_id, rule in enumerate(rules):
+        for symptom in getattr(rule, attr):
+            if symptom in col_index:
+                matrix[col_index[symptom], rule_id] = 1.0
+    return matrix
+
+
+class RuleEngine:
+    """A rule table compiled for one model's columns and classes."""
+
+    def __init__(self, rules, cols, classes):
+        self.rules = list(rules)
+        col_index = {col: idx for idx, col in enumerate(cols)}
+        class_index = {disease: idx for idx, disease in enumerate(classes)}
+
+        self.all_of = _condition_matrix(self.rules, 'all_of', col_index)
+        self.any_of = _condition_matrix(self.rules, 'any_of', col_index)
+        self.none_of = _condition_matrix(self.rules, 'none_of', col_index)
+        # Counted over the rule's own list, so an unknown symptom can never be present
+        self.all_required = np.array([len(rule.all_of) for rule in self.rules])
+        self.needs_any = np.array([bool(rule.any_of) for rule in self.rules])
+        self.max_symptoms = np.array([
+            np.inf if rule.max_symptoms is None else rule.max_symptoms for rule in self.rules
+        ])
+
+        self.adjustments = np.zeros((len(self.rules), len(classes)))
+        for rule_id, rule in enumerate(self.rules):
+            if rule.disease in class_index:
+                self.adjustments[rule_id, class_index[rule.disease]] += rule.delta
+
+    def fired(self, X, n_symptoms):
+        """(n, rules) bool matrix; X is the binary (n, cols) input, dense or CSR."""
+        if not hasattr(X, 'indptr'):
+            X = np.atleast_2d(np.asarray(X, dtype=np.float64))
+        all_hits = np.asarray(X @ self.all_of)
+        any_hits = np.asarray(X @ self.any_of)
+        none_hits = np.asarray(X @ self.none_of)
+        return (
+            (all_hits >= self.all_required)
+            & ((any_hits > 0) | ~self.needs_any)
+            & (none_hits == 0)
+            & (np.asarray(n_symptoms)[:, None] <= self.max_symptoms)
+        )
+
+    def adjust(self, X, n_symptoms):
+        """(n, classes) additive adjustment for a batch."""
+        return self.fired(X, n_symptoms).astype(np.float64) @ self.adjustments
+
+    def apply(self, X, n_symptoms, probs):
+        return probs + self.adjust(X, n_symptoms)
@@ -0,0 +1,158 @@
+"""
+Process-wide timing spans and counters for the prediction hot path.
+
+    with METRICS.span('predict_proba'):
+        ...
+    METRICS.incr('ner_invocations', len(texts))
+
+Each stage keeps a count, sum, max and a fixed-bucket histogram; counters
+are plain totals. The long-running services export them as Prometheus text
+(prometheus()) or JSON (snapshot()). CLI runs print trace_line() to stderr
+only when DIAGNOCHAIN_TRACE=1, so scripted callers get no extra output.
+DIAGNOCHAIN_METRICS=0 turns recording off: span() then returns one shared
+no-op context manager and incr() returns immediately.
+"""
+import os
+import time
+import threading
+
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+PREFIX = 'diagnochain'
+
+
+def metrics_enabled():
+    return os.environ.get('DIAGNOCHAIN_METRICS', '1').strip().lower() not in ('0', 'off', 'false', 'no')
+
+
+def trace_enabled():
+    """DIAGNOCHAIN_TRACE=1: CLI runs end with a stage-timing line on stderr."""
+    return os.environ.get('DIAGNOCHAIN_TRACE', '0').strip().lower() in ('1', 'on', 'true', 'yes')
+
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ('metrics', 'name', 'start')
+
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.observe(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class StageStats:
+    __slots__ = ('count', 'total', 'max', 'buckets')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = [0] * len(BUCKETS)
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                self.buckets[i] += 1
+                break
+
+
+class Metrics:
+    def __init__(self, enabled=None):
+        self.enabled = metrics_enabled() if enabled is None else enabled
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.stages = {}
+        self.counters = {}
+
+    def span(self, name):
+        if not self.enabled:
+            return NULL_SPAN
+        return _Span(self, name)
+
+    def observe(self, name, seconds):
+        if not self.enabled:
+            return
+        with self.lock:
+            stats = self.stages.get(name)
+            if stats is None:
+                stats = self.stages[name] = StageStats()
+            stats.add(seconds)
+
+    def incr(self, name, n=1):
+        if not self.enabled:
+            return
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def reset(self):
+        with self.lock:
+            self.stages.clear()
+            self.counters.clear()
+            self.started = time.time()
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                "enabled": self.enabled,
+                "uptime": round(time.time() - self.started, 3),
+                "stages": {
+                    name: {
+                        "count": s.count,
+                        "total_ms": round(s.total * 1000, 3),
+                        "mean_ms": round(s.total / s.count * 1000, 3) if s.count else 0.0,
+                        "max_ms": round(s.max * 1000, 3),
+                    }
+                    for name, s in sorted(self.stages.items())
+                },
+                "counters": dict(sorted(self.counters.items()))
+            }
+
+    def prometheus(self):
+        """Prometheus text exposition format."""
+        lines = [
+            f"# HELP {PREFIX}_stage_seconds Time spent in each prediction stage.",
+            f"# TYPE {PREFIX}_stage_seconds histogram",
+        ]
+        with self.lock:
+            for name, s in sorted(self.stages.items()):
+                cumulative = 0
+                for bound, count in zip(BUCKETS, s.buckets):
+                    cumulative += count
+                    lines.append(f'{PREFIX}_stage_seconds_bucket{{stage="{name}",le="{bound}"}} {cumulative}')
+                lines.append(f'{PREFIX}_stage_seconds_bucket{{stage="{name}",le="+Inf"}} {s.count}')
+                lines.append(f'{PREFIX}_stage_seconds_sum{{stage="{name}"}} {s.total:.6f}')
+                lines.append(f'{PREFIX}_stage_seconds_count{{stage="{name}"}} {s.count}')
+            for name, value in sorted(self.counters.items()):
+                lines.append(f"# TYPE {PREFIX}_{name}_total counter")
+                lines.append(f"{PREFIX}_{name}_total {value}")
+        return "\n".join(lines) + "\n"
+
+    def trace_line(self):
+        """One line for stderr in CLI mode: per-stage total ms, then counters."""
+        snapshot = self.snapshot()
+        stages = " ".join(f"{name}={s['total_ms']:.1f}ms" for name, s in snapshot['stages'].items())
+        counters = " ".join(f"{name}={value}" for name, value in snapshot['counters'].items())
+        return f"[diagnochain trace] {stages} {counters}".rstrip()
+
+
+METRICS = Metrics()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Local CPU backends for the biomedical NER model (see ner_extractor.build_pipeline).
+
+- export: downloads NER_MODEL once and writes, into one directory,
+  the tokenizer and PyTorch weights (used by the "int8" backend, which
+  quantizes the Linear layers when it loads), model.onnx (the "onnx"
+  backend) and, unless --no-quantize, model_quantized.onnx with int8
+  dynamic quantization, which the "onnx" backend prefers
+- check: runs PARITY_SENTENCES through the full-precision pipeline and a
+  local backend and compares the entity lists ner_extractor keeps; exits
+  non-zero when more than --max-mismatches sentences differ
+
+Usage (from the ai-model folder):
+    python ner_export.py export                 # -> ner_model/
+    python ner_export.py check --backend onnx
+    python ner_export.py check --backend int8
+
+benchmarks/bench_ner_backends.py compares their latency and memory.
+"""
+import os
+import sys
+import argparse
+
+from ner_extractor import NER_MODEL, NER_MODEL_DIR, ONNX_FILE, build_pipeline, filter_entities
+
+PARITY_SENTENCES = [
+    "I have a severe headache and high fever.",
+    "Patient has severe chest pain and coughing.",
+    "My throat is sore and I keep sneezing with a runny nose.",
+    "She reports abdominal pain, nausea and vomiting since yesterday.",
+    "Shortness of breath when climbing stairs and a persistent dry cough.",
+    "Itchy skin rash on both arms with small blisters.",
+    "Burning sensation while urinating and lower back pain.",
+    "Joint pain and swelling in the knees, worse in the morning.",
+    "Dizziness, blurred vision and excessive thirst for two weeks.",
+    "Yellowing of the eyes, dark urine and loss of appetite.",
+    "High fever with chills, muscle aches and fatigue.",
+    "Chest tightness and wheezing at night.",
+    "Painful swallowing and swollen lymph nodes in the neck.",
+    "Weakness on the left side of the body and slurred speech.",
+    "Frequent loose stools, stomach cramps and dehydration.",
+    "Numbness and tingling in the feet.",
+    "Weight loss, night sweats and coughing up blood.",
+    "Red, watery eyes and sensitivity to light.",
+    "Palpitations and anxiety with a rapid heartbeat.",
+    "Constipation and bloating after meals.",
+]
+
+
+def export(out_dir=NER_MODEL_DIR, quantize=True):
+    from transformers import AutoModelForTokenClassification, AutoTokenizer
+    from optimum.onnxruntime import ORTModelForTokenClassification
+
+    AutoTokenizer.from_pretrained(NER_MODEL).save_pretrained(out_dir)
+    AutoModelForTokenClassification.from_pretrained(NER_MODEL).save_pretrained(out_dir)
+    ORTModelForTokenClassification.from_pretrained(NER_MODEL, export=True).save_pretrained(out_dir)
+
+    if quantize:
+        from optimum.onnxruntime import ORTQuantizer
+        from optimum.onnxruntime.configuration import AutoQuantizationConfig
+        quantizer = ORTQuantizer.from_pretrained(out_dir, file_name=ONNX_FILE)
+        config = AutoQuantizationConfig.avx2(is_static=False, per_channel=False)
+        quantizer.quantize(save_dir=out_dir, quantization_config=config)
+    return out_dir
+
+
+def entity_lists(ner_pipeline, sentences, batch_size=8):
+    return [filter_entities(entities) for entities in ner_pipeline(list(sentences), batch_size=batch_size)]
+
+
+def check_parity(backend, model_dir=NER_MODEL_DIR, max_mismatches=0):
+    import warnings
+    warnings.filterwarnings("ignore")
+
+    expected = entity_lists(build_pipeline('torch'), PARITY_SENTENCES)
+    actual = entity_lists(build_pipeline(backend, model_dir), PARITY_SENTENCES)
+
+    mismatches = 0
+    for sentence, want, got in zip(PARITY_SENTENCES, expected, actual):
+        if sorted(want) != sorted(got):
+            mismatches += 1
+            print(f"MISMATCH {sentence!r}\n  torch:   {want}\n  {backend + ':':<8} {got}")
+
+    print(f"sentences checked:   {len(PARITY_SENTENCES)}")
+    print(f"mismatching:         {mismatches}")
+    return mismatches <= max_mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export and check local NER backends")
+    parser.add_argument('command', choices=['export', 'check'])
+    parser.add_argument('--out', default=NER_MODEL_DIR, help="model directory")
+    parser.add_argument('--backend', choices=['onnx', 'int8'], default='onnx')
+    parser.add_argument('--no-quantize', action='store_true')
+    parser.add_argument('--max-mismatches', type=int, default=0)
+    args = parser.parse_args()
+
+    if args.command == 'export':
+        path = export(args.out, quantize=not args.no_quantize)
+        print(f"NER model exported to {os.path.abspath(path)}")
+    else:
+        ok = check_parity(args.backend, args.out, args.max_mismatches)
+        print("PARITY OK" if ok else "PARITY FAILED")
+        sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
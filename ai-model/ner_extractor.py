@@ -1,31 +1,281 @@
-from transformers import pipeline
-
-class MedicalNER:
-    def __init__(self):  # FIXED: Double underscore
-        # Silent loading - no print to avoid API issues
-        self.ner_pipeline = pipeline(
-            "token-classification", 
-            model="d4data/biomedical-ner-all", 
-            aggregation_strategy="simple"
+"""
+Optional transformers NER for symptom extraction.
+
+Every backend takes whole batches: submit(texts) returns a Future of one
+entity list per text. Calls that arrive while a forward pass is running are
+queued and coalesced into the next pass, which runs on the backend's own
+thread, so callers can keep doing dictionary extraction meanwhile.
+DIAGNOCHAIN_NER_BATCH_SIZE sets the pipeline batch size and
+DIAGNOCHAIN_NER_THREADS caps torch's intra-op threads.
+
+DIAGNOCHAIN_NER_POLICY decides when callers run NER at all: "uncovered"
+(default) skips it when the dictionary extractor explained every content
+word, "always" runs it on every text.
+
+DIAGNOCHAIN_NER_BACKEND picks the inference engine:
+- "torch" (default): the full-precision pipeline for NER_MODEL
+- "onnx": ONNX Runtime on the export in DIAGNOCHAIN_NER_MODEL_DIR, the int8
+  model_quantized.onnx when it exists (needs optimum[onnxruntime])
+- "int8": the PyTorch weights in DIAGNOCHAIN_NER_MODEL_DIR with their
+  Linear layers dynamically quantized to int8
+The local backends never touch the network; create the directory once
+with `python ner_export.py export` and compare with `python ner_export.py check`.
+"""
+import os
+import sys
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+NER_MODEL = "d4data/biomedical-ner-all"
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+NER_MODEL_DIR = os.environ.get('DIAGNOCHAIN_NER_MODEL_DIR', os.path.join(SCRIPT_DIR, 'ner_model'))
+ONNX_QUANTIZED_FILE = 'model_quantized.onnx'
+ONNX_FILE = 'model.onnx'
+NER_GROUPS = ['Sign_symptom', 'Diagnostic_procedure', 'Biological_structure']
+NER_BATCH_SIZE = int(os.environ.get('DIAGNOCHAIN_NER_BATCH_SIZE', '16'))
+NER_THREADS = int(os.environ.get('DIAGNOCHAIN_NER_THREADS', str(min(4, os.cpu_count() or 1))))
+
+# DIAGNOCHAIN_NER: "on" (load in this process on first use), "off", or
+# "process" (run the pipeline in a child process)
+NER_MODES = ('on', 'off', 'process')
+NER_POLICIES = ('uncovered', 'always')
+NER_BACKENDS = ('torch', 'onnx', 'int8')
+
+
+def ner_mode():
+    mode = os.environ.get('DIAGNOCHAIN_NER', 'on').strip().lower()
+    return mode if mode in NER_MODES else 'on'
+
+
+def ner_backend():
+    backend = os.environ.get('DIAGNOCHAIN_NER_BACKEND', 'torch').strip().lower()
+    return backend if backend in NER_BACKENDS else 'torch'
+
+
+def build_pipeline(backend='torch', model_dir=NER_MODEL_DIR, num_threads=NER_THREADS):
+    """The token-classification pipeline for one backend; local backends load from model_dir only."""
+    from transformers import pipeline
+
+    if backend == 'onnx':
+        import onnxruntime
+        from optimum.onnxruntime import ORTModelForTokenClassification
+        from transformers import AutoTokenizer
+        options = onnxruntime.SessionOptions()
+        if num_threads > 0:
+            options.intra_op_num_threads = num_threads
+        quantized = os.path.exists(os.path.join(model_dir, ONNX_QUANTIZED_FILE))
+        model = ORTModelForTokenClassification.from_pretrained(
+            model_dir, file_name=ONNX_QUANTIZED_FILE if quantized else ONNX_FILE,
+            session_options=options, local_files_only=True
         )
+        tokenizer = AutoTokenizer.from_pretrained(model_dir, local_files_only=True)
+    else:
+        import torch
+        if num_threads > 0:
+            torch.set_num_threads(num_threads)
+        if backend == 'int8':
+            from transformers import AutoModelForTokenClassification, AutoTokenizer
+            model = AutoModelForTokenClassification.from_pretrained(model_dir, local_files_only=True)
+            model = torch.quantization.quantize_dynamic(model.eval(), {torch.nn.Linear}, dtype=torch.qint8)
+            tokenizer = AutoTokenizer.from_pretrained(model_dir, local_files_only=True)
+        else:
+            model, tokenizer = NER_MODEL, None
+
+    return pipeline("token-classification", model=model, tokenizer=tokenizer, aggregation_strategy="simple")
+
+
+def ner_policy():
+    policy = os.environ.get('DIAGNOCHAIN_NER_POLICY', 'uncovered').strip().lower()
+    return policy if policy in NER_POLICIES else 'uncovered'
+
+
+def filter_entities(entities):
+    return [entity['word'].strip() for entity in entities if entity['entity_group'] in NER_GROUPS]
+
+
+class CoalescingNER:
+    """Batches submitted texts and runs them through run_batch(texts) on one thread."""
+
+    enabled = True
+
+    def __init__(self):
+        self._pending = []
+        self._scheduled = False
+        self._pending_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='ner')
+
+    def run_batch(self, texts):
+        raise NotImplementedError
+
+    def submit(self, texts):
+        future = Future()
+        texts = list(texts)
+        if not texts or not self.enabled:
+            future.set_result([[] for _ in texts])
+            return future
+        with self._pending_lock:
+            self._pending.append((texts, future))
+            if not self._scheduled:
+                self._scheduled = True
+                self._executor.submit(self._drain)
+        return future
+
+    def _drain(self):
+        while True:
+            with self._pending_lock:
+                batch, self._pending = self._pending, []
+                if not batch:
+                    self._scheduled = False
+                    return
+            texts = [text for request_texts, _ in batch for text in request_texts]
+            try:
+                results = self.run_batch(texts)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            offset = 0
+            for request_texts, future in batch:
+                future.set_result(results[offset:offset + len(request_texts)])
+                offset += len(request_texts)
+
+    def extract_symptoms_batch(self, texts):
+        return self.submit(texts).result()
 
     def extract_symptoms(self, text):
         """
         Input: "I have a severe headache and high fever."
         Output: ['headache', 'high fever']
         """
-        results = self.ner_pipeline(text)
-        
-        extracted_symptoms = []
-        
-        for entity in results:
-            if entity['entity_group'] in ['Sign_symptom', 'Diagnostic_procedure', 'Biological_structure']:
-                clean_word = entity['word'].strip()
-                extracted_symptoms.append(clean_word)
-                
-        return extracted_symptoms
+        return self.extract_symptoms_batch([text])[0]
+
+
+class MedicalNER(CoalescingNER):
+    def __init__(self, batch_size=NER_BATCH_SIZE, num_threads=NER_THREADS, backend=None,
+                 model_dir=NER_MODEL_DIR):  # FIXED: Double underscore
+        super().__init__()
+        self.backend = backend or ner_backend()
+        self.model_dir = model_dir
+        # The transformers pipeline is only built on first use
+        self._pipeline = None
+        self._unavailable = False
+        self._lock = threading.Lock()
+        self.batch_size = max(1, batch_size)
+        self.num_threads = num_threads
+
+    @property
+    def ner_pipeline(self):
+        if self._pipeline is None:
+            with self._lock:
+                if self._pipeline is None:
+                    # Silent loading - no print to avoid API issues
+                    self._pipeline = build_pipeline(self.backend, self.model_dir, self.num_threads)
+        return self._pipeline
+
+    @property
+    def enabled(self):
+        return not self._unavailable
+
+    def run_batch(self, texts):
+        results = [[] for _ in texts]
+        if self._unavailable:
+            return results
+        try:
+            ner_pipeline = self.ner_pipeline
+        except ImportError as e:
+            # transformers is optional: keep the dictionary extractor running
+            print(f"NER disabled, transformers not available: {e}", file=sys.stderr)
+            self._unavailable = True
+            return results
+        except OSError as e:
+            # e.g. a local backend without an exported model directory
+            print(f"NER disabled, could not load the {self.backend} model: {e}", file=sys.stderr)
+            self._unavailable = True
+            return results
+
+        # The pipeline rejects empty strings
+        rows = [i for i, text in enumerate(texts) if text and text.strip()]
+        if rows:
+            entities = ner_pipeline([texts[i] for i in rows], batch_size=self.batch_size)
+            for i, text_entities in zip(rows, entities):
+                results[i] = filter_entities(text_entities)
+        return results
+
+
+class DisabledNER:
+    enabled = False
+
+    def submit(self, texts):
+        future = Future()
+        future.set_result([[] for _ in texts])
+        return future
+
+    def extract_symptoms_batch(self, texts):
+        return [[] for _ in texts]
+
+    def extract_symptoms(self, text):
+        return []
+
+
+def _serve_ner(conn):
+    ner = MedicalNER()
+    while True:
+        try:
+            texts = conn.recv()
+        except EOFError:
+            break
+        if texts is None:
+            break
+        try:
+            conn.send(ner.run_batch(texts))
+        except Exception as e:
+            conn.send(e)
+
+
+class ProcessMedicalNER(CoalescingNER):
+    """MedicalNER running in a child process, so its memory and import cost stay out of this one."""
+
+    def __init__(self):
+        super().__init__()
+        self._process = None
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _start(self):
+        import multiprocessing
+        ctx = multiprocessing.get_context('spawn')
+        self._conn, child_conn = ctx.Pipe()
+        self._process = ctx.Process(target=_serve_ner, args=(child_conn,), daemon=True)
+        self._process.start()
+        child_conn.close()
+
+    def run_batch(self, texts):
+        with self._lock:
+            if self._process is None or not self._process.is_alive():
+                self._start()
+            self._conn.send(list(texts))
+            result = self._conn.recv()
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    def close(self):
+        with self._lock:
+            if self._process is not None and self._process.is_alive():
+                self._conn.send(None)
+                self._process.join(timeout=5)
+            self._process = None
+
+
+def create_ner(mode=None):
+    mode = mode or ner_mode()
+    if mode == 'off':
+        return DisabledNER()
+    if mode == 'process':
+        return ProcessMedicalNER()
+    return MedicalNER()
 
 # Test it if running directly
 if __name__ == "__main__":  # FIXED: Double underscore
     ai = MedicalNER()
-    print(ai.extract_symptoms("Patient has severe chest pain and coughing."))
\ No newline at end of file
+    print(ai.extract_symptoms("Patient has severe chest pain and coughing."))
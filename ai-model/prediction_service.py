@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Asyncio HTTP front end for the prediction worker (standard library only).
+
+Endpoints:
+    POST /predict         {"symptoms": "fever and cough"}
+                          -> 200 [...]  (the list api_predict.py prints)
+                          -> 400 {"error": "..."}
+    POST /predict/batch   {"symptoms": ["fever and cough", "batuk"]}
+                          -> 200 {"results": [{"predictions": [...]}, {"error": "..."}]}
+    GET  /health          -> worker health, plus in-flight counters
+    GET  /metrics         -> stage timings and counters, Prometheus text format
+    GET  /metrics.json    -> the same as JSON (metrics.Metrics.snapshot)
+With --proofs (or DIAGNOCHAIN_PROOFS=1), diagnoses are also collected into
+Merkle-root batches on chain (proof_batcher.py):
+    POST /proofs          {"id": "...", "symptoms": "...", "predictions": [...], "wait": true}
+                          -> 200 the record's inclusion proof, or {"status": "pending", ...}
+                             if its batch is not mined yet ("wait" waits up to --timeout)
+    GET  /proofs/<id>     -> 200 the same, 404 for an unknown id
+
+The event loop never runs model code: single predictions go through the
+worker's MicroBatcher thread and are awaited as futures, batch requests run
+in a bounded thread pool. Backpressure: once more than --max-inflight texts
+are being scored, new requests get 503 with Retry-After. Each request has
+--timeout seconds to finish (504 otherwise); the work itself still
+completes in the background.
+
+Start it from the ai-model folder:  python prediction_service.py --port 8000
+"""
+import os
+import sys
+import json
+import asyncio
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from urllib.parse import unquote
+
+from metrics import METRICS
+from prediction_worker import DEFAULT_MAX_BATCH_SIZE, DEFAULT_MAX_WAIT_MS, SCRIPT_DIR, PredictionWorker
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = int(os.environ.get('DIAGNOCHAIN_SERVICE_PORT', '8000'))
+DEFAULT_MAX_INFLIGHT = int(os.environ.get('DIAGNOCHAIN_SERVICE_MAX_INFLIGHT', '256'))
+DEFAULT_TIMEOUT = float(os.environ.get('DIAGNOCHAIN_SERVICE_TIMEOUT', '30'))
+DEFAULT_POOL_SIZE = int(os.environ.get('DIAGNOCHAIN_SERVICE_POOL_SIZE', '4'))
+DEFAULT_PROOFS = os.environ.get('DIAGNOCHAIN_PROOFS', '0') == '1'
+MAX_BODY_BYTES = 1 << 20
+HEADER_TIMEOUT = 10.0
+JSON_CONTENT_TYPE = 'application/json; charset=utf-8'
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message, headers=None):
+        super().__init__(message)
+        self.status = status
+        self.headers = headers or {}
+
+
+class PlainText:
+    """A non-JSON response body (dispatch returns these for /metrics)."""
+
+    def __init__(self, text, content_type):
+        self.text = text
+        self.content_type = content_type
+
+
+class PredictionService:
+    def __init__(self, worker, max_inflight=DEFAULT_MAX_INFLIGHT, timeout=DEFAULT_TIMEOUT,
+                 pool_size=DEFAULT_POOL_SIZE, proofs=None):
+        self.worker = worker
+        self.proofs = proofs
+        self.max_inflight = max(1, max_inflight)
+        self.timeout = timeout
+        self.pool = ThreadPoolExecutor(max_workers=max(1, pool_size), thread_name_prefix='predict-batch')
+        self.inflight = 0
+        self.rejected = 0
+        self.timed_out = 0
+
+    def _admit(self, n_texts):
+        if self.inflight + n_texts > self.max_inflight and self.inflight:
+            self.rejected += 1
+            raise HTTPError(HTTPStatus.SERVICE_UNAVAILABLE, "Prediction service is busy, retry shortly",
+                            {'Retry-After': '1'})
+        self.inflight += n_texts
+
+    def _release(self, n_texts, future):
+        self.inflight -= n_texts
+        # Nobody awaits work that timed out; take its exception here so asyncio does not log it
+        if not future.cancelled():
+            future.exception()
+
+    async def _run(self, n_texts, start):
+        """
+        Admit n_texts, then start() the work, so rejected requests are never
+        scored. The slots are held until the work itself finishes, not just
+        until the request times out, so slow work still counts against
+        max_inflight.
+        """
+        self._admit(n_texts)
+        try:
+            work = start()
+        except BaseException:
+            self.inflight -= n_texts
+            raise
+        work.add_done_callback(lambda future: self._release(n_texts, future))
+        try:
+            # Shielded: cancelling a batcher future would break its set_result
+            return await asyncio.wait_for(asyncio.shield(work), self.timeout)
+        except asyncio.TimeoutError:
+            self.timed_out += 1
+            raise HTTPError(HTTPStatus.GATEWAY_TIMEOUT, "Prediction timed out")
+
+    async def predict(self, body):
+        symptoms_text = body.get('symptoms')
+        if not symptoms_text or not isinstance(symptoms_text, str):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "No symptoms provided")
+        response = await self._run(1, lambda: asyncio.wrap_future(self.worker.batcher.submit(symptoms_text)))
+        if 'error' in response:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, response['error'])
+        return response['predictions']
+
+    async def predict_batch(self, body):
+        texts = body.get('symptoms')
+        if not isinstance(texts, list) or not all(isinstance(t, str) for t in texts):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "predict/batch expects a list of symptom texts")
+        if not texts:
+            return {"results": []}
+        loop = asyncio.get_running_loop()
+        results = await self._run(len(texts), lambda: loop.run_in_executor(self.pool, self.worker.predict_batch, texts))
+        return {"results": results}
+
+    async def submit_proof(self, body):
+        record_id, symptoms_text = body.get('id'), body.get('symptoms')
+        if not isinstance(record_id, (str, int)) or not str(record_id):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "No record id provided")
+        if not symptoms_text or not isinstance(symptoms_text, str):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "No symptoms provided")
+        if 'predictions' not in body:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "No predictions provided")
+        future = self.proofs.add(record_id, symptoms_text, body['predictions'])
+        if body.get('wait'):
+            try:
+                return await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), self.timeout)
+            except asyncio.TimeoutError:
+                pass
+        return self.proofs.proof(record_id)
+
+    def get_proof(self, record_id):
+        proof = self.proofs.proof(record_id)
+        if proof is None:
+            raise HTTPError(HTTPStatus.NOT_FOUND, f"No proof for record {record_id}")
+        return proof
+
+    def health(self):
+        health = self.worker.health()
+        health.update({
+            "inflight": self.inflight,
+            "max_inflight": self.max_inflight,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out
+        })
+        if self.proofs is not None:
+            health["proofs"] = self.proofs.stats()
+        return health
+
+    def _json_body(self, method, path, body):
+        if method != 'POST':
+            raise HTTPError(HTTPStatus.METHOD_NOT_ALLOWED, f"{path} expects POST", {'Allow': 'POST'})
+        try:
+            payload = json.loads(body or b'{}')
+        except ValueError as e:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, f"Invalid JSON: {e}")
+        if not isinstance(payload, dict):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Request body must be a JSON object")
+        return payload
+
+    def metrics(self):
+        snapshot = METRICS.snapshot()
+        snapshot["counters"].update({
+            "service_rejected": self.rejected,
+            "service_timed_out": self.timed_out
+        })
+        snapshot["inflight"] = self.inflight
+        return snapshot
+
+    def prometheus(self):
+        return METRICS.prometheus() + "\n".join([
+            "# TYPE diagnochain_service_inflight gauge",
+            f"diagnochain_service_inflight {self.inflight}",
+            "# TYPE diagnochain_service_rejected_total counter",
+            f"diagnochain_service_rejected_total {self.rejected}",
+            "# TYPE diagnochain_service_timed_out_total counter",
+            f"diagnochain_service_timed_out_total {self.timed_out}",
+        ]) + "\n"
+
+    async def dispatch(self, method, path, body):
+        path = path.split('?', 1)[0].rstrip('/') or '/'
+        if path == '/health' and method == 'GET':
+            return self.health()
+        if path == '/metrics' and method == 'GET':
+            return PlainText(self.prometheus(), PROMETHEUS_CONTENT_TYPE)
+        if path == '/metrics.json' and method == 'GET':
+            return self.metrics()
+        if path in ('/predict', '/predict/batch'):
+            payload = self._json_body(method, path, body)
+            if path == '/predict':
+                return await self.predict(payload)
+            return await self.predict_batch(payload)
+        if path == '/proofs' or path.startswith('/proofs/'):
+            if self.proofs is None:
+                raise HTTPError(HTTPStatus.NOT_FOUND, "Proof batching is not enabled (start with --proofs)")
+            if path == '/proofs':
+                return await self.submit_proof(self._json_body(method, path, body))
+            if method != 'GET':
+                raise HTTPError(HTTPStatus.METHOD_NOT_ALLOWED, f"{path} expects GET", {'Allow': 'GET'})
+            return self.get_proof(unquote(path[len('/proofs/'):]))
+        raise HTTPError(HTTPStatus.NOT_FOUND, f"Unknown path: {path}")
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                request = await self._read_request(reader)
+                if request is None:
+                    break
+                method, path, headers, body = request
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                try:
+                    status, payload, extra = HTTPStatus.OK, await self.dispatch(method, path, body), {}
+                except HTTPError as e:
+                    status, payload, extra = e.status, {"error": str(e)}, e.headers
+                except Exception as e:
+                    status, payload, extra = HTTPStatus.INTERNAL_SERVER_ERROR, {"error": str(e)}, {}
+                await self._write_response(writer, status, payload, extra, keep_alive)
+                if not keep_alive:
+                    break
+        except HTTPError as e:
+            await self._write_response(writer, e.status, {"error": str(e)}, e.headers, False)
+        except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def _read_request(self, reader):
+        try:
+            request_line = await asyncio.wait_for(reader.readline(), HEADER_TIMEOUT)
+        except asyncio.TimeoutError:
+            return None
+        if not request_line.strip():
+            return None
+        try:
+            method, path, _ = request_line.decode('latin-1').split(None, 2)
+        except ValueError:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Malformed request line")
+
+        headers = {}
+        while True:
+            line = await asyncio.wait_for(reader.readline(), HEADER_TIMEOUT)
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        try:
+            length = int(headers.get('content-length') or 0)
+        except ValueError:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Invalid Content-Length")
+        if length > MAX_BODY_BYTES:
+            raise HTTPError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "Request body too large")
+        body = await asyncio.wait_for(reader.readexactly(length), self.timeout) if length else b''
+        return method.upper(), path, headers, body
+
+    async def _write_response(self, writer, status, payload, extra_headers, keep_alive):
+        if isinstance(payload, PlainText):
+            body, content_type = payload.text.encode('utf-8'), payload.content_type
+        else:
+            body, content_type = json.dumps(payload, ensure_ascii=False).encode('utf-8'), JSON_CONTENT_TYPE
+        status = HTTPStatus(status)
+        lines = [
+            f"HTTP/1.1 {status.value} {status.phrase}",
+            f"Content-Type: {content_type}",
+            f"Content-Length: {len(body)}",
+            f"Connection: {'keep-alive' if keep_alive else 'close'}",
+        ]
+        lines += [f"{name}: {value}" for name, value in extra_headers.items()]
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode('latin-1') + body)
+        await writer.drain()
+
+
+async def serve(service, host, port):
+    server = await asyncio.start_server(service.handle_connection, host, port)
+    print(f"Prediction service listening on http://{host}:{port}", file=sys.stderr)
+    async with server:
+        await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="DiagnoChain asyncio HTTP prediction service")
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--max-inflight', type=int, default=DEFAULT_MAX_INFLIGHT)
+    parser.add_argument('--timeout', type=float, default=DEFAULT_TIMEOUT)
+    parser.add_argument('--pool-size', type=int, default=DEFAULT_POOL_SIZE)
+    parser.add_argument('--max-batch-size', type=int, default=DEFAULT_MAX_BATCH_SIZE)
+    parser.add_argument('--max-wait-ms', type=float, default=DEFAULT_MAX_WAIT_MS)
+    parser.add_argument('--proofs', action='store_true', default=DEFAULT_PROOFS,
+                        help="batch diagnosis proofs on chain (needs web3 and CONTRACT_ADDRESS)")
+    args = parser.parse_args()
+
+    # Model and CSV paths are relative to the ai-model folder
+    os.chdir(SCRIPT_DIR)
+    proofs = None
+    if args.proofs:
+        from proof_batcher import ProofBatcher, Web3Submitter
+        proofs = ProofBatcher(Web3Submitter())
+    worker = PredictionWorker(max_batch_size=args.max_batch_size, max_wait_ms=args.max_wait_ms)
+    service = PredictionService(worker, args.max_inflight, args.timeout, args.pool_size, proofs)
+    try:
+        asyncio.run(serve(service, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
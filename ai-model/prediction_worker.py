@@ -0,0 +1,375 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Long-lived prediction worker
+Loads the predictor once and answers JSON-lines requests, either over a
+local TCP socket (default) or over stdin/stdout (--stdio).
+
+Request:  {"id": 1, "op": "predict", "symptoms": "fever and cough"}
+          {"op": "predict_batch", "symptoms": ["fever and cough", "batuk"]}
+          {"op": "health"}             (includes result/text cache counters)
+          {"op": "metrics"}            (stage timings and counters, see metrics.py)
+          {"op": "reload"}
+Response: {"id": 1, "predictions": [...]}   (same list api_predict.py prints)
+          {"results": [{"predictions": [...]}, {"error": "..."}]}
+          {"id": 1, "error": "..."}
+
+Concurrent predict requests are coalesced into micro-batches of at most
+--max-batch-size texts, waiting at most --max-wait-ms for a batch to fill.
+With --workers N (or DIAGNOCHAIN_WORKERS) the socket is served by a
+preforked pool of N processes sharing one loaded model (worker_pool.py).
+
+Start it from the ai-model folder:  python prediction_worker.py --port 8765
+"""
+import sys
+import os
+import json
+import time
+import signal
+import argparse
+import threading
+import contextlib
+import socketserver
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from metrics import METRICS
+
+os.environ.setdefault('TF_CPP_MIN_LOG_LEVEL', '3')
+os.environ.setdefault('TRANSFORMERS_VERBOSITY', 'error')
+
+import warnings
+warnings.filterwarnings('ignore')
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+DEFAULT_MAX_BATCH_SIZE = int(os.environ.get('DIAGNOCHAIN_MAX_BATCH_SIZE', '32'))
+DEFAULT_MAX_WAIT_MS = float(os.environ.get('DIAGNOCHAIN_MAX_WAIT_MS', '5'))
+DEFAULT_WORKERS = int(os.environ.get('DIAGNOCHAIN_WORKERS', '0'))
+
+
+def worker_address():
+    """Return (host, port) from DIAGNOCHAIN_WORKER_ADDR, e.g. '127.0.0.1:8765'."""
+    addr = os.environ.get('DIAGNOCHAIN_WORKER_ADDR', f"{DEFAULT_HOST}:{DEFAULT_PORT}")
+    host, _, port = addr.rpartition(':')
+    return (host or DEFAULT_HOST), int(port)
+
+
+def format_predictions(predictor, result):
+    """Turn InferencePredictor.predict() output into the list Node.js expects."""
+    predictions = []
+
+    # Add primary diagnosis
+    primary = {
+        "disease": result.get("primary_diagnosis", "Unknown"),
+        "confidence": result.get("confidence", 0) / 100 if isinstance(result.get("confidence"), (int, float)) else 0,
+        "description": result.get("description", "No description available"),
+        "precautions": result.get("precautions", [])
+    }
+    predictions.append(primary)
+
+    # Add alternatives
+    for alt in result.get("alternatives", []):
+        alt_pred = {
+            "disease": alt.get("disease", "Unknown"),
+            "confidence": alt.get("confidence", 0) / 100 if isinstance(alt.get("confidence"), (int, float)) else 0,
+            "description": predictor.description_list.get(alt.get("disease", ""), "No description available"),
+            "precautions": predictor.precautionDictionary.get(alt.get("disease", ""), [])
+        }
+        predictions.append(alt_pred)
+
+    return predictions
+
+
+def format_results(predictor, results):
+    """predict_batch() output -> one {"predictions": [...]} or {"error": ...} per text."""
+    responses = []
+    for result in results:
+        if isinstance(result, dict) and 'error' in result:
+            responses.append({"error": result['error']})
+        else:
+            responses.append({"predictions": format_predictions(predictor, result)})
+    return responses
+
+
+def load_predictor(log=None):
+    """
+    InferencePredictor when the compiled arrays are current (no scikit-learn
+    or pandas import), otherwise DiseasePredictor, which can load the pickle
+    or train.
+    """
+    # The predictors print progress to stdout; keep it off the protocol stream
+    with contextlib.redirect_stdout(log or sys.stderr), METRICS.span('load_predictor'):
+        from inference import InferencePredictor, can_load_compiled
+        if can_load_compiled():
+            return InferencePredictor()
+        from train_model import DiseasePredictor
+        return DiseasePredictor()
+
+
+class MicroBatcher:
+    """
+    Collects items submitted from many threads and hands them to
+    batch_fn(items) -> results in groups of at most max_batch_size.
+    A batch is flushed when it is full or max_wait seconds after its first item.
+    If batch_fn raises for a batch, its items are retried one by one, so only
+    the item that fails gets the exception.
+    """
+
+    def __init__(self, batch_fn, max_batch_size=DEFAULT_MAX_BATCH_SIZE, max_wait=DEFAULT_MAX_WAIT_MS / 1000):
+        self.batch_fn = batch_fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait)
+        self.pending = []
+        self.cond = threading.Condition()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def submit(self, item):
+        future = Future()
+        with self.cond:
+            self.pending.append((item, future))
+            self.cond.notify()
+        return future
+
+    def __call__(self, item):
+        return self.submit(item).result()
+
+    def _next_batch(self):
+        with self.cond:
+            while not self.pending:
+                self.cond.wait()
+            deadline = time.monotonic() + self.max_wait
+            while len(self.pending) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self.cond.wait(remaining)
+            batch = self.pending[:self.max_batch_size]
+            del self.pending[:self.max_batch_size]
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            items = [item for item, _ in batch]
+            try:
+                results = self.batch_fn(items)
+            except Exception as e:
+                if len(batch) == 1:
+                    batch[0][1].set_exception(e)
+                else:
+                    self._run_singly(batch)
+                continue
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
+
+    def _run_singly(self, batch):
+        for item, future in batch:
+            try:
+                future.set_result(self.batch_fn([item])[0])
+            except Exception as e:
+                future.set_exception(e)
+
+
+class PredictionWorker:
+    """Holds one loaded predictor (see load_predictor) and answers protocol messages."""
+
+    def __init__(self, log=None, max_batch_size=DEFAULT_MAX_BATCH_SIZE, max_wait_ms=DEFAULT_MAX_WAIT_MS,
+                 predictor=None):
+        self.log = log
+        self.lock = threading.Lock()
+        self.reload_lock = threading.Lock()
+        # worker_pool.py passes the predictor its parent loaded before forking
+        self.predictor = predictor or load_predictor(log)
+        self.loaded_at = time.time()
+        self.requests_served = 0
+        self.batches_served = 0
+        self.batcher = MicroBatcher(self.predict_batch, max_batch_size, max_wait_ms / 1000)
+
+    def reload(self):
+        """Build a fresh predictor, then swap it in; in-flight requests keep the old one."""
+        with self.reload_lock:
+            predictor = load_predictor(self.log)
+            with self.lock:
+                self.predictor = predictor
+                self.loaded_at = time.time()
+
+    def predict_batch(self, texts):
+        with self.lock:
+            predictor = self.predictor
+            self.requests_served += len(texts)
+            self.batches_served += 1
+
+        results = predictor.predict_batch(texts)
+        return format_results(predictor, results)
+
+    def predict(self, symptoms_text):
+        return self.batcher(symptoms_text)
+
+    def health(self):
+        with self.lock:
+            return {
+                "status": "ok",
+                "pid": os.getpid(),
+                "model_path": os.path.abspath(self.predictor.model_path),
+                "loaded_at": self.loaded_at,
+                "uptime": round(time.time() - self.loaded_at, 3),
+                "requests_served": self.requests_served,
+                "batches_served": self.batches_served,
+                "cache": self.predictor.cache_stats()
+            }
+
+    def handle(self, message):
+        try:
+            op = message.get('op', 'predict')
+            if op == 'predict':
+                symptoms_text = message.get('symptoms')
+                if not symptoms_text:
+                    response = {"error": "No symptoms provided"}
+                elif not isinstance(symptoms_text, str):
+                    response = {"error": "symptoms must be a string"}
+                else:
+                    response = self.predict(symptoms_text)
+            elif op == 'predict_batch':
+                texts = message.get('symptoms')
+                if not isinstance(texts, list) or not all(isinstance(t, str) for t in texts):
+                    response = {"error": "predict_batch expects a list of symptom texts"}
+                else:
+                    response = {"results": self.predict_batch(texts)}
+            elif op == 'health':
+                response = self.health()
+            elif op == 'metrics':
+                response = METRICS.snapshot()
+            elif op == 'reload':
+                self.reload()
+                response = self.health()
+            else:
+                response = {"error": f"Unknown op: {op}"}
+        except Exception as e:
+            response = {"error": str(e)}
+
+        if 'id' in message:
+            response['id'] = message['id']
+        return response
+
+    def handle_line(self, line):
+        try:
+            message = json.loads(line)
+            if not isinstance(message, dict):
+                raise ValueError("request must be a JSON object")
+        except ValueError as e:
+            return {"error": f"Invalid request: {e}"}
+        return self.handle(message)
+
+
+class _LineHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for raw in self.rfile:
+            line = raw.decode('utf-8').strip()
+            if not line:
+                continue
+            response = self.server.worker.handle_line(line)
+            self.wfile.write((json.dumps(response, ensure_ascii=False) + "\n").encode('utf-8'))
+            self.wfile.flush()
+            if getattr(self.server, 'draining', False):
+                # worker_pool.py is replacing this process
+                break
+
+
+class WorkerServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address, worker):
+        self.worker = worker
+        super().__init__(address, _LineHandler)
+
+
+def serve_stdio(worker):
+    """Answer each line on its own thread so queued lines can share a batch; match replies by id."""
+    out = sys.stdout
+    sys.stdout = sys.stderr
+    write_lock = threading.Lock()
+
+    def answer(line):
+        response = json.dumps(worker.handle_line(line), ensure_ascii=False)
+        with write_lock:
+            out.write(response + "\n")
+            out.flush()
+
+    with ThreadPoolExecutor(max_workers=worker.batcher.max_batch_size) as pool:
+        for raw in sys.stdin:
+            line = raw.strip()
+            if line:
+                pool.submit(answer, line)
+
+
+def request_worker(message, address=None, timeout=None):
+    """
+    Send one request to a running worker and return its response.
+    Returns None when no worker is listening, so callers can fall back.
+    """
+    import socket
+
+    if address is None:
+        address = worker_address()
+    if timeout is None:
+        timeout = float(os.environ.get('DIAGNOCHAIN_WORKER_TIMEOUT', '30'))
+
+    try:
+        sock = socket.create_connection(address, timeout=timeout)
+    except OSError:
+        return None
+
+    with sock:
+        sock.sendall((json.dumps(message, ensure_ascii=False) + "\n").encode('utf-8'))
+        with sock.makefile('rb') as f:
+            line = f.readline()
+    if not line:
+        return None
+    return json.loads(line.decode('utf-8'))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="DiagnoChain prediction worker")
+    parser.add_argument('--stdio', action='store_true', help="serve JSON lines on stdin/stdout")
+    parser.add_argument('--host', default=None)
+    parser.add_argument('--port', type=int, default=None)
+    parser.add_argument('--max-batch-size', type=int, default=DEFAULT_MAX_BATCH_SIZE)
+    parser.add_argument('--max-wait-ms', type=float, default=DEFAULT_MAX_WAIT_MS)
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS,
+                        help="serve with a preforked pool of this many processes (0: one process)")
+    args = parser.parse_args()
+    if args.workers and (args.stdio or not hasattr(os, 'fork')):
+        parser.error("--workers needs the TCP server and os.fork")
+
+    # Model and CSV paths are relative to the ai-model folder
+    os.chdir(SCRIPT_DIR)
+    host, port = worker_address()
+    address = (args.host or host, args.port or port)
+
+    if args.workers:
+        from worker_pool import WorkerPool
+        WorkerPool(address, args.workers, args.max_batch_size, args.max_wait_ms).run()
+        return
+
+    worker = PredictionWorker(max_batch_size=args.max_batch_size, max_wait_ms=args.max_wait_ms)
+
+    if hasattr(signal, 'SIGHUP'):
+        signal.signal(signal.SIGHUP, lambda *_: threading.Thread(target=worker.reload, daemon=True).start())
+
+    if args.stdio:
+        serve_stdio(worker)
+        return
+
+    with WorkerServer(address, worker) as server:
+        print(f"Prediction worker listening on {address[0]}:{address[1]}", file=sys.stderr)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,433 @@
+#!/usr/bin/env python3
+"""
+Batched on-chain proofs of stored diagnoses.
+
+Instead of one logPrediction transaction per diagnosis, each record becomes
+a leaf of a SHA-256 Merkle tree and only the tree's root is written, with
+UserRegistry.logPredictionBatch (smart_contract/contracts), once per
+DIAGNOCHAIN_PROOF_BATCH_SIZE records or DIAGNOCHAIN_PROOF_WINDOW seconds,
+whichever comes first. Any record can later be shown to be part of that
+root with its inclusion proof; verifyPrediction checks one on-chain.
+
+Hashing (the contract's verifyPrediction does the same):
+- record: {"id": ..., "symptoms": sha256(symptoms text), "predictions":
+  sha256(predictions as canonical JSON)}, serialized as canonical JSON
+  (sorted keys, no spaces). The symptoms hash is the same hex digest
+  server.js stored on-chain per record so far
+- leaf = sha256(0x00 || record), inner node = sha256(0x01 || left || right);
+  the prefixes keep a leaf from ever passing for an inner node
+- an odd node at the end of a level is promoted unchanged, so a proof has
+  one sibling per level where a sibling exists, and checking it needs the
+  batch's leaf count
+
+Submitted batches are appended to DIAGNOCHAIN_PROOF_STORE (JSON lines), so
+proofs survive restarts. Chain access goes through web3 (optional, imported
+on first use), configured like server.js: ETHEREUM_NETWORK_URL,
+CONTRACT_ADDRESS and SERVER_PRIVATE_KEY. Without a private key the node's
+first unlocked account sends the transaction, as on a local Hardhat node.
+logPredictionBatch only accepts the contract's deployer (owner) or a
+registered doctor, so the key must belong to one of them.
+
+prediction_service.py --proofs serves POST /proofs and GET /proofs/<id>.
+
+Usage (from the ai-model folder), against `npx hardhat node` with the
+contract deployed by `npx hardhat run scripts/deploy.cjs --network localhost`:
+    python proof_batcher.py check --contract 0x5FbDB2315678afecb367f032d93F642f64180aa3
+
+`npx hardhat test` (from smart_contract) checks verifyPrediction against
+MerkleTree's proofs without a running node.
+"""
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+import threading
+from concurrent.futures import Future
+
+DEFAULT_BATCH_SIZE = int(os.environ.get('DIAGNOCHAIN_PROOF_BATCH_SIZE', '256'))
+DEFAULT_WINDOW = float(os.environ.get('DIAGNOCHAIN_PROOF_WINDOW', '10'))
+DEFAULT_STORE = os.environ.get('DIAGNOCHAIN_PROOF_STORE', 'proof_batches.jsonl')
+DEFAULT_RPC_URL = 'http://127.0.0.1:8545'
+RECEIPT_TIMEOUT = 120
+LEAF_PREFIX = b'\x00'
+NODE_PREFIX = b'\x01'
+
+# The part of UserRegistry's ABI this module uses
+PROOF_ABI = [
+    {
+        "inputs": [
+            {"internalType": "bytes32", "name": "_merkleRoot", "type": "bytes32"},
+            {"internalType": "uint256", "name": "_leafCount", "type": "uint256"}
+        ],
+        "name": "logPredictionBatch",
+        "outputs": [{"internalType": "uint256", "name": "", "type": "uint256"}],
+        "stateMutability": "nonpayable",
+        "type": "function"
+    },
+    {
+        "inputs": [
+            {"internalType": "uint256", "name": "_batchId", "type": "uint256"},
+            {"internalType": "bytes32", "name": "_leaf", "type": "bytes32"},
+            {"internalType": "uint256", "name": "_index", "type": "uint256"},
+            {"internalType": "bytes32[]", "name": "_proof", "type": "bytes32[]"}
+        ],
+        "name": "verifyPrediction",
+        "outputs": [{"internalType": "bool", "name": "", "type": "bool"}],
+        "stateMutability": "view",
+        "type": "function"
+    },
+    {
+        "anonymous": False,
+        "inputs": [
+            {"indexed": True, "internalType": "uint256", "name": "batchId", "type": "uint256"},
+            {"indexed": False, "internalType": "bytes32", "name": "merkleRoot", "type": "bytes32"},
+            {"indexed": False, "internalType": "uint256", "name": "leafCount", "type": "uint256"}
+        ],
+        "name": "PredictionBatchLogged",
+        "type": "event"
+    }
+]
+
+
+def _canonical(value):
+    return json.dumps(value, sort_keys=True, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+def _hex(digest):
+    return '0x' + bytes(digest).hex()
+
+
+def _unhex(value):
+    return bytes.fromhex(value[2:] if value.startswith('0x') else value)
+
+
+def leaf_hash(record_id, symptoms, predictions):
+    """32-byte leaf for one stored diagnosis."""
+    record = {
+        "id": str(record_id),
+        "symptoms": hashlib.sha256(symptoms.encode('utf-8')).hexdigest(),
+        "predictions": hashlib.sha256(_canonical(predictions)).hexdigest(),
+    }
+    return hashlib.sha256(LEAF_PREFIX + _canonical(record)).digest()
+
+
+def _parent(left, right):
+    return hashlib.sha256(NODE_PREFIX + left + right).digest()
+
+
+class MerkleTree:
+    def __init__(self, leaves):
+        if not leaves:
+            raise ValueError("a Merkle tree needs at least one leaf")
+        self.levels = [list(leaves)]
+        while len(self.levels[-1]) > 1:
+            level = self.levels[-1]
+            parents = [_parent(level[i], level[i + 1]) for i in range(0, len(level) - 1, 2)]
+            if len(level) % 2:
+                parents.append(level[-1])
+            self.levels.append(parents)
+
+    @property
+    def root(self):
+        return self.levels[-1][0]
+
+    def proof(self, index):
+        """Sibling hashes from the leaf up; promoted levels contribute none."""
+        path = []
+        for level in self.levels[:-1]:
+            sibling = index ^ 1
+            if sibling < len(level):
+                path.append(level[sibling])
+            index //= 2
+        return path
+
+
+def verify_proof(leaf, index, leaf_count, proof, root):
+    """Same walk as the contract's verifyPrediction."""
+    if not 0 <= index < leaf_count:
+        return False
+    node, used = leaf, 0
+    while leaf_count > 1:
+        if index % 2 == 1 or index + 1 < leaf_count:
+            if used == len(proof):
+                return False
+            sibling = proof[used]
+            used += 1
+            node = _parent(sibling, node) if index % 2 else _parent(node, sibling)
+        index //= 2
+        leaf_count = (leaf_count + 1) // 2
+    return used == len(proof) and node == root
+
+
+class Web3Submitter:
+    """Writes roots with logPredictionBatch and reads verifyPrediction."""
+
+    def __init__(self, url=None, contract_address=None, private_key=None):
+        from web3 import Web3
+
+        url = url or os.environ.get('ETHEREUM_NETWORK_URL') or DEFAULT_RPC_URL
+        contract_address = contract_address or os.environ.get('CONTRACT_ADDRESS')
+        if not contract_address:
+            raise ValueError("CONTRACT_ADDRESS is not set")
+        self.web3 = Web3(Web3.HTTPProvider(url))
+        self.contract = self.web3.eth.contract(address=Web3.to_checksum_address(contract_address), abi=PROOF_ABI)
+        private_key = private_key if private_key is not None else os.environ.get('SERVER_PRIVATE_KEY')
+        self.account = self.web3.eth.account.from_key(private_key) if private_key else None
+        self.lock = threading.Lock()
+        # root -> {"tx_hash", "nonce", "from_block"} of a transaction not confirmed yet
+        self.sent = {}
+
+    def submit(self, root, leaf_count):
+        """
+        Log one root and wait for its receipt. A root whose receipt timed out
+        is not simply sent again: its earlier transaction is waited for while
+        the node still knows it, a PredictionBatchLogged event already carrying
+        the root is taken as the result, and only otherwise is it resent, on
+        the same nonce while that is unused, so a root is anchored once.
+        """
+        with self.lock:
+            sent = self.sent.get(root)
+            tx_hash = self._earlier_transaction(root, sent) if sent else None
+            if tx_hash is None:
+                tx_hash = self._send(root, leaf_count, sent)
+        receipt = self.web3.eth.wait_for_transaction_receipt(tx_hash, timeout=RECEIPT_TIMEOUT)
+        with self.lock:
+            self.sent.pop(root, None)
+        if receipt['status'] != 1:
+            raise RuntimeError(f"logPredictionBatch reverted in {_hex(tx_hash)}")
+        logged = self.contract.events.PredictionBatchLogged().process_receipt(receipt)
+        return {
+            "batch_id": int(logged[0]['args']['batchId']),
+            "tx_hash": _hex(receipt['transactionHash']),
+            "block_number": int(receipt['blockNumber']),
+        }
+
+    def _earlier_transaction(self, root, sent):
+        """Hash of a transaction that logged or may still log root, or None."""
+        from web3.exceptions import TransactionNotFound
+
+        try:
+            self.web3.eth.get_transaction(sent['tx_hash'])
+            return sent['tx_hash']
+        except TransactionNotFound:
+            pass
+        for event in self.contract.events.PredictionBatchLogged().get_logs(from_block=sent['from_block']):
+            if bytes(event['args']['merkleRoot']) == root:
+                return event['transactionHash']
+        return None
+
+    def _send(self, root, leaf_count, sent):
+        call = self.contract.functions.logPredictionBatch(root, leaf_count)
+        from_block = sent['from_block'] if sent else self.web3.eth.block_number
+        if self.account is None:
+            tx_hash = call.transact({'from': self.web3.eth.accounts[0]})
+            nonce = None
+        else:
+            address = self.account.address
+            nonce = sent['nonce'] if sent else None
+            if nonce is None or self.web3.eth.get_transaction_count(address, 'latest') > nonce:
+                nonce = self.web3.eth.get_transaction_count(address, 'pending')
+            tx = call.build_transaction({'from': address, 'nonce': nonce})
+            signed = self.account.sign_transaction(tx)
+            raw = getattr(signed, 'raw_transaction', None) or signed.rawTransaction
+            tx_hash = self.web3.eth.send_raw_transaction(raw)
+        self.sent[root] = {"tx_hash": tx_hash, "nonce": nonce, "from_block": from_block}
+        return tx_hash
+
+    def verify(self, batch_id, leaf, index, proof):
+        return self.contract.functions.verifyPrediction(batch_id, leaf, index, proof).call()
+
+
+class ProofBatcher:
+    """
+    Collects record leaves and submits one Merkle root per batch of at most
+    max_batch_size records, at most max_wait seconds after the oldest one
+    arrived. A failed submission is retried with the same records, so the
+    root does not change and the submitter can find an earlier transaction.
+    """
+
+    def __init__(self, submitter, max_batch_size=DEFAULT_BATCH_SIZE, max_wait=DEFAULT_WINDOW,
+                 store_path=DEFAULT_STORE):
+        self.submitter = submitter
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait)
+        self.store_path = store_path
+        # (record id, leaf, future, time added), oldest first
+        self.pending = []
+        # the batch being submitted, taken off pending
+        self.submitting = []
+        # record id -> future of its proof, while waiting for a batch
+        self.waiting = {}
+        # record id -> (batch, leaf index)
+        self.recorded = {}
+        self.batches_submitted = 0
+        self.failures = 0
+        self.cond = threading.Condition()
+        self._load_store()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _load_store(self):
+        if not self.store_path or not os.path.exists(self.store_path):
+            return
+        with open(self.store_path, encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    self._index(json.loads(line))
+
+    def _index(self, batch):
+        batch['tree'] = MerkleTree([_unhex(leaf) for leaf in batch['leaves']])
+        for i, record_id in enumerate(batch['record_ids']):
+            self.recorded[record_id] = (batch, i)
+
+    def add(self, record_id, symptoms, predictions):
+        """
+        Future of the record's proof, resolved once its batch is mined. Adding
+        an id again returns its existing proof or future.
+        """
+        record_id = str(record_id)
+        future = Future()
+        with self.cond:
+            if record_id in self.recorded:
+                future.set_result(self._proof(record_id))
+                return future
+            if record_id in self.waiting:
+                return self.waiting[record_id]
+            self.pending.append((record_id, leaf_hash(record_id, symptoms, predictions), future, time.monotonic()))
+            self.waiting[record_id] = future
+            self.cond.notify()
+        return future
+
+    def proof(self, record_id):
+        """Inclusion proof, {"status": "pending", ...} or None for an unknown id."""
+        record_id = str(record_id)
+        with self.cond:
+            if record_id in self.recorded:
+                return self._proof(record_id)
+            for pending_id, leaf, _, _ in self.submitting + self.pending:
+                if pending_id == record_id:
+                    return {"id": record_id, "status": "pending", "leaf": _hex(leaf)}
+        return None
+
+    def _proof(self, record_id):
+        batch, index = self.recorded[record_id]
+        return {
+            "id": record_id,
+            "status": "recorded",
+            "leaf": batch['leaves'][index],
+            "index": index,
+            "proof": [_hex(node) for node in batch['tree'].proof(index)],
+            "root": batch['root'],
+            "leaf_count": len(batch['leaves']),
+            "batch_id": batch['batch_id'],
+            "tx_hash": batch['tx_hash'],
+            "block_number": batch['block_number'],
+        }
+
+    def stats(self):
+        with self.cond:
+            return {
+                "pending": len(self.submitting) + len(self.pending),
+                "recorded": len(self.recorded),
+                "batches_submitted": self.batches_submitted,
+                "failures": self.failures,
+                "max_batch_size": self.max_batch_size,
+                "window_s": self.max_wait,
+            }
+
+    def _next_batch(self):
+        with self.cond:
+            while True:
+                if self.pending:
+                    remaining = self.pending[0][3] + self.max_wait - time.monotonic()
+                    if len(self.pending) >= self.max_batch_size or remaining <= 0:
+                        self.submitting = self.pending[:self.max_batch_size]
+                        del self.pending[:self.max_batch_size]
+                        return self.submitting
+                    self.cond.wait(remaining)
+                else:
+                    self.cond.wait()
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            while True:
+                try:
+                    self._submit(batch)
+                    break
+                except Exception as e:
+                    print(f"Proof batch of {len(batch)} records failed, retrying: {e}", file=sys.stderr)
+                    with self.cond:
+                        self.failures += 1
+                    # Back off for one window; new records keep queueing meanwhile
+                    time.sleep(max(self.max_wait, 1.0))
+
+    def _submit(self, items):
+        tree = MerkleTree([leaf for _, leaf, _, _ in items])
+        receipt = self.submitter.submit(tree.root, len(items))
+        batch = dict(receipt, root=_hex(tree.root), submitted_at=time.time(),
+                     record_ids=[record_id for record_id, _, _, _ in items],
+                     leaves=[_hex(leaf) for _, leaf, _, _ in items])
+        if self.store_path:
+            with open(self.store_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(batch) + "\n")
+
+        with self.cond:
+            self._index(batch)
+            self.batches_submitted += 1
+            self.submitting = []
+            for record_id, _, _, _ in items:
+                self.waiting.pop(record_id, None)
+            proofs = [(future, self._proof(record_id)) for record_id, _, future, _ in items]
+        for future, proof in proofs:
+            future.set_result(proof)
+
+
+def check(contract, url=None, n_records=7):
+    """Submit one demo batch and verify every proof locally and with verifyPrediction."""
+    import tempfile
+
+    submitter = Web3Submitter(url, contract)
+    with tempfile.TemporaryDirectory() as tmp:
+        batcher = ProofBatcher(submitter, max_batch_size=n_records, max_wait=60,
+                               store_path=os.path.join(tmp, 'proofs.jsonl'))
+        stamp = int(time.time())
+        futures = [
+            batcher.add(f"check-{stamp}-{i}", f"fever and cough, case {i}",
+                        [{"disease": "Common Cold", "confidence": 0.5 + i / 100}])
+            for i in range(n_records)
+        ]
+        proofs = [future.result(timeout=RECEIPT_TIMEOUT) for future in futures]
+
+    ok = True
+    for proof in proofs:
+        leaf, root = _unhex(proof['leaf']), _unhex(proof['root'])
+        nodes = [_unhex(node) for node in proof['proof']]
+        local = verify_proof(leaf, proof['index'], proof['leaf_count'], nodes, root)
+        onchain = submitter.verify(proof['batch_id'], leaf, proof['index'], nodes)
+        tampered = submitter.verify(proof['batch_id'], hashlib.sha256(leaf).digest(), proof['index'], nodes)
+        ok = ok and local and onchain and not tampered
+        print(f"{proof['id']}: index {proof['index']}, local {local}, on-chain {onchain}, tampered leaf {tampered}")
+    print(f"batch {proofs[0]['batch_id']} root {proofs[0]['root']} in {proofs[0]['tx_hash']}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batched Merkle-root proofs of stored diagnoses")
+    parser.add_argument('command', choices=['check'])
+    parser.add_argument('--contract', default=os.environ.get('CONTRACT_ADDRESS'), help="deployed UserRegistry")
+    parser.add_argument('--rpc', default=None, help=f"JSON-RPC URL (default ETHEREUM_NETWORK_URL or {DEFAULT_RPC_URL})")
+    parser.add_argument('--records', type=int, default=7)
+    args = parser.parse_args()
+
+    if not args.contract:
+        parser.error("--contract or CONTRACT_ADDRESS is required")
+    ok = check(args.contract, args.rpc, args.records)
+    print("PROOFS OK" if ok else "PROOFS FAILED")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
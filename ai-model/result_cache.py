@@ -0,0 +1,87 @@
+"""
+Bounded, thread-safe caches for DiseasePredictor.predict_batch.
+
+- text cache: raw input text -> extracted symptoms, so repeated texts skip
+  dictionary and NER extraction
+- result cache: (model version, frozenset of symptoms) -> final prediction,
+  so differently phrased requests that extract the same symptoms skip the
+  model. Entries expire after a TTL.
+- NER cache: normalized text -> NER symptoms already mapped to model columns
+
+All three are LRU-evicted and count hits, misses, expirations and evictions.
+Sizes and TTL come from DIAGNOCHAIN_TEXT_CACHE_SIZE,
+DIAGNOCHAIN_RESULT_CACHE_SIZE, DIAGNOCHAIN_NER_CACHE_SIZE and
+DIAGNOCHAIN_RESULT_CACHE_TTL (seconds); a size of 0 disables that cache.
+"""
+import os
+import time
+import threading
+from collections import OrderedDict
+
+TEXT_CACHE_SIZE = int(os.environ.get('DIAGNOCHAIN_TEXT_CACHE_SIZE', '10000'))
+RESULT_CACHE_SIZE = int(os.environ.get('DIAGNOCHAIN_RESULT_CACHE_SIZE', '4096'))
+NER_CACHE_SIZE = int(os.environ.get('DIAGNOCHAIN_NER_CACHE_SIZE', '10000'))
+RESULT_CACHE_TTL = float(os.environ.get('DIAGNOCHAIN_RESULT_CACHE_TTL', '3600'))
+
+MISSING = object()
+
+
+class LRUCache:
+    def __init__(self, maxsize, ttl=None, clock=time.monotonic):
+        self.maxsize = max(0, maxsize)
+        self.ttl = ttl if ttl and ttl > 0 else None
+        self.clock = clock
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """The cached value, or MISSING."""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return MISSING
+            value, expires = entry
+            if expires is not None and expires <= self.clock():
+                del self.entries[key]
+                self.expired += 1
+                self.misses += 1
+                return MISSING
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        if not self.maxsize:
+            return
+        expires = self.clock() + self.ttl if self.ttl else None
+        with self.lock:
+            self.entries[key] = (value, expires)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self.entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "expired": self.expired,
+                "evictions": self.evictions
+            }
@@ -0,0 +1,260 @@
+"""
+Build-once symptom extraction engine shared by DiseasePredictor and
+server/predict_api.py.
+
+- exact phrases: an Aho-Corasick automaton over the synonym table, so one pass
+  over the text finds every phrase that `phrase in text` would find, plus
+  whole column names through the vocabulary's phrase index
+- typos: a character-count index over all keywords; it computes difflib's
+  quick_ratio upper bound for the whole vocabulary with one NumPy expression
+  and only runs SequenceMatcher.ratio() on the survivors. The result is the
+  same word get_close_matches(word, keywords, n=1, cutoff=0.80) returns.
+- vectorize: extracted symptom sets -> CSR rows over the model's columns,
+  sized by the number of symptoms found rather than the vocabulary (SciPy
+  is imported there, on first use, to keep this module cheap to import)
+- coverage: extract_with_coverage also returns the content words no phrase,
+  column name or typo match explained, which is what decides whether the
+  NER model is worth running; normalize_entities maps NER output onto the
+  same vocabulary
+"""
+import os
+import re
+import threading
+from difflib import SequenceMatcher
+
+import numpy as np
+
+from metrics import METRICS
+from result_cache import MISSING, LRUCache
+from symptom_vocab import SYNONYMS_CSV, SymptomVocabulary, load_synonyms
+
+FUZZY_CUTOFF = 0.80
+FUZZY_MIN_WORD_LENGTH = 4
+MAX_CACHED_WORDS = 50000
+# Words that never name a symptom (English and Malay filler)
+STOPWORDS = frozenset("""
+    a an and are as at be been but by can could do does feel feeling feels for from had has have having
+    he her his i im i'm in is it its just like me my of on or since so some that the their them then there
+    they this to too very was we were what when which while with would you your also really quite bit
+    lot lots little slightly severe mild bad day days week weeks month months today yesterday night morning
+    got get getting started start keep keeps
+    saya aku dan yang ada sudah sejak hari dengan juga agak sangat sedikit tidak ini itu di ke dari
+""".split())
+
+
+def normalize_text(user_input):
+    return user_input.lower().replace("-", " ").replace(",", " ").replace(".", " ")
+
+
+class PhraseAutomaton:
+    """Aho-Corasick automaton: finds every occurrence of every phrase in one pass."""
+
+    def __init__(self, phrases):
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [[]]
+
+        for phrase in phrases:
+            state = 0
+            for ch in phrase:
+                nxt = self.goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto[state][ch] = nxt
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append([])
+                state = nxt
+            self.output[state].append(phrase)
+
+        # Breadth-first pass to wire failure links and merge outputs
+        queue = list(self.goto[0].values())
+        while queue:
+            next_queue = []
+            for state in queue:
+                for ch, nxt in self.goto[state].items():
+                    fallback = self.fail[state]
+                    while fallback and ch not in self.goto[fallback]:
+                        fallback = self.fail[fallback]
+                    self.fail[nxt] = self.goto[fallback].get(ch, 0)
+                    self.output[nxt] = self.output[nxt] + self.output[self.fail[nxt]]
+                    next_queue.append(nxt)
+            queue = next_queue
+
+    def findall(self, text):
+        """Yield (end_index, phrase) for each match, end_index exclusive."""
+        goto, fail, output = self.goto, self.fail, self.output
+        state = 0
+        for i, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for phrase in output[state]:
+                yield i + 1, phrase
+
+    def phrases_in(self, text):
+        return {phrase for _, phrase in self.findall(text)}
+
+
+class FuzzyIndex:
+    """Typo-tolerant single-best lookup with get_close_matches(n=1) semantics."""
+
+    def __init__(self, keywords, cutoff=FUZZY_CUTOFF):
+        self.keywords = list(keywords)
+        self.cutoff = cutoff
+        alphabet = sorted({ch for word in self.keywords for ch in word})
+        self.char_index = {ch: i for i, ch in enumerate(alphabet)}
+        self.lengths = np.array([len(word) for word in self.keywords], dtype=np.float64)
+        self.char_counts = np.zeros((len(self.keywords), len(alphabet)), dtype=np.int32)
+        for row, word in enumerate(self.keywords):
+            for ch in word:
+                self.char_counts[row, self.char_index[ch]] += 1
+        self.cache = {}
+
+    def candidates(self, word):
+        """Indices of keywords whose quick_ratio against word reaches the cutoff."""
+        counts = np.zeros(self.char_counts.shape[1], dtype=np.int32)
+        for ch in word:
+            idx = self.char_index.get(ch)
+            if idx is not None:
+                counts[idx] += 1
+        overlap = np.minimum(self.char_counts, counts).sum(axis=1)
+        quick = 2.0 * overlap / (self.lengths + len(word))
+        return np.flatnonzero(quick >= self.cutoff)
+
+    def best_match(self, word):
+        if word in self.cache:
+            return self.cache[word]
+
+        best = None
+        with METRICS.span('fuzzy'):
+            matcher = SequenceMatcher()
+            matcher.set_seq2(word)
+            for idx in self.candidates(word):
+                keyword = self.keywords[idx]
+                matcher.set_seq1(keyword)
+                score = matcher.ratio()
+                if score >= self.cutoff and (best is None or (score, keyword) > best):
+                    best = (score, keyword)
+
+        match = best[1] if best else None
+        if len(self.cache) >= MAX_CACHED_WORDS:
+            self.cache.clear()
+        self.cache[word] = match
+        return match
+
+
+class SymptomExtractor:
+    """Dictionary-based extraction against one SymptomVocabulary."""
+
+    def __init__(self, vocabulary, cutoff=FUZZY_CUTOFF):
+        self.vocabulary = vocabulary
+        self.symptom_map = vocabulary.synonyms
+        self.cols = vocabulary.col_set
+        self.automaton = PhraseAutomaton(self.symptom_map)
+        self.fuzzy = FuzzyIndex(list(self.symptom_map.keys()) + vocabulary.cols, cutoff)
+
+    def match_phrases(self, text):
+        extracted = {self.symptom_map[phrase] for phrase in self.automaton.phrases_in(text)}
+        return extracted | self.vocabulary.match_columns(text.split())
+
+    def match_fuzzy(self, text):
+        extracted = set()
+        for word in text.split():
+            if len(word) < FUZZY_MIN_WORD_LENGTH:
+                continue
+            match = self.fuzzy.best_match(word)
+            if match is None:
+                continue
+            if match in self.symptom_map:
+                extracted.add(self.symptom_map[match])
+            elif match in self.cols:
+                extracted.add(match)
+        return extracted
+
+    def extract(self, user_input):
+        text = normalize_text(user_input)
+        return self.match_phrases(text) | self.match_fuzzy(text)
+
+    def extract_with_coverage(self, text):
+        """
+        (symptoms, uncovered) for an already normalized text; uncovered lists
+        the content words that none of the matches explained.
+        """
+        spans = [(m.start(), m.end(), m.group()) for m in re.finditer(r'\S+', text)]
+        words = [word for _, _, word in spans]
+        covered = [False] * len(words)
+
+        matches = list(self.automaton.findall(text))
+        extracted = {self.symptom_map[phrase] for _, phrase in matches}
+        phrase_spans = [(end - len(phrase), end) for end, phrase in matches]
+        for i, n_tokens, col in self.vocabulary.column_matches(words):
+            extracted.add(col)
+            covered[i:i + n_tokens] = [True] * n_tokens
+
+        uncovered = []
+        for i, (start, end, word) in enumerate(spans):
+            # Same typo pass as match_fuzzy
+            if len(word) >= FUZZY_MIN_WORD_LENGTH:
+                match = self.fuzzy.best_match(word)
+                if match in self.symptom_map:
+                    extracted.add(self.symptom_map[match])
+                    covered[i] = True
+                elif match in self.cols:
+                    extracted.add(match)
+                    covered[i] = True
+            if covered[i] or any(s < end and start < e for s, e in phrase_spans):
+                continue
+            if len(word) > 2 and word not in STOPWORDS and not word.isdigit():
+                uncovered.append(word)
+        return extracted, uncovered
+
+    def normalize_entities(self, entities):
+        """Map raw NER words ("chest pain") onto model columns; unknown ones are dropped."""
+        found = set()
+        for entity in entities:
+            text = normalize_text(entity)
+            column = '_'.join(text.split())
+            if column in self.cols:
+                found.add(column)
+            else:
+                found |= {s for s in self.extract(entity) if s in self.cols}
+        return found
+
+    def extract_batch(self, user_inputs):
+        return [self.extract(text) for text in user_inputs]
+
+    def vectorize(self, symptom_sets):
+        """One binary CSR row per symptom set; names outside the vocabulary are skipped."""
+        from scipy import sparse
+
+        col_index = self.vocabulary.col_index
+        rows = [sorted({col_index[s] for s in symptoms if s in col_index}) for symptoms in symptom_sets]
+        indptr = np.zeros(len(rows) + 1, dtype=np.int32)
+        indptr[1:] = np.cumsum([len(row) for row in rows])
+        indices = np.fromiter((idx for row in rows for idx in row), dtype=np.int32, count=int(indptr[-1]))
+        data = np.ones(len(indices), dtype=np.float64)
+        return sparse.csr_matrix((data, indices, indptr), shape=(len(rows), len(self.vocabulary.cols)))
+
+
+# A process can use more than one column list (pickle vs compiled arrays,
+# predict_api vs the worker); keep each one's extractor instead of rebuilding
+MAX_EXTRACTORS = 4
+_extractors = LRUCache(MAX_EXTRACTORS)
+_extractors_lock = threading.Lock()
+
+
+def get_extractor(cols, synonyms_path=SYNONYMS_CSV):
+    """
+    Shared extractor for a column list, built once per column list and
+    synonym file version; the MAX_EXTRACTORS most recently used are kept.
+    """
+    stat = os.stat(synonyms_path)
+    key = (tuple(cols), synonyms_path, stat.st_mtime_ns, stat.st_size)
+    with _extractors_lock:
+        extractor = _extractors.get(key)
+        if extractor is MISSING:
+            vocabulary = SymptomVocabulary(cols, load_synonyms(synonyms_path))
+            extractor = SymptomExtractor(vocabulary)
+            _extractors.put(key, extractor)
+    return extractor
@@ -0,0 +1,57 @@
+"""
+Shared symptom vocabulary used by every extraction entry point
+(train_model.DiseasePredictor and server/predict_api.py).
+
+- synonyms: phrase -> model column, loaded from symptom_synonyms.csv
+- column tokens: each model column split into normalized words
+  ("spotting_ urination" -> ("spotting", "urination"))
+- phrase index: inverted index from a column's first token to its token
+  tuple, so finding column names in a text costs O(words in the text)
+"""
+import os
+import csv
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+SYNONYMS_CSV = os.path.join(SCRIPT_DIR, 'symptom_synonyms.csv')
+
+
+def load_synonyms(path=SYNONYMS_CSV):
+    synonyms = {}
+    with open(path, encoding='utf-8') as f:
+        reader = csv.reader(f)
+        next(reader, None)  # Skip header
+        for row in reader:
+            if len(row) >= 2 and row[0].strip():
+                synonyms[row[0].strip().lower()] = row[1].strip()
+    return synonyms
+
+
+def column_tokens(col):
+    return tuple(col.replace('_', ' ').lower().split())
+
+
+class SymptomVocabulary:
+    """Precomputed lookup tables for one model's column list."""
+
+    def __init__(self, cols, synonyms=None):
+        self.cols = list(cols)
+        self.col_set = set(self.cols)
+        self.col_index = {col: idx for idx, col in enumerate(self.cols)}
+        self.synonyms = load_synonyms() if synonyms is None else dict(synonyms)
+
+        self.col_tokens = {col: column_tokens(col) for col in self.cols}
+        self.phrase_index = {}
+        for col, tokens in self.col_tokens.items():
+            if tokens:
+                self.phrase_index.setdefault(tokens[0], []).append((tokens, col))
+
+    def column_matches(self, words):
+        """Yield (first word index, word count, column) for every column name in the text."""
+        for i, word in enumerate(words):
+            for tokens, col in self.phrase_index.get(word, ()):
+                if tuple(words[i:i + len(tokens)]) == tokens:
+                    yield i, len(tokens), col
+
+    def match_columns(self, words):
+        """Columns whose full name appears as consecutive words in the text."""
+        return {col for _, _, col in self.column_matches(words)}
@@ -0,0 +1,47 @@
+"""
+Reference for the sparse dataset loaders: the iterrows() one-hot encoder
+DiseasePredictor.load_dataset used before them, kept as it was. The loader
+tests and benchmarks/bench_dataset_encoding.py both compare against it.
+"""
+import pandas as pd
+
+
+def read_raw(path):
+    raw_data = pd.read_csv(path, header=None)
+    raw_data.dropna(how='all', inplace=True)
+    return raw_data
+
+
+def legacy_encode(raw_data):
+    """DataFrame with one 0/1 column per symptom (sorted) plus 'prognosis'."""
+    all_symptoms = set()
+    for index, row in raw_data.iterrows():
+        symptoms = row.iloc[1:].dropna().tolist()
+        for s in symptoms:
+            if isinstance(s, str):
+                clean_sym = s.strip().replace(" ", "_").lower()
+                all_symptoms.add(clean_sym)
+
+    sorted_symptoms = sorted(list(all_symptoms))
+    if '' in sorted_symptoms:
+        sorted_symptoms.remove('')
+
+    encoded_data = []
+    for index, row in raw_data.iterrows():
+        disease = row.iloc[0]
+        if not isinstance(disease, str):
+            continue
+
+        row_dict = {sym: 0 for sym in sorted_symptoms}
+        row_dict['prognosis'] = disease.strip()
+
+        current_symptoms = row.iloc[1:].dropna().tolist()
+        for s in current_symptoms:
+            if isinstance(s, str):
+                clean_sym = s.strip().replace(" ", "_").lower()
+                if clean_sym in row_dict:
+                    row_dict[clean_sym] = 1
+
+        encoded_data.append(row_dict)
+
+    return pd.DataFrame(encoded_data).fillna(0)
@@ -0,0 +1,127 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+pytest.importorskip("sklearn")
+
+from compiled_model import (MANIFEST_NAME, CompiledModel, compile_package, file_sha256, file_stat, is_current,
+                            save_artifact_dir)
+from train_model import ensemble_members
+from training_pipeline import assemble_voting
+
+
+def _symptom_rows(n_classes=5, n_features=24, rows_per_class=12, seed=0):
+    """Binary symptom rows where each class has its own likely symptoms."""
+    rng = np.random.default_rng(seed)
+    profiles = rng.random((n_classes, n_features)) < 0.25
+    y = np.repeat(np.arange(n_classes), rows_per_class)
+    noise = rng.random((len(y), n_features)) < 0.05
+    X = (profiles[y] ^ noise).astype(np.float64)
+    return X, y
+
+
+def _package(X, y_fit, n_classes):
+    from sklearn.preprocessing import LabelEncoder
+
+    members = ensemble_members()
+    fitted = {name: estimator.fit(X, y_fit) for name, estimator in members}
+    le = LabelEncoder().fit([f"disease {i}" for i in range(n_classes)])
+    return {
+        'model': assemble_voting(members, fitted, X, y_fit),
+        'cols': [f"symptom_{j}" for j in range(X.shape[1])],
+        'le': le,
+    }
+
+
+def test_compile_rejects_members_missing_a_class():
+    X, y = _symptom_rows()
+    keep = y != 2
+    package = _package(X[keep], y[keep], n_classes=5)
+    with pytest.raises(ValueError, match="4 of 5 classes"):
+        compile_package(package)
+
+
+@pytest.fixture(scope='module')
+def package():
+    X, y = _symptom_rows()
+    return _package(X, y, n_classes=5)
+
+
+def _queries(n_features, n_rows=40, seed=1):
+    rng = np.random.default_rng(seed)
+    X = (rng.random((n_rows, n_features)) < 0.2).astype(np.float64)
+    X[0] = 0  # no symptoms at all
+    return X
+
+
+def test_compiled_probabilities_match_the_pickled_model(package):
+    from scipy import sparse
+
+    compiled = CompiledModel(compile_package(package))
+    X = _queries(len(package['cols']))
+    expected = package['model'].predict_proba(X)
+
+    np.testing.assert_allclose(compiled.predict_proba(X), expected, atol=1e-9)
+    np.testing.assert_allclose(compiled.predict_proba(sparse.csr_matrix(X)), expected, atol=1e-9)
+    assert list(compiled.classes_) == list(package['le'].classes_)
+    assert list(compiled.cols) == package['cols']
+
+
+def test_memory_mapped_artifact_gives_the_same_probabilities(package, tmp_path):
+    arrays = compile_package(package)
+    loaded = CompiledModel.load(save_artifact_dir(arrays, str(tmp_path / 'model.arrays')))
+    X = _queries(len(package['cols']))
+
+    np.testing.assert_allclose(loaded.predict_proba(X), CompiledModel(arrays).predict_proba(X), atol=0)
+
+
+def _export(arrays, tmp_path):
+    """Arrays saved next to a stand-in pickle, as export_model would."""
+    model_path = tmp_path / 'diagnochain_model.pkl'
+    model_path.write_bytes(b'pickled model')
+    out_dir = save_artifact_dir(arrays, str(tmp_path / 'diagnochain_model.arrays'),
+                                file_sha256(str(model_path)), file_stat(str(model_path)))
+    return out_dir, str(model_path)
+
+
+def test_exported_arrays_are_current_only_next_to_their_pickle(package, tmp_path):
+    out_dir, model_path = _export(compile_package(package), tmp_path)
+    assert is_current(out_dir, model_path)
+
+    os.remove(model_path)
+    assert not is_current(out_dir, model_path)
+
+
+def test_artifact_from_an_older_format_is_not_current(package, tmp_path):
+    out_dir, model_path = _export(compile_package(package), tmp_path)
+    manifest_path = os.path.join(out_dir, MANIFEST_NAME)
+    with open(manifest_path, encoding='utf-8') as f:
+        manifest = json.load(f)
+    manifest['format_version'] = 1
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f)
+
+    assert not is_current(out_dir, model_path)
+
+
+# What members fitted on 4 of the 5 classes export: 6 one-vs-one SVC models
+# instead of 10, and 4 rows or columns of class probabilities instead of 5
+FOUR_CLASS_ARRAYS = {
+    'svc_coef': lambda a: a[:6],
+    'svc_intercept': lambda a: a[:6],
+    'nb_feature_log_prob': lambda a: a[:4],
+    'rf_value': lambda a: a[:, :4],
+}
+
+
+@pytest.mark.parametrize('name', sorted(FOUR_CLASS_ARRAYS))
+def test_arrays_that_do_not_fit_the_classes_are_rejected(package, tmp_path, name):
+    arrays = compile_package(package)
+    arrays[name] = FOUR_CLASS_ARRAYS[name](arrays[name])
+
+    with pytest.raises(ValueError, match=name):
+        CompiledModel(arrays)
+    out_dir, model_path = _export(arrays, tmp_path)
+    assert not is_current(out_dir, model_path)
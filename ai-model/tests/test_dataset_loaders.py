@@ -0,0 +1,97 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import AI_MODEL_DIR
+from class_responses import kb_name
+from dataset_loaders import DEFAULT_DATASETS, OneHotLoader, SparseDatasetBuilder, SymptomListLoader, load_dataset_files
+from legacy_encoding import legacy_encode, read_raw
+
+
+def _legacy_encode(path):
+    encoded = legacy_encode(read_raw(path))
+    cols = [c for c in encoded.columns if c != 'prognosis']
+    return cols, list(encoded['prognosis']), encoded[cols].to_numpy(dtype=np.int64)
+
+
+def _sparse_encode(path, chunksize):
+    builder = SparseDatasetBuilder()
+    builder.add_loader(SymptomListLoader(path, chunksize=chunksize))
+    return builder.build()
+
+
+@pytest.mark.parametrize('chunksize', [2, 50000])
+def test_sparse_loader_matches_the_legacy_encoder(tmp_path, chunksize):
+    path = tmp_path / 'dataset.csv'
+    path.write_text(
+        ",,,\n"
+        "Fungal infection,itching, skin_rash,dischromic _patches\n"
+        ",cough,,\n"
+        "Common Cold, Cough,cough,\n"
+        "Migraine,headache,,\n"
+        "Common Cold,continuous_sneezing, HEADACHE,\n"
+    )
+    cols, labels, X = _legacy_encode(path)
+    dataset = _sparse_encode(path, chunksize)
+
+    assert dataset.cols == cols
+    assert list(dataset.labels) == labels
+    assert np.array_equal(dataset.X.toarray().astype(np.int64), X)
+
+
+def test_sparse_loader_matches_the_legacy_encoder_on_dataset_csv():
+    path = os.path.join(AI_MODEL_DIR, 'dataset.csv')
+    cols, labels, X = _legacy_encode(path)
+    dataset = _sparse_encode(path, chunksize=1000)
+
+    assert dataset.cols == cols
+    assert list(dataset.labels) == labels
+    assert np.array_equal(dataset.X.toarray().astype(np.int64), X)
+
+
+def test_aliases_map_labels_and_symptoms_onto_canonical_names():
+    builder = SparseDatasetBuilder({'asthma': 'Bronchial Asthma'}, {'shortness_of_breath': 'breathlessness'})
+    diseases = pd.Series(['asthma', 'Common Cold'])
+    symptoms = pd.Series(['shortness_of_breath', 'breathlessness', 'cough'], index=[0, 0, 1])
+    builder.add_chunk(diseases, symptoms)
+    dataset = builder.build()
+
+    assert list(dataset.labels) == ['Bronchial Asthma', 'Common Cold']
+    assert dataset.cols == ['breathlessness', 'cough']
+    assert dataset.X.toarray().tolist() == [[1, 0], [0, 1]]
+
+
+def test_one_hot_rows_without_a_label_are_skipped(tmp_path):
+    path = tmp_path / 'Training.csv'
+    path.write_text(
+        "itching,skin_rash,cough,prognosis\n"
+        "1,1,0,Fungal infection\n"
+        "0,0,1,\n"
+        "0,1,1,Common Cold \n"
+    )
+    builder = SparseDatasetBuilder()
+    builder.add_loader(OneHotLoader(str(path)))
+    dataset = builder.build()
+
+    assert list(dataset.labels) == ['Fungal infection', 'Common Cold']
+    assert dataset.cols == ['cough', 'itching', 'skin_rash']
+    assert dataset.X.toarray().tolist() == [[0, 1, 1], [1, 0, 1]]
+
+
+@pytest.fixture
+def knowledge_base():
+    def names(filename):
+        path = os.path.join(AI_MODEL_DIR, filename)
+        return {kb_name(key) for key in pd.read_csv(path, header=None, dtype=str)[0]}
+    return names('symptom_Description.csv'), names('symptom_precaution.csv')
+
+
+def test_default_dataset_labels_have_descriptions_and_precautions(knowledge_base):
+    descriptions, precautions = knowledge_base
+    dataset = load_dataset_files([os.path.join(AI_MODEL_DIR, name) for name in DEFAULT_DATASETS])
+    labels = set(dataset.labels)
+
+    assert labels - descriptions == set()
+    assert labels - precautions == set()
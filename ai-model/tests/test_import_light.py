@@ -0,0 +1,12 @@
+import subprocess
+import sys
+
+from conftest import AI_MODEL_DIR
+
+
+def test_importing_inference_leaves_scipy_and_the_training_stack_unloaded():
+    code = ("import sys, inference; "
+            "print(' '.join(m for m in ('scipy', 'sklearn', 'pandas', 'joblib') if m in sys.modules))")
+    out = subprocess.run([sys.executable, '-c', code], cwd=AI_MODEL_DIR, check=True,
+                         capture_output=True, text=True).stdout
+    assert out.split() == []
@@ -0,0 +1,95 @@
+import sys
+import time
+import threading
+
+from prediction_worker import MicroBatcher, PredictionWorker
+
+
+def _fails_on_non_strings(items):
+    if not all(isinstance(item, str) for item in items):
+        raise TypeError("expected strings")
+    return [item.upper() for item in items]
+
+
+def test_bad_item_does_not_fail_its_batch():
+    batches = []
+
+    def batch_fn(items):
+        batches.append(list(items))
+        return _fails_on_non_strings(items)
+
+    batcher = MicroBatcher(batch_fn, max_batch_size=8, max_wait=0.2)
+    items = ["fever", "cough", 123, "rash"]
+    futures = [batcher.submit(item) for item in items]
+
+    assert futures[0].result(timeout=5) == "FEVER"
+    assert futures[1].result(timeout=5) == "COUGH"
+    assert isinstance(futures[2].exception(timeout=5), TypeError)
+    assert futures[3].result(timeout=5) == "RASH"
+    # One failed batch of four, then one retry per item
+    assert batches[0] == items
+    assert len(batches) == 5
+
+
+class _FakePredictor:
+    model_path = 'fake.pkl'
+    description_list = {}
+    precautionDictionary = {}
+
+    def predict_batch(self, texts):
+        assert all(isinstance(text, str) for text in texts)
+        return [{"primary_diagnosis": text, "confidence": 50.0} for text in texts]
+
+    def cache_stats(self):
+        return {}
+
+
+def test_worker_rejects_non_string_symptoms_before_batching():
+    worker = PredictionWorker(predictor=_FakePredictor(), max_wait_ms=50)
+    submitted = []
+    submit = worker.batcher.submit
+    worker.batcher.submit = lambda item: submitted.append(item) or submit(item)
+
+    assert worker.handle({"symptoms": 123}) == {"error": "symptoms must be a string"}
+    assert "error" in worker.handle({"op": "predict_batch", "symptoms": ["fever", 1]})
+    assert submitted == []
+    assert worker.batches_served == 0
+
+
+def test_concurrent_valid_requests_survive_an_invalid_one():
+    worker = PredictionWorker(predictor=_FakePredictor(), max_batch_size=16, max_wait_ms=50)
+    messages = [{"id": i, "symptoms": f"fever {i}"} for i in range(10)] + [{"id": "bad", "symptoms": 123}]
+    responses = {}
+
+    def send(message):
+        responses[message["id"]] = worker.handle(message)
+
+    threads = [threading.Thread(target=send, args=(message,)) for message in messages]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+
+    assert "error" in responses.pop("bad")
+    assert all(response["predictions"][0]["disease"] == f"fever {i}" for i, response in responses.items())
+
+
+def test_concurrent_batches_leave_sys_stdout_alone():
+    class _PrintingPredictor(_FakePredictor):
+        def predict_batch(self, texts):
+            print(f"scoring {len(texts)} texts")
+            # Let the other threads run while this one is inside predict_batch
+            time.sleep(0.001)
+            return super().predict_batch(texts)
+
+    worker = PredictionWorker(predictor=_PrintingPredictor(), max_wait_ms=1)
+    stdout = sys.stdout
+    threads = [threading.Thread(target=lambda: [worker.predict_batch(["fever"]) for _ in range(50)])
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sys.stdout is stdout
+    assert worker.batches_served == 400
@@ -0,0 +1,100 @@
+import asyncio
+from concurrent.futures import Future
+from http import HTTPStatus
+
+import pytest
+
+from prediction_service import HTTPError, PredictionService
+
+
+class _HeldBatcher:
+    """Records submissions and leaves them unresolved until release()."""
+
+    def __init__(self):
+        self.submitted = []
+        self.futures = []
+
+    def submit(self, text):
+        self.submitted.append(text)
+        future = Future()
+        self.futures.append(future)
+        return future
+
+    def release(self):
+        for future in self.futures:
+            future.set_result({"predictions": []})
+
+
+class _FakeWorker:
+    def __init__(self):
+        self.batcher = _HeldBatcher()
+        self.batch_calls = []
+
+    def predict_batch(self, texts):
+        self.batch_calls.append(texts)
+        return [{"predictions": []} for _ in texts]
+
+
+def test_rejected_requests_never_reach_the_worker():
+    async def scenario():
+        worker = _FakeWorker()
+        service = PredictionService(worker, max_inflight=2, timeout=5)
+        admitted = [asyncio.ensure_future(service.predict({"symptoms": f"fever {i}"})) for i in range(2)]
+        await asyncio.sleep(0)
+
+        with pytest.raises(HTTPError) as single:
+            await service.predict({"symptoms": "cough"})
+        with pytest.raises(HTTPError) as batch:
+            await service.predict_batch({"symptoms": ["rash", "itching"]})
+
+        assert single.value.status == batch.value.status == HTTPStatus.SERVICE_UNAVAILABLE
+        assert worker.batcher.submitted == ["fever 0", "fever 1"]
+        assert worker.batch_calls == []
+        assert service.rejected == 2
+
+        worker.batcher.release()
+        await asyncio.gather(*admitted)
+        assert service.inflight == 0
+        assert await service.predict_batch({"symptoms": ["rash"]}) == {"results": [{"predictions": []}]}
+
+    asyncio.run(scenario())
+
+
+def test_failed_requests_release_their_slots():
+    class _FailingWorker(_FakeWorker):
+        def predict_batch(self, texts):
+            raise RuntimeError("model crashed")
+
+    async def scenario():
+        worker = _FailingWorker()
+        service = PredictionService(worker, max_inflight=1, timeout=5)
+        for _ in range(3):
+            with pytest.raises(RuntimeError):
+                await service.predict_batch({"symptoms": ["rash"]})
+        assert service.inflight == 0
+        assert service.rejected == 0
+
+    asyncio.run(scenario())
+
+
+def test_timed_out_work_keeps_its_slot_until_it_finishes():
+    async def scenario():
+        worker = _FakeWorker()
+        service = PredictionService(worker, max_inflight=1, timeout=0.05)
+
+        with pytest.raises(HTTPError) as timed_out:
+            await service.predict({"symptoms": "fever"})
+        assert timed_out.value.status == HTTPStatus.GATEWAY_TIMEOUT
+
+        # The batcher is still working on "fever", so there is no room yet
+        with pytest.raises(HTTPError) as busy:
+            await service.predict({"symptoms": "cough"})
+        assert busy.value.status == HTTPStatus.SERVICE_UNAVAILABLE
+        assert worker.batcher.submitted == ["fever"]
+
+        worker.batcher.release()
+        await asyncio.sleep(0.01)
+        assert service.inflight == 0
+        assert await service.predict_batch({"symptoms": ["rash"]}) == {"results": [{"predictions": []}]}
+
+    asyncio.run(scenario())
@@ -0,0 +1,82 @@
+import hashlib
+import threading
+
+import pytest
+
+from proof_batcher import MerkleTree, ProofBatcher, _unhex, leaf_hash, verify_proof
+
+
+def _leaves(n):
+    return [leaf_hash(f"record-{i}", f"fever {i}", [{"disease": "Common Cold", "confidence": i}]) for i in range(n)]
+
+
+@pytest.mark.parametrize('n', list(range(1, 18)) + [31, 32, 33])
+def test_every_proof_verifies_against_the_root(n):
+    leaves = _leaves(n)
+    tree = MerkleTree(leaves)
+    for i, leaf in enumerate(leaves):
+        assert verify_proof(leaf, i, n, tree.proof(i), tree.root)
+
+
+def test_tampered_leaf_index_or_proof_is_rejected():
+    leaves = _leaves(7)
+    tree = MerkleTree(leaves)
+    proof = tree.proof(4)
+
+    assert not verify_proof(hashlib.sha256(leaves[4]).digest(), 4, 7, proof, tree.root)
+    assert not verify_proof(leaves[4], 5, 7, proof, tree.root)
+    assert not verify_proof(leaves[4], 7, 7, proof, tree.root)
+    assert not verify_proof(leaves[4], 4, 7, proof[:-1], tree.root)
+    assert not verify_proof(leaves[4], 4, 7, proof + [leaves[0]], tree.root)
+    assert not verify_proof(leaves[4], 4, 7, [proof[0][::-1]] + proof[1:], tree.root)
+
+
+def test_inner_node_cannot_pass_for_a_leaf_of_the_batch():
+    leaves = _leaves(4)
+    tree = MerkleTree(leaves)
+    inner = tree.levels[1][0]
+    for index in range(4):
+        assert not verify_proof(inner, index, 4, [tree.levels[1][1]], tree.root)
+
+
+class _FlakySubmitter:
+    """Times out on the first submission; on_first_call runs before that."""
+
+    def __init__(self, on_first_call=None):
+        self.calls = []
+        self.on_first_call = on_first_call
+        self.done = threading.Event()
+
+    def submit(self, root, leaf_count):
+        self.calls.append((root, leaf_count))
+        if len(self.calls) == 1:
+            if self.on_first_call:
+                self.on_first_call()
+            raise TimeoutError("no receipt yet")
+        if len(self.calls) == 3:
+            self.done.set()
+        return {"batch_id": len(self.calls) - 1, "tx_hash": "0x" + "ab" * 32, "block_number": 10}
+
+
+def test_failed_batch_is_retried_with_the_same_root(tmp_path):
+    store = str(tmp_path / 'proofs.jsonl')
+    submitter = _FlakySubmitter(lambda: batcher.add("late", "rash", []))
+    batcher = ProofBatcher(submitter, max_batch_size=3, max_wait=0.05, store_path=store)
+    futures = [batcher.add(f"r{i}", f"fever {i}", [{"disease": "Flu"}]) for i in range(3)]
+
+    proofs = [future.result(timeout=10) for future in futures]
+    assert submitter.done.wait(10)
+    (first_root, first_count), (retry_root, retry_count), (late_root, late_count) = submitter.calls
+    assert (retry_root, retry_count) == (first_root, first_count) and first_count == 3
+    assert late_count == 1 and late_root != first_root
+
+    for proof in proofs:
+        assert _unhex(proof['root']) == first_root
+        assert verify_proof(_unhex(proof['leaf']), proof['index'], proof['leaf_count'],
+                            [_unhex(node) for node in proof['proof']], first_root)
+    assert batcher.stats()['failures'] == 1
+
+    batcher.add("late", "rash", []).result(timeout=10)
+    reloaded = ProofBatcher(_FlakySubmitter(), store_path=store)
+    assert [reloaded.proof(f"r{i}") for i in range(3)] == proofs
+    assert reloaded.proof("late")['batch_id'] == 2
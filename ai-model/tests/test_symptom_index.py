@@ -0,0 +1,54 @@
+import os
+import random
+from difflib import get_close_matches
+
+import pandas as pd
+import pytest
+
+from conftest import AI_MODEL_DIR
+from symptom_index import FUZZY_CUTOFF, FuzzyIndex, get_extractor
+from symptom_vocab import load_synonyms
+
+
+@pytest.fixture(scope='module')
+def keywords():
+    raw = pd.read_csv(os.path.join(AI_MODEL_DIR, 'dataset.csv'), header=None, dtype=str)
+    cols = raw.iloc[:, 1:].stack().dropna().str.strip().str.replace(" ", "_", regex=False).str.lower()
+    return list(load_synonyms()) + sorted(set(cols) - {''})
+
+
+def _typos(words, n, seed=0):
+    """Words with one character dropped, doubled, swapped or replaced."""
+    rng = random.Random(seed)
+    out = []
+    for _ in range(n):
+        word = rng.choice(words)
+        i = rng.randrange(len(word))
+        edit = rng.randrange(4)
+        if edit == 0:
+            word = word[:i] + word[i + 1:]
+        elif edit == 1:
+            word = word[:i] + word[i] + word[i:]
+        elif edit == 2 and i + 1 < len(word):
+            word = word[:i] + word[i + 1] + word[i] + word[i + 2:]
+        else:
+            word = word[:i] + rng.choice('abcdefghijklmnopqrstuvwxyz') + word[i + 1:]
+        out.append(word)
+    return out
+
+
+def test_best_match_is_what_get_close_matches_returns(keywords):
+    index = FuzzyIndex(keywords)
+    words = _typos(keywords, 400) + ['fever', 'headache', 'xyzzy', 'stomach', 'pain', 'caugh', 'vomitting']
+
+    for word in words:
+        expected = get_close_matches(word, keywords, n=1, cutoff=FUZZY_CUTOFF)
+        assert index.best_match(word) == (expected[0] if expected else None), word
+
+
+def test_extractors_for_two_column_lists_are_both_kept():
+    first, second = ['cough', 'high_fever'], ['cough', 'high_fever', 'skin_rash']
+    extractor = get_extractor(first)
+
+    assert get_extractor(second) is not extractor
+    assert get_extractor(first) is extractor
@@ -0,0 +1,36 @@
+import pytest
+
+pytest.importorskip("sklearn")
+
+import joblib
+from sklearn.preprocessing import LabelEncoder
+
+import train_model
+from train_model import DiseasePredictor
+
+
+def test_failed_export_keeps_the_loaded_pickle(tmp_path, monkeypatch):
+    cols = ['cough', 'high_fever']
+    le = LabelEncoder().fit(['Common Cold', 'Influenza'])
+    model_path = tmp_path / 'diagnochain_model.pkl'
+    joblib.dump({'model': 'fitted model', 'le': le, 'cols': cols,
+                 'symptoms_dict': {c: i for i, c in enumerate(cols)}}, model_path)
+
+    def failing_export(*args, **kwargs):
+        raise OSError("artifact directory was renamed by another process")
+
+    def unexpected_training(self):
+        raise AssertionError("a loadable pickle must not be retrained")
+
+    monkeypatch.setenv('DIAGNOCHAIN_MODEL_BACKEND', 'compiled')
+    monkeypatch.setattr(train_model, 'export_model', failing_export)
+    monkeypatch.setattr(DiseasePredictor, 'train_model', unexpected_training)
+    predictor = DiseasePredictor.__new__(DiseasePredictor)
+    predictor.model_path = str(model_path)
+    predictor.compiled_model_path = str(tmp_path / 'diagnochain_model.arrays')
+
+    predictor.load_model()
+
+    assert predictor.model == 'fitted model'
+    assert predictor.cols == cols
+    assert list(predictor.classes) == ['Common Cold', 'Influenza']
@@ -0,0 +1,60 @@
+import os
+
+import numpy as np
+import pytest
+
+sklearn = pytest.importorskip("sklearn")
+
+from train_model import ensemble_members
+from training_pipeline import assemble_voting, cached_features, fit_members, member_key
+
+
+def _rows(n_classes=4, n_features=16, rows_per_class=10, seed=0):
+    rng = np.random.default_rng(seed)
+    profiles = rng.random((n_classes, n_features)) < 0.3
+    y = np.repeat(np.arange(n_classes), rows_per_class)
+    X = (profiles[y] ^ (rng.random((len(y), n_features)) < 0.05)).astype(np.float64)
+    return X, y
+
+
+def test_assembled_model_matches_voting_classifier_fit():
+    from sklearn.ensemble import VotingClassifier
+
+    X, y = _rows()
+    members = ensemble_members()
+    fitted = {name: estimator.fit(X, y) for name, estimator in members}
+    model = assemble_voting(members, fitted, X, y)
+
+    reference = VotingClassifier(estimators=ensemble_members(), voting='soft').fit(X, y)
+    np.testing.assert_allclose(model.predict_proba(X), reference.predict_proba(X))
+    np.testing.assert_array_equal(model.classes_, reference.classes_)
+    assert all(model.named_estimators_[name].estimator is fitted[name] for name in fitted)
+
+
+def test_member_key_changes_with_the_sklearn_version(monkeypatch):
+    X, y = _rows()
+    name, estimator = ensemble_members()[-1]
+    key = member_key(name, estimator, X, y)
+
+    monkeypatch.setattr(sklearn, '__version__', '0.0.1')
+    assert member_key(name, estimator, X, y) != key
+
+
+def test_superseded_cache_entries_are_deleted(tmp_path):
+    cache_dir = str(tmp_path)
+    members = [(name, estimator) for name, estimator in ensemble_members() if name == 'nb']
+    X, y = _rows()
+    fit_members(members, X, y, cache_dir=cache_dir)
+    first = set(os.listdir(cache_dir))
+    fit_members(members, X, y, cache_dir=cache_dir)
+    assert set(os.listdir(cache_dir)) == first
+
+    fit_members(members, X[:-1], y[:-1], cache_dir=cache_dir)
+    second = set(os.listdir(cache_dir))
+    assert len(second) == 1 and second != first
+
+    data = tmp_path / 'data.csv'
+    for text in ("a,b\n", "a,b,c\n"):
+        data.write_text(text)
+        cached_features([str(data)], lambda paths: text, cache_dir=cache_dir)
+    assert len([entry for entry in os.listdir(cache_dir) if entry.startswith('features-')]) == 1
@@ -1,50 +1,59 @@
-import pandas as pd
+"""
+Training side of the disease predictor. DiseasePredictor extends
+inference.InferencePredictor with the pickled scikit-learn model (used when
+the compiled arrays are stale or DIAGNOCHAIN_MODEL_BACKEND=sklearn) and
+train_model(). scikit-learn, pandas and joblib are imported only by the
+methods that need them, so importing this module stays cheap.
+
+Run directly to train when no model exists yet.
+"""
 import numpy as np
 import random
-import csv
-import joblib
 import os
 import warnings
-from difflib import get_close_matches
-from sklearn import preprocessing
-from sklearn.ensemble import RandomForestClassifier, VotingClassifier
-from sklearn.naive_bayes import MultinomialNB
-from sklearn.svm import SVC
-from sklearn.model_selection import train_test_split
-from ner_extractor import MedicalNER
+from compiled_model import check_member_classes, export_model, model_backend
+from inference import InferencePredictor
 
 warnings.filterwarnings("ignore")
 
-class DiseasePredictor:
-    def __init__(self):  # FIXED: Double underscore
-        print("Initializing DiseasePredictor...")
-        self.description_list = {}
-        self.precautionDictionary = {}
-        self.severityDictionary = {}
-        self.symptoms_dict = {}
-        self.cols = []
-        self.le = preprocessing.LabelEncoder()
-        self.model = None
-        self.model_path = "diagnochain_model.pkl"
-        
-        print("Loading AI NER Model...")
-        self.ai_ner = MedicalNER()
-        
-        if os.path.exists(self.model_path):
-            print(f"Found existing model at {self.model_path}")
-            self.load_model()
-        else:
-            print("No saved model found. Training from scratch...")
-            self.train_model()
-            
-        self.load_knowledge_base()
-        print("Initialization complete!")
+AUGMENT_SEED = 42
+# Diseases need rows on both sides of the stratified train/test split
+MIN_CLASS_ROWS = 2
+
+
+def ensemble_members():
+    """Soft-voting members; changing one here only refits that member."""
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.naive_bayes import MultinomialNB
+    from sklearn.svm import SVC
+    return [
+        ('rf', RandomForestClassifier(n_estimators=100, random_state=42)),
+        ('svc', SVC(kernel='linear', probability=True, random_state=42)),
+        ('nb', MultinomialNB())
+    ]
+
+
+class DiseasePredictor(InferencePredictor):
+    """InferencePredictor that can also load the pickle and train the ensemble."""
+
+    def __init__(self, ner_mode=None):  # FIXED: Double underscore
+        self.le = None
+        super().__init__(ner_mode)
 
     def load_model(self):
+        if not os.path.exists(self.model_path):
+            print("No saved model found. Training from scratch...")
+            self.train_model()
+            return
+        print(f"Found existing model at {self.model_path}")
         try:
+            if self.load_compiled_model():
+                return
+            import joblib
             package = joblib.load(self.model_path)
             self.model = package['model']
             self.le = package['le']
+            self.classes = self.le.classes_
             self.cols = package['cols']
             self.symptoms_dict = package['symptoms_dict']
             print("Model loaded successfully!")
@@ -52,8 +61,20 @@ class DiseasePredictor:
             print(f"Error loading model: {e}")
             print("Will train a new model...")
             self.train_model()
+            return
+
+        # Refresh stale or missing shared arrays for the next start. The pickle
+        # is already loaded, so a failed export (or another process swapping
+        # the directory at the same time) must not trigger a retrain.
+        if model_backend() == 'compiled':
+            try:
+                export_model(self.model_path, self.compiled_model_path, package)
+                print(f"Compiled model refreshed at {self.compiled_model_path}")
+            except Exception as e:
+                print(f"Error compiling model: {e}")
 
     def save_model(self):
+        import joblib
         try:
             package = {
                 'model': self.model,
@@ -72,155 +93,126 @@ class DiseasePredictor:
                 print("ERROR: File was not created!")
         except Exception as e:
             print(f"Error saving model: {e}")
+            return
+
+        # Inference-only arrays for the NumPy predictor
+        try:
+            compiled_path = export_model(package=package, out_path=self.compiled_model_path)
+            print(f"Compiled model saved to {os.path.abspath(compiled_path)}")
+        except Exception as e:
+            print(f"Error compiling model: {e}")
 
-    def augment_data(self, df):
+    def augment_data(self, dataset):
+        from dataset_loaders import append_records
+        # Seeded so the same dataset always yields the same training set (and cache keys)
+        rng = random.Random(AUGMENT_SEED)
         new_rows = []
-        columns = list(df.columns)
 
         # Influenza
         flu_symptoms = ['cough', 'high_fever', 'headache', 'fatigue', 'muscle_pain', 'chills', 'throat_irritation', 'runny_nose']
         for _ in range(100):
-            row = {col: 0 for col in columns if col != 'prognosis'}
-            row['prognosis'] = 'Influenza'
-            for sym in flu_symptoms:
-                if sym in row: row[sym] = 1
-            if random.random() < 0.2:
-                if 'chills' in row: row['chills'] = 0
-            new_rows.append(row)
+            symptoms = list(flu_symptoms)
+            if rng.random() < 0.2:
+                symptoms.remove('chills')
+            new_rows.append(('Influenza', symptoms))
 
         # Acute Sinusitis
         sinus_symptoms = ['sinus_pressure', 'headache', 'runny_nose', 'congestion', 'cough', 'throat_irritation', 'malaise', 'mild_fever']
         for _ in range(100):
-            row = {col: 0 for col in columns if col != 'prognosis'}
-            row['prognosis'] = 'Acute Sinusitis'
-            for sym in sinus_symptoms:
-                if sym in row: row[sym] = 1
-            if random.random() < 0.2:
-                if 'mild_fever' in row: row['mild_fever'] = 0
-            new_rows.append(row)
+            symptoms = list(sinus_symptoms)
+            if rng.random() < 0.2:
+                symptoms.remove('mild_fever')
+            new_rows.append(('Acute Sinusitis', symptoms))
 
         # Common Cold
         cold_symptoms = ['cough', 'runny_nose', 'continuous_sneezing', 'headache', 'throat_irritation']
         for _ in range(50):
-            row = {col: 0 for col in columns if col != 'prognosis'}
-            row['prognosis'] = 'Common Cold'
-            for sym in cold_symptoms:
-                if sym in row: row[sym] = 1
-            new_rows.append(row)
+            new_rows.append(('Common Cold', list(cold_symptoms)))
 
-        return pd.concat([df, pd.DataFrame(new_rows)], ignore_index=True)
+        # Symptoms missing from the merged vocabulary are dropped, as before
+        return append_records(dataset, new_rows)
 
     def load_dataset(self):
-        print("Loading dataset.csv...")
-        
-        # Try multiple possible locations
-        possible_paths = [
-            'dataset.csv',
-            'Data/dataset.csv',
-            '../dataset.csv'
-        ]
-        
-        dataset_path = None
-        for path in possible_paths:
-            if os.path.exists(path):
-                dataset_path = path
-                print(f"Found dataset at: {os.path.abspath(path)}")
-                break
-        
-        if not dataset_path:
-            print("ERROR: dataset.csv not found in any of these locations:")
-            for path in possible_paths:
-                print(f"  - {os.path.abspath(path)}")
-            raise FileNotFoundError("dataset.csv not found!")
-        
-        # Read CSV
-        raw_data = pd.read_csv(dataset_path, header=None)
-        raw_data.dropna(how='all', inplace=True)
-        
-        # Extract symptoms
-        all_symptoms = set()
-        for index, row in raw_data.iterrows():
-            symptoms = row.iloc[1:].dropna().tolist()
-            for s in symptoms:
-                if isinstance(s, str):
-                    clean_sym = s.strip().replace(" ", "_").lower()
-                    all_symptoms.add(clean_sym)
-        
-        sorted_symptoms = sorted(list(all_symptoms))
-        if '' in sorted_symptoms: 
-            sorted_symptoms.remove('')
-        
-        print(f"Found {len(sorted_symptoms)} unique symptoms")
-        
-        # Create encoded dataframe
-        encoded_data = []
-        for index, row in raw_data.iterrows():
-            disease = row.iloc[0]
-            if not isinstance(disease, str): 
-                continue
-            
-            row_dict = {sym: 0 for sym in sorted_symptoms}
-            row_dict['prognosis'] = disease.strip()
-            
-            current_symptoms = row.iloc[1:].dropna().tolist()
-            for s in current_symptoms:
-                if isinstance(s, str):
-                    clean_sym = s.strip().replace(" ", "_").lower()
-                    if clean_sym in row_dict:
-                        row_dict[clean_sym] = 1
-            
-            encoded_data.append(row_dict)
-        
-        df = pd.DataFrame(encoded_data)
-        print(f"Created dataframe with {len(df)} rows")
-        return df.fillna(0)
+        from dataset_loaders import ALIASES_FILE, SEARCH_DIRS, configured_datasets, find_dataset, load_dataset_files
+        from training_pipeline import cached_features
+        names = configured_datasets()
+        print(f"Loading {', '.join(names)}...")
+
+        dataset_paths = []
+        for name in names:
+            path = find_dataset(name)
+            if not path:
+                print(f"ERROR: {name} not found in any of these locations:")
+                for directory in SEARCH_DIRS:
+                    print(f"  - {os.path.abspath(os.path.join(directory, name))}")
+                raise FileNotFoundError(f"{name} not found!")
+            print(f"Found dataset at: {os.path.abspath(path)}")
+            dataset_paths.append(path)
+
+        # Stream + merge into one sparse matrix, cached by the files' content hashes
+        dataset, cache_hit = cached_features(dataset_paths, load_dataset_files,
+                                             extra_paths=[find_dataset(ALIASES_FILE)])
+        if cache_hit:
+            print("Encoded features loaded from cache")
+        print(f"Found {len(dataset.cols)} unique symptoms")
+        print(f"Created sparse matrix with {dataset.shape[0]} rows, {dataset.X.nnz} active symptoms")
+        return dataset
 
     def train_model(self):
         print("\n" + "="*60)
         print("TRAINING MODEL")
         print("="*60)
         
+        from sklearn import preprocessing
+        from sklearn.model_selection import train_test_split
+        from dataset_loaders import drop_rare_classes
+        from training_pipeline import StageTimer, assemble_voting, fit_members
+
+        timer = StageTimer()
         try:
             # Load dataset
-            training = self.load_dataset()
+            with timer.stage("load datasets"):
+                training = self.load_dataset()
             print(f"Dataset shape: {training.shape}")
             
             # Augment
             print("Augmenting data...")
-            training = self.augment_data(training)
+            with timer.stage("augment"):
+                training = self.augment_data(training)
             print(f"Augmented shape: {training.shape}")
+            training, dropped = drop_rare_classes(training, MIN_CLASS_ROWS)
+            if dropped:
+                print(f"Dropped diseases with fewer than {MIN_CLASS_ROWS} rows: {', '.join(dropped)}")
             
             # Prepare data
-            self.cols = training.columns.drop('prognosis')
+            self.cols = list(training.cols)
             print(f"Number of features: {len(self.cols)}")
             
-            x = training[self.cols]
-            y = training['prognosis']
+            x = training.X
+            y = training.labels
             
-            print(f"Number of diseases: {len(y.unique())}")
+            print(f"Number of diseases: {len(np.unique(y))}")
             
             # Encode
+            self.le = preprocessing.LabelEncoder()
             y = self.le.fit_transform(y)
+            self.classes = self.le.classes_
             
             # Split
-            x_train, x_test, y_train, y_test = train_test_split(x, y, test_size=0.33, random_state=42)
-            print(f"Training samples: {len(x_train)}, Test samples: {len(x_test)}")
+            x_train, x_test, y_train, y_test = train_test_split(x, y, test_size=0.33, random_state=42, stratify=y)
+            print(f"Training samples: {x_train.shape[0]}, Test samples: {x_test.shape[0]}")
             
-            # Train
+            # Train members in parallel; unchanged members come from the cache
             print("Training model (this may take a minute)...")
-            rf = RandomForestClassifier(n_estimators=100, random_state=42)
-            svc = SVC(kernel='linear', probability=True, random_state=42)
-            nb = MultinomialNB()
-            
-            self.model = VotingClassifier(
-                estimators=[('rf', rf), ('svc', svc), ('nb', nb)], 
-                voting='soft'
-            )
-            
-            self.model.fit(x_train, y_train)
+            members = ensemble_members()
+            with timer.stage("fit ensemble (wall)"):
+                fitted = fit_members(members, x_train, y_train, timer=timer)
+                check_member_classes(fitted, len(self.le.classes_))
+                self.model = assemble_voting(members, fitted, x_train, y_train)
             
             # Test accuracy
-            accuracy = self.model.score(x_test, y_test)
+            with timer.stage("score"):
+                accuracy = self.model.score(x_test, y_test)
             print(f"Model accuracy: {accuracy * 100:.2f}%")
             
             # Create symptom dictionary
@@ -228,8 +220,10 @@ class DiseasePredictor:
             
             # Save
             print("\nSaving model...")
-            self.save_model()
+            with timer.stage("save + compile"):
+                self.save_model()
             
+            timer.report()
             print("="*60)
             print("TRAINING COMPLETE!")
             print("="*60 + "\n")
@@ -240,246 +234,6 @@ class DiseasePredictor:
             traceback.print_exc()
             raise
 
-    def load_knowledge_base(self):
-        # Try to load from Data folder or current folder
-        desc_paths = ['symptom_Description.csv', 'Data/symptom_Description.csv']
-        prec_paths = ['symptom_precaution.csv', 'Data/symptom_precaution.csv']
-        sev_paths = ['Symptom_severity.csv', 'Data/Symptom_severity.csv']
-        
-        # Load descriptions
-        for path in desc_paths:
-            if os.path.exists(path):
-                try:
-                    with open(path, encoding='utf-8') as csv_file:
-                        reader = csv.reader(csv_file)
-                        next(reader)  # Skip header
-                        for row in reader:
-                            if len(row) >= 2:
-                                self.description_list[row[0]] = row[1]
-                    print(f"Loaded descriptions from {path}")
-                    break
-                except:
-                    pass
-        
-        # Manual additions
-        self.description_list['Influenza'] = "Influenza (The Flu) is a viral infection attacking the respiratory system."
-        self.description_list['Acute Sinusitis'] = "Acute Sinusitis is the inflammation of the sinuses."
-        
-        # Load precautions
-        for path in prec_paths:
-            if os.path.exists(path):
-                try:
-                    with open(path, encoding='utf-8') as csv_file:
-                        reader = csv.reader(csv_file)
-                        next(reader)
-                        for row in reader:
-                            if len(row) >= 5:
-                                self.precautionDictionary[row[0]] = [row[1], row[2], row[3], row[4]]
-                    print(f"Loaded precautions from {path}")
-                    break
-                except:
-                    pass
-        
-        self.precautionDictionary['Influenza'] = ["stay hydrated", "rest", "antiviral medication", "monitor temperature"]
-        self.precautionDictionary['Acute Sinusitis'] = ["steam inhalation", "warm compress", "saline spray", "hydrate"]
-        
-        # Load severity
-        for path in sev_paths:
-            if os.path.exists(path):
-                try:
-                    with open(path, encoding='utf-8') as csv_file:
-                        reader = csv.reader(csv_file)
-                        next(reader)
-                        for row in reader:
-                            if len(row) >= 2:
-                                try:
-                                    self.severityDictionary[row[0]] = int(row[1])
-                                except:
-                                    pass
-                    print(f"Loaded severity from {path}")
-                    break
-                except:
-                    pass
-
-    def extract_symptoms_robust(self, user_input):
-        # Your existing code here - keep as is
-        symptom_map = {
-            # --- English Synonyms ---
-            "stomach ache": "stomach_pain", "belly pain": "stomach_pain",
-            "fever": "high_fever", "high temp": "high_fever",
-            "chest pain": "chest_pain", "chest tight": "chest_pain",
-            "coughing": "cough", "flu": "influenza",
-            "weakness": "fatigue", "tired": "fatigue",
-            "dizzy": "dizziness", "headache": "headache",
-            "sore throat": "throat_irritation", 
-            "pain behind eyes": "pain_behind_the_eyes",
-            "joint pain": "joint_pain", "runny nose": "runny_nose",
-            "sinus": "sinus_pressure", "sneezing": "continuous_sneezing",
-            "chills": "chills", "red eyes": "redness_of_eyes",
-            "vomit": "vomiting", "throwing up": "vomiting",
-            
-            # --- MALAY TRANSLATIONS (Bahasa Melayu) ---
-            "demam": "high_fever", "panas badan": "high_fever", "badan panas": "high_fever",
-            "batuk": "cough", "uhuk": "cough",
-            "sakit kepala": "headache", "pening": "headache", "kepala sakit": "headache",
-            "selesema": "runny_nose", "hidung berair": "runny_nose", "hingus": "runny_nose",
-            "bersin": "continuous_sneezing",
-            "menggigil": "chills", "sejuk": "chills",
-            "penat": "fatigue", "letih": "fatigue", "lesu": "fatigue", "badan lemah": "fatigue",
-            "sakit dada": "chest_pain", "dada sakit": "chest_pain", "sesak nafas": "breathlessness",
-            "sakit tekak": "throat_irritation", "perit tekak": "throat_irritation",
-            "sakit sendi": "joint_pain", "lenguh": "joint_pain",
-            "muntah": "vomiting", "loya": "nausea",
-            "cirit": "diarrhoea", "cirit birit": "diarrhoea", "sakit perut": "stomach_pain",
-            "ruam": "skin_rash", "gatal": "itching",
-            "mata merah": "redness_of_eyes", "sakit mata": "pain_behind_the_eyes",
-            "resdung": "sinus_pressure", "hidung tersumbat": "congestion",
-            
-            # --- Missed Synonyms (Fix for Chickenpox vs Impetigo) ---
-            "blister": "red_spots_over_body", "blisters": "red_spots_over_body", 
-            "scab": "red_spots_over_body", "scabs": "red_spots_over_body",
-            "crust": "red_spots_over_body", "crusting": "red_spots_over_body",
-            "red spots": "red_spots_over_body",
-            "rash": "skin_rash", "skin rash": "skin_rash",
-            "loss of appetite": "loss_of_appetite"
-        }
-        
-        extracted = set()
-        text = user_input.lower().replace("-", " ").replace(",", " ").replace(".", " ")
-        
-        # 2. Exact Phrase Matching
-        for phrase, mapped_sym in symptom_map.items():
-            if phrase in text:
-                extracted.add(mapped_sym)
-
-        # 3. Fuzzy Logic for Typos
-        words = text.split()
-        all_possible_keywords = list(symptom_map.keys()) + self.cols.tolist()
-
-        ai_symptoms = []
-        if user_input:
-            ai_symptoms = self.ai_ner.extract_symptoms(user_input)
-            print(f"AI found: {ai_symptoms}")
-
-        # Add AI findings to your extracted list
-        for s in ai_symptoms:
-            extracted.add(s)
-
-        for word in words:
-            if len(word) < 4: continue
-            # This requires 'from difflib import get_close_matches' at the top
-            matches = get_close_matches(word, all_possible_keywords, n=1, cutoff=0.80)
-            
-            if matches:
-                match = matches[0]
-                if match in symptom_map:
-                    extracted.add(symptom_map[match])
-                elif match in self.cols:
-                    extracted.add(match)
-                
-        return list(extracted)
-
-    def predict(self, user_input):
-        symptoms_list = self.extract_symptoms_robust(user_input)
-    
-        if not symptoms_list:
-            return {"error": "No recognizable symptoms. Please list your symptoms clearly (e.g., 'Fever and Cough')"}
-
-        # Vectorize
-        input_vector = np.zeros(len(self.symptoms_dict))
-        for item in symptoms_list:
-            if item in self.symptoms_dict:
-                input_vector[self.symptoms_dict[item]] = 1
-
-        # Predict
-        probs = self.model.predict_proba([input_vector])[0]
-        top_indices = np.argsort(probs)[-5:][::-1]
-    
-        top_3 = []
-        for idx in top_indices:
-            disease = self.le.inverse_transform([idx])[0]
-            prob = probs[idx]
-            if prob > 0.001:
-                top_3.append({"disease": disease, "confidence": prob})
-
-        # --- 🧠 MEDICAL LOGIC & SANITY CHECKS ---
-        input_set = set(symptoms_list)
-    
-        has_breathlessness = 'breathlessness' in input_set
-        has_chills = 'chills' in input_set
-        has_sneezing = 'continuous_sneezing' in input_set or 'runny_nose' in input_set
-    
-        # 1. ASTHMA CHECK
-        for d in top_3:
-            if d['disease'] == 'Bronchial Asthma' and not has_breathlessness:
-                d['confidence'] -= 0.50
-
-        # 2. COMMON COLD BOOST
-        if 'cough' in input_set and ('headache' in input_set or has_sneezing):
-             for d in top_3:
-                if d['disease'] == 'Common Cold': 
-                    d['confidence'] += 0.4
-
-        # 3. INFLUENZA CHECK
-        if 'high_fever' in input_set and has_chills:
-            for d in top_3:
-                if d['disease'] == 'Influenza': 
-                    d['confidence'] += 0.3
-                if d['disease'] == 'Common Cold': 
-                    d['confidence'] -= 0.2
-
-        # 4. PARALYSIS & AIDS PENALTY
-        has_neuro = any(s in input_set for s in ['vomiting', 'weakness_of_one_body_side', 'altered_sensorium'])
-        if not has_neuro:
-             for d in top_3:
-                if d['disease'] == 'Paralysis (brain hemorrhage)': 
-                    d['confidence'] -= 0.8
-    
-        has_aids_signs = any(s in input_set for s in ['muscle_wasting', 'patches_in_throat', 'extra_marital_contacts'])
-        if not has_aids_signs:
-             for d in top_3:
-                if d['disease'] == 'AIDS': 
-                    d['confidence'] -= 0.8
-
-        # 5. VIRAL FEVER DEFAULT
-        if len(input_set) <= 3 and 'high_fever' in input_set:
-            for d in top_3:
-                if d['disease'] == 'Viral Fever': 
-                    d['confidence'] += 0.3
-
-        # --- FINAL SORTING ---
-        top_3.sort(key=lambda x: x['confidence'], reverse=True)
-    
-        # Filter out negatives and keep top 3
-        top_3 = [d for d in top_3 if d['confidence'] > 0]
-        top_3 = top_3[:3]
-
-        # CRITICAL FIX: Handle case where all diseases were filtered out
-        if not top_3:
-            # Fallback to most generic diagnosis
-            top_3 = [{"disease": "Viral Fever", "confidence": 50.0}]
-
-        # Normalize percentages
-        total_score = sum(d['confidence'] for d in top_3)
-        if total_score > 0:
-            for d in top_3:
-                d['confidence'] = round((d['confidence'] / total_score) * 100, 2)
-    
-        # Build response
-        primary = top_3[0]
-        alternatives = top_3[1:] if len(top_3) > 1 else []
-    
-        result = {
-            "symptoms_detected": symptoms_list,
-            "primary_diagnosis": primary['disease'],
-            "confidence": primary['confidence'],
-            "description": self.description_list.get(primary['disease'], "No description available"),
-            "precautions": self.precautionDictionary.get(primary['disease'], []),
-            "alternatives": alternatives
-        }
-    
-        return result
-
 # Test when run directly
 if __name__ == "__main__":  # FIXED: Double underscore
     print("Current directory:", os.getcwd())
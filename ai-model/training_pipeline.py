@@ -0,0 +1,183 @@
+"""
+Parallel, incremental training helpers for DiseasePredictor.train_model.
+
+- StageTimer: wall-clock time per training stage, printed as a table
+- cached_features: encoded feature matrix cached under the sha256 of the
+  dataset files, so unchanged data is never re-encoded
+- fit_members: fits the ensemble members in parallel threads (forest
+  building and libsvm release the GIL) and caches
+  each fitted member under a key made from its class, hyperparameters,
+  the scikit-learn version and the exact training arrays; only members
+  whose key changed are refit
+- assemble_voting: a fitted soft VotingClassifier built from those members
+
+The cache lives in .train_cache/ (override with DIAGNOCHAIN_TRAIN_CACHE).
+Only the entries of the latest run are kept; older features and members
+are deleted once they are superseded.
+"""
+import os
+import time
+import hashlib
+import contextlib
+
+import joblib
+import numpy as np
+
+CACHE_DIR = os.environ.get('DIAGNOCHAIN_TRAIN_CACHE', '.train_cache')
+# Bump when the encoder output changes, so cached features are not reused
+ENCODER_VERSION = 3
+# Parameters that change speed but not the fitted model
+IGNORED_PARAMS = ('n_jobs', 'verbose')
+
+
+class StageTimer:
+    def __init__(self):
+        self.stages = []
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages.append((name, time.perf_counter() - start))
+
+    def add(self, name, seconds):
+        self.stages.append((name, seconds))
+
+    def report(self):
+        width = max(len(name) for name, _ in self.stages)
+        print("Stage timings:")
+        for name, seconds in self.stages:
+            print(f"  {name:<{width}}  {seconds:8.3f} s")
+
+
+def _hash_update(digest, *parts):
+    for part in parts:
+        if hasattr(part, 'indptr'):
+            # scipy sparse (CSR): hash its buffers, never a dense copy
+            digest.update(str((part.format, part.shape)).encode())
+            _hash_update(digest, part.data, part.indices, part.indptr)
+        elif isinstance(part, np.ndarray):
+            digest.update(str((part.dtype, part.shape)).encode())
+            digest.update(np.ascontiguousarray(part).tobytes())
+        else:
+            digest.update(repr(part).encode())
+    return digest
+
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _cache_path(kind, key, cache_dir):
+    os.makedirs(cache_dir, exist_ok=True)
+    return os.path.join(cache_dir, f"{kind}-{key[:32]}.joblib")
+
+
+def _evict(prefix, keep, cache_dir):
+    """Delete cache files starting with prefix, except the paths in keep."""
+    keep = {os.path.abspath(path) for path in keep}
+    for entry in os.listdir(cache_dir):
+        path = os.path.abspath(os.path.join(cache_dir, entry))
+        if entry.startswith(prefix) and entry.endswith('.joblib') and path not in keep:
+            with contextlib.suppress(OSError):
+                os.remove(path)
+
+
+def cached_features(dataset_paths, encode, cache_dir=CACHE_DIR, extra_paths=()):
+    """
+    Return encode(dataset_paths), cached by the content hashes of the files
+    and of extra_paths (other inputs of encode, e.g. the alias table).
+    Second value is True on a cache hit.
+    """
+    digests = ":".join(file_digest(p) for p in list(dataset_paths) + [p for p in extra_paths if p])
+    key = hashlib.sha256(f"{digests}:{ENCODER_VERSION}".encode()).hexdigest()
+    path = _cache_path('features', key, cache_dir)
+    _evict('features-', [path], cache_dir)
+    if os.path.exists(path):
+        try:
+            return joblib.load(path), True
+        except Exception:
+            pass
+    value = encode(dataset_paths)
+    joblib.dump(value, path)
+    return value, False
+
+
+def member_key(name, estimator, x, y, feature_names=None):
+    import sklearn
+
+    params = {k: v for k, v in estimator.get_params(deep=False).items() if k not in IGNORED_PARAMS}
+    digest = hashlib.sha256()
+    _hash_update(digest, name, type(estimator).__module__, type(estimator).__qualname__, sorted(params.items()))
+    # A pickle from another scikit-learn release may load but predict differently
+    _hash_update(digest, sklearn.__version__)
+    _hash_update(digest, feature_names, x, y)
+    return digest.hexdigest()
+
+
+def _fit_one(estimator, x, y):
+    start = time.perf_counter()
+    estimator.fit(x, y)
+    return estimator, time.perf_counter() - start
+
+
+def fit_members(members, x, y, cache_dir=CACHE_DIR, n_jobs=-1, timer=None):
+    """
+    Fit (name, estimator) pairs on x, y. Cached members are loaded; the rest
+    are fitted in parallel. y must already be label-encoded (0..k-1), as
+    VotingClassifier hands its members. Returns {name: fitted estimator}.
+    """
+    from sklearn.base import clone
+
+    x_arr = x if hasattr(x, 'indptr') else np.asarray(x)
+    y_arr = np.asarray(y)
+    feature_names = list(x.columns) if hasattr(x, 'columns') else None
+
+    fitted = {}
+    missing = []
+    paths = []
+    for name, estimator in members:
+        key = member_key(name, estimator, x_arr, y_arr, feature_names)
+        path = _cache_path(f"member-{name}", key, cache_dir)
+        paths.append(path)
+        if os.path.exists(path):
+            try:
+                fitted[name] = joblib.load(path)
+                print(f"  {name}: unchanged, loaded from cache")
+                continue
+            except Exception:
+                pass
+        missing.append((name, estimator, path))
+
+    _evict('member-', paths, cache_dir)
+    if missing:
+        print(f"  fitting {', '.join(name for name, _, _ in missing)} in parallel...")
+        results = joblib.Parallel(n_jobs=min(len(missing), n_jobs if n_jobs > 0 else len(missing)), prefer="threads")(
+            joblib.delayed(_fit_one)(clone(estimator), x, y) for _, estimator, _ in missing
+        )
+        for (name, _, path), (estimator, seconds) in zip(missing, results):
+            joblib.dump(estimator, path)
+            fitted[name] = estimator
+            if timer is not None:
+                timer.add(f"fit {name}", seconds)
+
+    return fitted
+
+
+def assemble_voting(members, fitted, x, y, voting='soft'):
+    """
+    A fitted VotingClassifier, equivalent to VotingClassifier(members).fit(x, y).
+    The fitted members are wrapped in FrozenEstimator, so VotingClassifier.fit
+    sets up its encoder and attributes without refitting them.
+    """
+    from sklearn.ensemble import VotingClassifier
+    from sklearn.frozen import FrozenEstimator
+
+    frozen = [(name, FrozenEstimator(fitted[name])) for name, _ in members]
+    return VotingClassifier(estimators=frozen, voting=voting).fit(x, y)
@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+Preforked pool of prediction workers (POSIX only).
+
+The parent loads the predictor once, runs one warm-up prediction, freezes
+the garbage collector's view of it (gc.freeze, so collections in the
+children do not write to the shared pages) and then forks --workers
+children. They share the parent's predictor pages copy-on-write. Each child
+runs the normal JSON-lines WorkerServer on the listening socket inherited
+from the parent. The kernel hands every new connection to whichever child
+accepts first, so load spreads by connection and no child's GIL is shared
+with another's.
+
+The parent never serves requests:
+- a child that exits unexpectedly is forked again from the loaded state
+- SIGHUP, a "reload" op sent to any child, or a change of
+  diagnochain_model.pkl / the compiled manifest (polled every
+  DIAGNOCHAIN_POOL_WATCH seconds, acted on once two polls agree) rolls the pool
+  over: the new predictor is loaded in the parent, a new generation is
+  forked, and only then are the old children told to drain
+- a draining child stops accepting, closes each connection after its
+  current reply and exits once no request is in flight (at most
+  DIAGNOCHAIN_POOL_GRACE seconds); queued connections go to the new
+  generation
+- SIGTERM / SIGINT drain every child and exit
+
+NER is not shared: each child builds its own pipeline on first use (or its
+own NER process with DIAGNOCHAIN_NER=process).
+
+Start it through the worker:  python prediction_worker.py --workers 4
+"""
+import os
+import gc
+import sys
+import time
+import signal
+import threading
+import traceback
+
+from compiled_model import DEFAULT_COMPILED_PATH, DEFAULT_MODEL_PATH, MANIFEST_NAME
+from prediction_worker import PredictionWorker, WorkerServer, load_predictor
+
+DEFAULT_WATCH_INTERVAL = float(os.environ.get('DIAGNOCHAIN_POOL_WATCH', '5'))
+DEFAULT_GRACE = float(os.environ.get('DIAGNOCHAIN_POOL_GRACE', '30'))
+# A child that dies sooner than this after its fork is restarted with a delay
+MIN_CHILD_LIFETIME = 1.0
+POLL_INTERVAL = 0.2
+
+
+def model_signature():
+    """(mtime, size) of the pickle and of the compiled manifest."""
+    signature = []
+    for path in (DEFAULT_MODEL_PATH, os.path.join(DEFAULT_COMPILED_PATH, MANIFEST_NAME)):
+        try:
+            st = os.stat(path)
+            signature.append((st.st_mtime_ns, st.st_size))
+        except OSError:
+            signature.append(None)
+    return tuple(signature)
+
+
+def warm_up(predictor):
+    """One prediction without NER, so first-call costs are paid before the fork."""
+    with_symptoms = [[predictor.cols[0]]] if len(predictor.cols) else []
+    if with_symptoms:
+        predictor.predict_symptom_lists(with_symptoms)
+    predictor.symptom_extractor.extract_batch(["fever and cough"])
+
+
+class PoolServer(WorkerServer):
+    def __init__(self, address):
+        self.draining = False
+        super().__init__(address, None)
+        # Every child selects on this socket; the ones that lose the race for
+        # a connection must get EAGAIN instead of blocking in accept()
+        self.socket.setblocking(False)
+
+    def get_request(self):
+        conn, addr = self.socket.accept()
+        conn.setblocking(True)
+        return conn, addr
+
+
+class PoolWorker(PredictionWorker):
+    """PredictionWorker in a forked child: counts in-flight requests and leaves reloads to the parent."""
+
+    def __init__(self, predictor, generation, **kwargs):
+        super().__init__(predictor=predictor, **kwargs)
+        self.generation = generation
+        self.active = 0
+        self.active_lock = threading.Lock()
+
+    def handle_line(self, line):
+        with self.active_lock:
+            self.active += 1
+        try:
+            return super().handle_line(line)
+        finally:
+            with self.active_lock:
+                self.active -= 1
+
+    def reload(self):
+        os.kill(os.getppid(), signal.SIGHUP)
+
+    def health(self):
+        health = super().health()
+        health.update({"parent_pid": os.getppid(), "generation": self.generation, "active": self.active})
+        return health
+
+
+def _serve_child(server, predictor, generation, max_batch_size, max_wait_ms, grace):
+    for signum in (signal.SIGINT, signal.SIGHUP):
+        signal.signal(signum, signal.SIG_IGN)
+    signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+
+    def drain(*_):
+        server.draining = True
+        # shutdown() waits for serve_forever, so it cannot run in the handler's thread
+        threading.Thread(target=server.shutdown, daemon=True).start()
+    signal.signal(signal.SIGTERM, drain)
+
+    worker = PoolWorker(predictor, generation, max_batch_size=max_batch_size, max_wait_ms=max_wait_ms)
+    server.worker = worker
+    server.serve_forever(poll_interval=0.5)
+
+    deadline = time.monotonic() + grace
+    while worker.active and time.monotonic() < deadline:
+        time.sleep(0.05)
+
+
+class WorkerPool:
+    def __init__(self, address, workers, max_batch_size, max_wait_ms,
+                 watch_interval=DEFAULT_WATCH_INTERVAL, grace=DEFAULT_GRACE):
+        self.address = address
+        self.workers = max(1, workers)
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self.watch_interval = watch_interval
+        self.grace = grace
+        self.server = PoolServer(address)
+        self.predictor = None
+        self.generation = 0
+        # pid -> (generation, fork time)
+        self.children = {}
+        self.reload_requested = False
+        self.stopping = False
+
+    def load(self):
+        gc.unfreeze()
+        predictor = load_predictor(sys.stderr)
+        warm_up(predictor)
+        gc.collect()
+        gc.freeze()
+        return predictor
+
+    def spawn(self):
+        pid = os.fork()
+        if pid == 0:
+            code = 1
+            try:
+                _serve_child(self.server, self.predictor, self.generation,
+                             self.max_batch_size, self.max_wait_ms, self.grace)
+                code = 0
+            except BaseException:
+                traceback.print_exc()
+            finally:
+                sys.stderr.flush()
+                os._exit(code)
+        self.children[pid] = (self.generation, time.monotonic())
+        return pid
+
+    def rollover(self):
+        old = [pid for pid, (generation, _) in self.children.items() if generation == self.generation]
+        try:
+            predictor = self.load()
+        except Exception as e:
+            print(f"Reload failed, keeping generation {self.generation}: {e}", file=sys.stderr)
+            return
+        self.predictor = predictor
+        self.generation += 1
+        for _ in range(self.workers):
+            self.spawn()
+        for pid in old:
+            self._signal(pid, signal.SIGTERM)
+        print(f"Pool rolled over to generation {self.generation}", file=sys.stderr)
+
+    def reap(self):
+        while self.children:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            generation, started = self.children.pop(pid, (None, 0.0))
+            if generation != self.generation or self.stopping:
+                continue
+            print(f"Worker {pid} exited with {os.waitstatus_to_exitcode(status)}; restarting", file=sys.stderr)
+            if time.monotonic() - started < MIN_CHILD_LIFETIME:
+                time.sleep(MIN_CHILD_LIFETIME)
+            self.spawn()
+
+    def _signal(self, pid, signum):
+        try:
+            os.kill(pid, signum)
+        except ProcessLookupError:
+            pass
+
+    def _request_stop(self, *_):
+        self.stopping = True
+
+    def _request_reload(self, *_):
+        self.reload_requested = True
+
+    def run(self):
+        signal.signal(signal.SIGTERM, self._request_stop)
+        signal.signal(signal.SIGINT, self._request_stop)
+        signal.signal(signal.SIGHUP, self._request_reload)
+
+        self.predictor = self.load()
+        signature = pending = model_signature()
+        for _ in range(self.workers):
+            self.spawn()
+        print(f"Prediction worker pool ({self.workers} workers) listening on "
+              f"{self.address[0]}:{self.address[1]}", file=sys.stderr)
+
+        next_check = time.monotonic() + self.watch_interval
+        try:
+            while not self.stopping:
+                time.sleep(POLL_INTERVAL)
+                self.reap()
+                changed = False
+                if self.watch_interval > 0 and time.monotonic() >= next_check:
+                    next_check = time.monotonic() + self.watch_interval
+                    current = model_signature()
+                    # Retraining writes the pickle, then the arrays: wait until both settle
+                    changed = current != signature and current == pending
+                    pending = current
+                if self.reload_requested or changed:
+                    self.reload_requested = False
+                    signature = pending = model_signature()
+                    self.rollover()
+        finally:
+            self.shutdown()
+
+    def shutdown(self):
+        self.stopping = True
+        for pid in list(self.children):
+            self._signal(pid, signal.SIGTERM)
+        deadline = time.monotonic() + self.grace + 1
+        while self.children and time.monotonic() < deadline:
+            self.reap()
+            time.sleep(0.05)
+        for pid in list(self.children):
+            self._signal(pid, signal.SIGKILL)
+        self.server.server_close()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Benchmark + parity check: the sparse loader path training uses
+(SymptomListLoader + SparseDatasetBuilder) vs the original iterrows()
+encoder, on dataset.csv. The encoder is the reference implementation the
+loader tests use (ai-model/tests/legacy_encoding.py).
+Run from the repo root: python benchmarks/bench_dataset_encoding.py [--repeat 3]
+
+Exits non-zero if the two disagree on column order, labels or any cell.
+"""
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+AI_MODEL_DIR = os.path.join(ROOT, 'ai-model')
+sys.path.insert(0, AI_MODEL_DIR)
+sys.path.insert(0, os.path.join(AI_MODEL_DIR, 'tests'))
+
+from dataset_loaders import SparseDatasetBuilder, SymptomListLoader
+from legacy_encoding import legacy_encode, read_raw
+
+
+def sparse_encode(path):
+    # No aliases: dataset.csv already uses the canonical names
+    builder = SparseDatasetBuilder()
+    builder.add_loader(SymptomListLoader(path))
+    return builder.build()
+
+
+def best_of(fn, arg, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(arg)
+        times.append(time.perf_counter() - start)
+    return result, min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--dataset', default=os.path.join(AI_MODEL_DIR, 'dataset.csv'))
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    raw_data = read_raw(args.dataset)
+
+    legacy, legacy_time = best_of(legacy_encode, raw_data, 1)
+    fast, fast_time = best_of(sparse_encode, args.dataset, args.repeat)
+
+    legacy_cols = [c for c in legacy.columns if c != 'prognosis']
+    same_columns = legacy_cols == list(fast.cols)
+    same_labels = bool((legacy['prognosis'].to_numpy() == fast.labels).all())
+    same_cells = same_columns and np.array_equal(
+        legacy[legacy_cols].to_numpy(dtype=np.int64),
+        fast.X.toarray().astype(np.int64)
+    )
+
+    print(f"rows x symptoms:     {fast.shape[0]} x {fast.shape[1]}")
+    print(f"iterrows encoder:    {legacy_time * 1000:.1f} ms")
+    print(f"sparse loader:       {fast_time * 1000:.1f} ms")
+    print(f"speedup:             {legacy_time / fast_time:.1f}x")
+    print(f"same columns/labels/cells: {same_columns}/{same_labels}/{same_cells}")
+    sys.exit(0 if same_columns and same_labels and same_cells else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Benchmark: compiled symptom extraction vs the original substring + difflib path
+Run from the repo root: python benchmarks/bench_extraction.py [--texts 2000]
+
+The original path is reproduced below (without the NER step, which both
+paths share), extended with a naive scan for whole column names so it has
+the same semantics as the shared vocabulary. Every text is checked for
+identical output before timing.
+"""
+import os
+import sys
+import time
+import argparse
+from difflib import get_close_matches
+
+import joblib
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+AI_MODEL_DIR = os.path.join(ROOT, 'ai-model')
+sys.path.insert(0, AI_MODEL_DIR)
+
+from corpus import SYMPTOM_MAP, build_corpus
+from symptom_index import get_extractor
+from symptom_vocab import column_tokens
+
+
+def legacy_extract(user_input, cols):
+    symptom_map = dict(SYMPTOM_MAP)
+    extracted = set()
+    text = user_input.lower().replace("-", " ").replace(",", " ").replace(".", " ")
+
+    for phrase, mapped_sym in symptom_map.items():
+        if phrase in text:
+            extracted.add(mapped_sym)
+
+    words = text.split()
+    all_possible_keywords = list(symptom_map.keys()) + cols
+
+    for word in words:
+        if len(word) < 4: continue
+        matches = get_close_matches(word, all_possible_keywords, n=1, cutoff=0.80)
+        if matches:
+            match = matches[0]
+            if match in symptom_map:
+                extracted.add(symptom_map[match])
+            elif match in cols:
+                extracted.add(match)
+
+    padded = f" {' '.join(words)} "
+    for col in cols:
+        if f" {' '.join(column_tokens(col))} " in padded:
+            extracted.add(col)
+
+    return extracted
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--texts', type=int, default=2000)
+    args = parser.parse_args()
+
+    cols = list(joblib.load(os.path.join(AI_MODEL_DIR, 'diagnochain_model.pkl'))['cols'])
+    corpus = build_corpus(args.texts)
+
+    start = time.perf_counter()
+    extractor = get_extractor(cols)
+    build_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    legacy = [legacy_extract(text, cols) for text in corpus]
+    legacy_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    compiled = extractor.extract_batch(corpus)
+    compiled_time = time.perf_counter() - start
+
+    mismatches = [t for t, a, b in zip(corpus, legacy, compiled) if a != b]
+    print(f"texts:               {len(corpus)}")
+    print(f"index build:         {build_time * 1000:.1f} ms")
+    print(f"legacy path:         {legacy_time * 1000:.1f} ms ({legacy_time / len(corpus) * 1e6:.0f} us/text)")
+    print(f"compiled path:       {compiled_time * 1000:.1f} ms ({compiled_time / len(corpus) * 1e6:.0f} us/text)")
+    print(f"speedup:             {legacy_time / compiled_time:.1f}x")
+    print(f"output mismatches:   {len(mismatches)}")
+    for text in mismatches[:5]:
+        print(f"  {text!r}")
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Benchmark: NER backends (full-precision torch vs local ONNX / int8)
+Run from the repo root: python benchmarks/bench_ner_backends.py [--backends torch,onnx,int8]
+
+Each backend runs in its own spawned process so their memory does not mix.
+Reported per backend: load time, peak RSS after loading and scoring,
+single-sentence latency (p50/p95 over the ner_export.PARITY_SENTENCES) and
+sentences/second when the whole set goes through as one batch.
+The local backends need `python ner_export.py export` in ai-model/ first.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import multiprocessing
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+AI_MODEL_DIR = os.path.join(ROOT, 'ai-model')
+sys.path.insert(0, AI_MODEL_DIR)
+
+
+def _percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q * (len(values) - 1))))]
+
+
+def _worker(backend, repeat, batch_size, queue):
+    import resource
+    import warnings
+    warnings.filterwarnings("ignore")
+    os.chdir(AI_MODEL_DIR)
+    from ner_extractor import build_pipeline
+    from ner_export import PARITY_SENTENCES
+
+    try:
+        start = time.perf_counter()
+        ner_pipeline = build_pipeline(backend)
+        load_time = time.perf_counter() - start
+    except Exception as e:
+        queue.put({'backend': backend, 'error': str(e)})
+        return
+
+    ner_pipeline(PARITY_SENTENCES[0])  # warm-up
+
+    latencies = []
+    for _ in range(repeat):
+        for sentence in PARITY_SENTENCES:
+            start = time.perf_counter()
+            ner_pipeline(sentence)
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        ner_pipeline(PARITY_SENTENCES, batch_size=batch_size)
+    batch_time = (time.perf_counter() - start) / repeat
+
+    queue.put({
+        'backend': backend,
+        'load_s': round(load_time, 2),
+        'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        'p50_ms': round(_percentile(latencies, 0.50) * 1000, 2),
+        'p95_ms': round(_percentile(latencies, 0.95) * 1000, 2),
+        'batch_sentences_per_s': round(len(PARITY_SENTENCES) / batch_time, 1),
+    })
+
+
+def measure(backend, repeat, batch_size):
+    ctx = multiprocessing.get_context('spawn')
+    queue = ctx.Queue()
+    proc = ctx.Process(target=_worker, args=(backend, repeat, batch_size, queue))
+    proc.start()
+    result = queue.get()
+    proc.join()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--backends', default='torch,onnx,int8')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--batch-size', type=int, default=16)
+    parser.add_argument('--json', help="also write results to this file")
+    args = parser.parse_args()
+
+    results = []
+    print(f"{'backend':<8} {'load':>7} {'peak RSS':>10} {'p50':>9} {'p95':>9} {'batch':>12}")
+    for backend in args.backends.split(','):
+        r = measure(backend.strip(), args.repeat, args.batch_size)
+        results.append(r)
+        if 'error' in r:
+            print(f"{r['backend']:<8} failed: {r['error']}")
+            continue
+        print(f"{r['backend']:<8} {r['load_s']:>6}s {r['peak_rss_mb']:>7} MB {r['p50_ms']:>6} ms "
+              f"{r['p95_ms']:>6} ms {r['batch_sentences_per_s']:>7} sent/s")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Benchmark: memory of N prediction workers, pickle vs memory-mapped arrays
+Run from the repo root (Linux only, reads /proc): python benchmarks/bench_shared_memory.py
+
+Each worker loads the model, scores a batch so every weight page is
+touched, then waits while the parent reads its RSS and PSS
+(proportional set size: shared pages are split between the processes
+mapping them). With the pickle every worker holds a private copy; with
+diagnochain_model.arrays the weights are counted once across workers.
+"""
+import os
+import sys
+import json
+import argparse
+import multiprocessing
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+AI_MODEL_DIR = os.path.join(ROOT, 'ai-model')
+sys.path.insert(0, AI_MODEL_DIR)
+
+
+def _worker(backend, ready, done):
+    import warnings
+    import numpy as np
+    warnings.filterwarnings("ignore")
+    os.chdir(AI_MODEL_DIR)
+
+    if backend == 'pickle':
+        import joblib
+        model = joblib.load('diagnochain_model.pkl')['model']
+        n_features = model.n_features_in_
+    else:
+        from compiled_model import CompiledModel
+        model = CompiledModel.load('diagnochain_model.arrays')
+        n_features = len(model.cols)
+
+    rng = np.random.default_rng(os.getpid())
+    model.predict_proba((rng.random((256, n_features)) < 0.05).astype(float))
+    ready.set()
+    done.wait()
+
+
+def _memory_kb(pid):
+    rss = pss = 0
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            if line.startswith('Rss:'):
+                rss = int(line.split()[1])
+            elif line.startswith('Pss:'):
+                pss = int(line.split()[1])
+    return rss, pss
+
+
+def measure(backend, n_workers):
+    ctx = multiprocessing.get_context('spawn')
+    done = ctx.Event()
+    procs, events = [], []
+    for _ in range(n_workers):
+        ready = ctx.Event()
+        proc = ctx.Process(target=_worker, args=(backend, ready, done))
+        proc.start()
+        procs.append(proc)
+        events.append(ready)
+    for ready in events:
+        ready.wait()
+
+    usage = [_memory_kb(proc.pid) for proc in procs]
+    done.set()
+    for proc in procs:
+        proc.join()
+
+    return {
+        'backend': backend,
+        'workers': n_workers,
+        'total_rss_mb': round(sum(r for r, _ in usage) / 1024, 1),
+        'total_pss_mb': round(sum(p for _, p in usage) / 1024, 1),
+        'pss_per_worker_mb': round(sum(p for _, p in usage) / 1024 / n_workers, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--workers', default='1,2,4,8')
+    parser.add_argument('--json', help="also write results to this file")
+    args = parser.parse_args()
+
+    if not os.path.exists('/proc/self/smaps_rollup'):
+        sys.exit("This benchmark needs Linux /proc/<pid>/smaps_rollup")
+    if not os.path.isdir(os.path.join(AI_MODEL_DIR, 'diagnochain_model.arrays')):
+        sys.exit("Run 'python compiled_model.py export' in ai-model/ first")
+
+    results = []
+    print(f"{'backend':<8} {'workers':>7} {'total RSS':>10} {'total PSS':>10} {'PSS/worker':>11}")
+    for backend in ('pickle', 'mmap'):
+        for n in [int(x) for x in args.workers.split(',')]:
+            r = measure(backend, n)
+            results.append(r)
+            print(f"{backend:<8} {n:>7} {r['total_rss_mb']:>8} MB {r['total_pss_mb']:>8} MB {r['pss_per_worker_mb']:>9} MB")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
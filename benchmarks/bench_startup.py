@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Benchmark: start-up cost of the prediction entry points
+Run from the repo root: python benchmarks/bench_startup.py [--runs 5] [--top 12]
+
+Every target runs in a fresh interpreter; reported per target are the
+median wall time over --runs and the peak RSS. One more run under
+`python -X importtime` lists the imports with the largest cumulative time.
+
+- import inference: the import-light predictor module
+- import train_model: the training module (scikit-learn, pandas and joblib
+  are imported by its methods only)
+- cli: `python api_predict.py <text>` with no worker, compiled arrays
+- cli_sklearn: the same with DIAGNOCHAIN_MODEL_BACKEND=sklearn, which loads
+  the pickle and the full training stack, as every CLI call did before
+- predict_api: `python server/predict_api.py <text>`
+
+Before timing anything, `import inference` must not import any of
+FORBIDDEN_IMPORTS (SciPy is loaded by the first prediction, the training
+stack never); the run exits non-zero if it does.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+AI_MODEL_DIR = os.path.join(ROOT, 'ai-model')
+SAMPLE_TEXT = "fever, headache and a dry cough since yesterday"
+FORBIDDEN_IMPORTS = ('scipy', 'sklearn', 'pandas', 'joblib', 'transformers', 'torch')
+
+
+def targets(text):
+    no_worker = {'DIAGNOCHAIN_WORKER': '0', 'DIAGNOCHAIN_NER': 'off'}
+    return [
+        ('import inference', ['-c', 'import inference'], {}),
+        ('import train_model', ['-c', 'import train_model'], {}),
+        ('cli', ['api_predict.py', text], no_worker),
+        ('cli_sklearn', ['api_predict.py', text], dict(no_worker, DIAGNOCHAIN_MODEL_BACKEND='sklearn')),
+        ('predict_api', [os.path.join(ROOT, 'server', 'predict_api.py'), text], {'DIAGNOCHAIN_NER': 'off'}),
+    ]
+
+
+def run(args, env, importtime=False):
+    """Returns (wall seconds, peak RSS in MB, stderr)."""
+    cmd = [sys.executable] + (['-X', 'importtime'] if importtime else []) + args
+    start = time.perf_counter()
+    proc = subprocess.Popen(cmd, cwd=AI_MODEL_DIR, env=dict(os.environ, **env),
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    err = proc.stderr.read()
+    _, _, usage = os.wait4(proc.pid, 0)
+    wall = time.perf_counter() - start
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    rss = usage.ru_maxrss / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+    return wall, round(rss, 1), err.decode('utf-8', 'replace')
+
+
+def forbidden_imports(module='inference'):
+    """FORBIDDEN_IMPORTS that end up in sys.modules after importing `module` in a fresh interpreter."""
+    code = (f"import sys, {module}; "
+            f"print(' '.join(m for m in {FORBIDDEN_IMPORTS!r} if m in sys.modules))")
+    out = subprocess.run([sys.executable, '-c', code], cwd=AI_MODEL_DIR, check=True,
+                         capture_output=True, text=True).stdout
+    return out.split()
+
+
+def slowest_imports(stderr, top):
+    """(cumulative ms, module) pairs from -X importtime output, largest first."""
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        imports.append((int(cumulative) / 1000, name.rstrip()))
+    imports.sort(reverse=True)
+    return imports[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=12, help="imports listed per target")
+    parser.add_argument('--text', default=SAMPLE_TEXT)
+    parser.add_argument('--json', help="also write results to this file")
+    args = parser.parse_args()
+
+    if not os.path.exists(os.path.join(AI_MODEL_DIR, 'diagnochain_model.pkl')):
+        sys.exit("Train the model first: python train_model.py in ai-model/")
+
+    leaked = forbidden_imports()
+    if leaked:
+        sys.exit(f"import inference also imported: {', '.join(leaked)}")
+
+    results = {}
+    for name, cmd, env in targets(args.text):
+        run(cmd, env)  # warm the page cache
+        walls, rss = [], 0.0
+        for _ in range(args.runs):
+            wall, child_rss, _ = run(cmd, env)
+            walls.append(wall)
+            rss = max(rss, child_rss)
+        _, _, stderr = run(cmd, env, importtime=True)
+        results[name] = {
+            'median_ms': round(statistics.median(walls) * 1000, 1),
+            'min_ms': round(min(walls) * 1000, 1),
+            'rss_mb': rss,
+            'slowest_imports': [{'module': module.strip(), 'cumulative_ms': round(ms, 1)}
+                                for ms, module in slowest_imports(stderr, args.top)],
+        }
+
+    print(f"{'target':<20} {'median':>10} {'min':>10} {'RSS':>10}")
+    for name, r in results.items():
+        print(f"{name:<20} {r['median_ms']:>7} ms {r['min_ms']:>7} ms {r['rss_mb']:>7} MB")
+    for name, r in results.items():
+        print(f"\n{name}: slowest imports (cumulative)")
+        for item in r['slowest_imports']:
+            print(f"  {item['cumulative_ms']:>9.1f} ms  {item['module']}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite: cold start, every predict stage, and the api_predict.py CLI
+Run from the repo root: python benchmarks/bench_suite.py [--texts 500] [--compare old.json]
+
+Stages (per text of the fixed corpus in corpus.py):
+- cold_start: new interpreter, import train_model + DiseasePredictor() (also
+  reported split into import / model load)
+- extract: extract_symptoms_robust
+- vectorize: one CSR input row
+- predict_proba: the loaded model (compiled arrays or pickle)
+- rules: the medical-logic adjustment
+- predict: DiseasePredictor.predict end to end, caches disabled
+- cli: `python api_predict.py <text>` as Node.js runs it (in-process model
+  unless --cli-worker, which talks to a running prediction_worker.py)
+
+Every stage reports n, mean and p50/p95/p99 in ms; RSS is the peak of this
+process (in-process stages) or of each child (cold_start, cli). Results go
+to benchmarks/results/<commit>.json unless --json says otherwise, so two
+commits can be compared with --compare.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+AI_MODEL_DIR = os.path.join(ROOT, 'ai-model')
+RESULTS_DIR = os.path.join(ROOT, 'benchmarks', 'results')
+sys.path.insert(0, AI_MODEL_DIR)
+
+# Measure the work, not the caches in front of it
+for _name in ('DIAGNOCHAIN_TEXT_CACHE_SIZE', 'DIAGNOCHAIN_RESULT_CACHE_SIZE', 'DIAGNOCHAIN_NER_CACHE_SIZE'):
+    os.environ.setdefault(_name, '0')
+
+import numpy as np
+
+from corpus import build_corpus
+
+COLD_START_SCRIPT = """
+import json, resource, sys, time
+start = time.perf_counter()
+from train_model import DiseasePredictor
+imported = time.perf_counter()
+DiseasePredictor(ner_mode=sys.argv[1])
+loaded = time.perf_counter()
+print(json.dumps({'import_s': imported - start, 'load_s': loaded - imported,
+                  'maxrss': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}))
+"""
+
+
+def maxrss_mb(value):
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    return round(value / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def summarize(seconds, rss_mb=None):
+    ms = np.asarray(seconds, dtype=np.float64) * 1000
+    summary = {
+        'n': int(ms.size),
+        'mean_ms': round(float(ms.mean()), 3) if ms.size else None,
+        'p50_ms': round(float(np.percentile(ms, 50)), 3) if ms.size else None,
+        'p95_ms': round(float(np.percentile(ms, 95)), 3) if ms.size else None,
+        'p99_ms': round(float(np.percentile(ms, 99)), 3) if ms.size else None,
+    }
+    if rss_mb is not None:
+        summary['rss_mb'] = rss_mb
+    return summary
+
+
+def run_child(args, env=None):
+    """Run a child process; returns (stdout, wall seconds, peak RSS in MB)."""
+    start = time.perf_counter()
+    proc = subprocess.Popen(args, cwd=AI_MODEL_DIR, env=env, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    out = proc.stdout.read()
+    _, status, usage = os.wait4(proc.pid, 0)
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    return out.decode('utf-8', 'replace'), time.perf_counter() - start, maxrss_mb(usage.ru_maxrss)
+
+
+def bench_cold_start(runs, ner_mode):
+    walls, imports, loads, rss = [], [], [], []
+    for _ in range(runs):
+        out, wall, child_rss = run_child([sys.executable, '-c', COLD_START_SCRIPT, ner_mode])
+        report = json.loads(out.strip().splitlines()[-1])
+        walls.append(wall)
+        imports.append(report['import_s'])
+        loads.append(report['load_s'])
+        rss.append(child_rss)
+    return {
+        'cold_start': summarize(walls, max(rss)),
+        'cold_start_import': summarize(imports),
+        'cold_start_load': summarize(loads),
+    }
+
+
+def bench_cli(texts, use_worker):
+    env = dict(os.environ, DIAGNOCHAIN_WORKER='1' if use_worker else '0')
+    walls, rss = [], []
+    for text in texts:
+        _, wall, child_rss = run_child([sys.executable, 'api_predict.py', text], env=env)
+        walls.append(wall)
+        rss.append(child_rss)
+    return {'cli': summarize(walls, max(rss))}
+
+
+def bench_stages(corpus, ner_mode):
+    import io
+    import contextlib
+    import resource
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        cwd = os.getcwd()
+        os.chdir(AI_MODEL_DIR)
+        try:
+            from train_model import DiseasePredictor
+            predictor = DiseasePredictor(ner_mode=ner_mode)
+        finally:
+            os.chdir(cwd)
+
+    timings = {name: [] for name in ('extract', 'vectorize', 'predict_proba', 'rules', 'predict')}
+    clock = time.perf_counter
+    with contextlib.redirect_stdout(io.StringIO()):
+        for text in corpus:
+            start = clock()
+            symptoms = predictor.extract_symptoms_robust(text)
+            timings['extract'].append(clock() - start)
+            if symptoms:
+                start = clock()
+                X = predictor.vectorize([symptoms])
+                timings['vectorize'].append(clock() - start)
+
+                start = clock()
+                probs = predictor.model.predict_proba(X)
+                timings['predict_proba'].append(clock() - start)
+
+                start = clock()
+                predictor.apply_medical_logic(X, np.array([len(set(symptoms))]), probs)
+                timings['rules'].append(clock() - start)
+
+            start = clock()
+            predictor.predict(text)
+            timings['predict'].append(clock() - start)
+
+    rss = maxrss_mb(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+    return {name: summarize(values, rss) for name, values in timings.items()}
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def compare(current, baseline_path):
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    print(f"\nvs {baseline_path} ({baseline['meta'].get('commit')})")
+    print(f"{'stage':<18} {'p50 before':>11} {'p50 now':>9} {'p95 before':>11} {'p95 now':>9} {'p95 change':>11}")
+    for stage, now in current['stages'].items():
+        before = baseline['stages'].get(stage)
+        if not before or not before.get('p95_ms') or now.get('p95_ms') is None:
+            continue
+        change = (now['p95_ms'] - before['p95_ms']) / before['p95_ms'] * 100
+        print(f"{stage:<18} {before['p50_ms']:>11} {now['p50_ms']:>9} {before['p95_ms']:>11} "
+              f"{now['p95_ms']:>9} {change:>+10.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--texts', type=int, default=500, help="corpus size for in-process stages")
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--ner', default='off', choices=['off', 'on', 'process'], help="NER mode to measure")
+    parser.add_argument('--cold-runs', type=int, default=3)
+    parser.add_argument('--cli-runs', type=int, default=5)
+    parser.add_argument('--cli-worker', action='store_true', help="let api_predict.py use a running worker")
+    parser.add_argument('--skip', default='', help="comma-separated: cold_start,stages,cli")
+    parser.add_argument('--json', help="result file (default benchmarks/results/<commit>.json)")
+    parser.add_argument('--compare', help="earlier result file to diff against")
+    args = parser.parse_args()
+
+    if not os.path.exists(os.path.join(AI_MODEL_DIR, 'diagnochain_model.pkl')):
+        sys.exit("Train the model first: python train_model.py in ai-model/")
+
+    skip = {s.strip() for s in args.skip.split(',') if s.strip()}
+    corpus = build_corpus(args.texts, args.seed)
+    os.environ['DIAGNOCHAIN_NER'] = args.ner
+
+    stages = {}
+    if 'cold_start' not in skip:
+        stages.update(bench_cold_start(args.cold_runs, args.ner))
+    if 'stages' not in skip:
+        stages.update(bench_stages(corpus, args.ner))
+    if 'cli' not in skip:
+        stages.update(bench_cli(corpus[:args.cli_runs], args.cli_worker))
+
+    commit = git_commit()
+    result = {
+        'meta': {
+            'commit': commit,
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'texts': len(corpus),
+            'seed': args.seed,
+            'ner': args.ner,
+            'model_backend': os.environ.get('DIAGNOCHAIN_MODEL_BACKEND', 'compiled'),
+        },
+        'stages': stages,
+    }
+
+    print(f"{'stage':<18} {'n':>5} {'mean':>9} {'p50':>9} {'p95':>9} {'p99':>9} {'RSS':>9}")
+    for stage, s in stages.items():
+        if not s['n']:
+            continue
+        rss = f"{s['rss_mb']} MB" if 'rss_mb' in s else ''
+        print(f"{stage:<18} {s['n']:>5} {s['mean_ms']:>9} {s['p50_ms']:>9} {s['p95_ms']:>9} {s['p99_ms']:>9} {rss:>9}")
+
+    path = args.json or os.path.join(RESULTS_DIR, f"{commit}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(result, f, indent=2)
+    print(f"\nResults written to {path}")
+
+    if args.compare:
+        compare(result, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Benchmark: prediction throughput of the preforked worker pool
+Run from the repo root: python benchmarks/bench_worker_pool.py [--workers 1,2,4,8] [--clients 16]
+
+For each pool size a `prediction_worker.py --workers N` is started (caches
+and NER off, so every request does the full dictionary + model work) and
+--clients spawned client processes, each on its own connection, send texts
+from the fixed corpus in corpus.py for --duration seconds.
+Reported per pool size: requests/second, p50/p95 latency and, on Linux,
+the summed RSS and PSS of the pool (PSS splits shared pages between the
+processes mapping them, so it shows what copy-on-write saves).
+"""
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import subprocess
+import multiprocessing
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+AI_MODEL_DIR = os.path.join(ROOT, 'ai-model')
+sys.path.insert(0, AI_MODEL_DIR)
+
+from corpus import build_corpus
+
+BASE_PORT = 8790
+STARTUP_TIMEOUT = 120
+
+
+def _percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q * (len(values) - 1))))]
+
+
+def _client(port, texts, duration, queue):
+    latencies, errors = [], 0
+    with socket.create_connection(('127.0.0.1', port)) as sock, sock.makefile('rb') as reader:
+        deadline = time.perf_counter() + duration
+        i = 0
+        while time.perf_counter() < deadline:
+            message = {"id": i, "op": "predict", "symptoms": texts[i % len(texts)]}
+            start = time.perf_counter()
+            sock.sendall((json.dumps(message) + "\n").encode('utf-8'))
+            line = reader.readline()
+            latencies.append(time.perf_counter() - start)
+            if not line:
+                errors += 1
+                break
+            i += 1
+    queue.put((latencies, errors))
+
+
+def wait_ready(port, proc):
+    from prediction_worker import request_worker
+    deadline = time.monotonic() + STARTUP_TIMEOUT
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"worker pool exited with {proc.returncode}")
+        try:
+            if request_worker({"op": "health"}, ('127.0.0.1', port), timeout=5):
+                return
+        except (OSError, ValueError):
+            pass
+        time.sleep(0.2)
+    raise RuntimeError("worker pool did not start")
+
+
+def pool_memory(pid):
+    """Summed (RSS, PSS) in MB of the pool parent and its children; Linux only."""
+    pids = [pid]
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            pids += [int(p) for p in f.read().split()]
+    except OSError:
+        return None, None
+    totals = {'Rss': 0, 'Pss': 0}
+    for p in pids:
+        try:
+            with open(f"/proc/{p}/smaps_rollup") as f:
+                for line in f:
+                    key, _, value = line.partition(':')
+                    if key in totals:
+                        totals[key] += int(value.split()[0])
+        except OSError:
+            continue
+    return round(totals['Rss'] / 1024, 1), round(totals['Pss'] / 1024, 1)
+
+
+def measure(workers, port, clients, duration, texts):
+    env = dict(os.environ, DIAGNOCHAIN_NER='off', DIAGNOCHAIN_TEXT_CACHE_SIZE='0',
+               DIAGNOCHAIN_RESULT_CACHE_SIZE='0', DIAGNOCHAIN_NER_CACHE_SIZE='0',
+               DIAGNOCHAIN_POOL_WATCH='0')
+    proc = subprocess.Popen(
+        [sys.executable, 'prediction_worker.py', '--workers', str(workers), '--port', str(port)],
+        cwd=AI_MODEL_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        wait_ready(port, proc)
+        ctx = multiprocessing.get_context('spawn')
+        queue = ctx.Queue()
+        procs = [ctx.Process(target=_client, args=(port, texts[i::clients] or texts, duration, queue))
+                 for i in range(clients)]
+        for p in procs:
+            p.start()
+        results = [queue.get() for _ in procs]
+        for p in procs:
+            p.join()
+        rss, pss = pool_memory(proc.pid)
+    finally:
+        proc.terminate()
+        proc.wait(timeout=60)
+
+    latencies = [latency for client_latencies, _ in results for latency in client_latencies]
+    return {
+        'workers': workers,
+        'requests': len(latencies),
+        'errors': sum(errors for _, errors in results),
+        'requests_per_s': round(len(latencies) / duration, 1),
+        'p50_ms': round(_percentile(latencies, 0.50) * 1000, 2) if latencies else None,
+        'p95_ms': round(_percentile(latencies, 0.95) * 1000, 2) if latencies else None,
+        'rss_mb': rss,
+        'pss_mb': pss,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--workers', default='1,2,4,8', help="comma-separated pool sizes")
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=10.0, help="seconds per pool size")
+    parser.add_argument('--texts', type=int, default=500)
+    parser.add_argument('--port', type=int, default=BASE_PORT)
+    parser.add_argument('--json', help="also write results to this file")
+    args = parser.parse_args()
+
+    if not os.path.exists(os.path.join(AI_MODEL_DIR, 'diagnochain_model.pkl')):
+        sys.exit("Train the model first: python train_model.py in ai-model/")
+
+    texts = build_corpus(args.texts)
+    results = []
+    print(f"{'workers':>7} {'req/s':>9} {'p50':>9} {'p95':>9} {'RSS':>10} {'PSS':>10} {'errors':>7}")
+    for i, workers in enumerate(int(w) for w in args.workers.split(',')):
+        # A fresh port per run, so a draining pool never answers the next one
+        r = measure(workers, args.port + i, args.clients, args.duration, texts)
+        results.append(r)
+        print(f"{r['workers']:>7} {r['requests_per_s']:>9} {r['p50_ms']:>6} ms {r['p95_ms']:>6} ms "
+              f"{r['rss_mb']!s:>7} MB {r['pss_mb']!s:>7} MB {r['errors']:>7}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
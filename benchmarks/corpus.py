@@ -0,0 +1,48 @@
+"""
+Fixed benchmark corpus shared by the scripts in this folder.
+
+Sentences combine symptoms from dataset.csv rows with English/Malay phrases
+from symptom_synonyms.csv, joined by filler words, with some typos. The
+same (n, seed) always yields the same texts, so runs on different commits
+score identical inputs.
+"""
+import os
+import sys
+import random
+
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+AI_MODEL_DIR = os.path.join(ROOT, 'ai-model')
+sys.path.insert(0, AI_MODEL_DIR)
+
+from symptom_vocab import load_synonyms
+
+SYMPTOM_MAP = load_synonyms()
+DEFAULT_SEED = 7
+FILLERS = ['i have', 'and', 'also', 'since yesterday', 'saya rasa', 'dan', 'very bad']
+
+
+def typo(word, rng):
+    if len(word) < 5:
+        return word
+    i = rng.randrange(1, len(word) - 1)
+    return word[:i] + word[i + 1:] if rng.random() < 0.5 else word[:i] + word[i] + word[i:]
+
+
+def build_corpus(n, seed=DEFAULT_SEED):
+    """Sentences from dataset.csv rows and SYMPTOM_MAP phrases, with some typos."""
+    rng = random.Random(seed)
+    raw = pd.read_csv(os.path.join(AI_MODEL_DIR, 'dataset.csv'), header=None).dropna(how='all')
+    rows = [[s.strip().replace('_', ' ') for s in row[1:] if isinstance(s, str) and s.strip()]
+            for row in raw.itertuples(index=False)]
+    phrases = list(SYMPTOM_MAP)
+
+    corpus = []
+    for _ in range(n):
+        row = rng.choice(rows)
+        parts = rng.sample(row, k=min(3, len(row))) if rng.random() < 0.6 else []
+        parts += rng.sample(phrases, k=rng.randint(1, 3))
+        words = ' '.join(p + ' ' + rng.choice(FILLERS) for p in parts).split()
+        corpus.append(' '.join(typo(w, rng) if rng.random() < 0.15 else w for w in words))
+    return corpus
@@ -1,16 +1,56 @@
 import sys
 import os
 import json
-import joblib
 import numpy as np
 import csv
+import threading
 
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 AI_MODEL_DIR = os.path.normpath(os.path.join(SCRIPT_DIR, '..', 'ai-model'))
 MODEL_PATH = os.path.join(AI_MODEL_DIR, 'diagnochain_model.pkl')
+COMPILED_MODEL_PATH = os.path.join(AI_MODEL_DIR, 'diagnochain_model.arrays')
 DESCRIPTION_CSV = os.path.join(AI_MODEL_DIR, 'symptom_Description.csv')
 PRECAUTION_CSV = os.path.join(AI_MODEL_DIR, 'symptom_precaution.csv')
 
+# Share the symptom vocabulary and extractor with train_model.py
+sys.path.insert(0, AI_MODEL_DIR)
+from symptom_index import get_extractor
+from compiled_model import MANIFEST_NAME, CompiledModel, is_current, model_backend
+from class_responses import ResponseTable, kb_name, top_k
+from metrics import METRICS, trace_enabled
+
+
+# Loaded artifacts, keyed by name -> (file signatures, value)
+_artifact_cache = {}
+_artifact_lock = threading.Lock()
+
+
+def _file_signature(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (path, st.st_mtime_ns, st.st_size)
+
+
+def cached_artifact(name, paths, loader):
+    """
+    Return loader() from the cache while none of the files in `paths`
+    changed on disk (same mtime and size); otherwise load again.
+    """
+    signature = tuple(_file_signature(p) for p in paths)
+    entry = _artifact_cache.get(name)
+    if entry is not None and entry[0] == signature:
+        return entry[1]
+
+    with _artifact_lock:
+        entry = _artifact_cache.get(name)
+        if entry is not None and entry[0] == signature:
+            return entry[1]
+        value = loader()
+        _artifact_cache[name] = (signature, value)
+        return value
+
 
 def ensure_model():
     if os.path.exists(MODEL_PATH):
@@ -28,26 +68,24 @@ def ensure_model():
         return os.path.exists(MODEL_PATH)
 
 
-def load_kb():
+def _read_kb():
     descriptions = {}
     precautions = {}
     try:
         with open(DESCRIPTION_CSV, encoding='utf-8') as f:
             reader = csv.reader(f)
-            next(reader, None)
             for row in reader:
                 if len(row) >= 2:
-                    descriptions[row[0].strip()] = row[1].strip()
+                    descriptions[kb_name(row[0])] = row[1].strip()
     except Exception:
         pass
 
     try:
         with open(PRECAUTION_CSV, encoding='utf-8') as f:
             reader = csv.reader(f)
-            next(reader, None)
             for row in reader:
                 if len(row) >= 2:
-                    disease = row[0].strip()
+                    disease = kb_name(row[0])
                     items = [c.strip() for c in row[1:5] if c.strip()]
                     precautions[disease] = items
     except Exception:
@@ -56,91 +94,122 @@ def load_kb():
     return descriptions, precautions
 
 
-def predict_from_model(symptoms_text):
-    if not ensure_model():
-        return {"error": "Model not available and training failed."}
-
-    package = joblib.load(MODEL_PATH)
-    model = package.get('model')
-    le = package.get('le')
-    cols = list(package.get('cols', []))
+def load_kb():
+    return cached_artifact('kb', [DESCRIPTION_CSV, PRECAUTION_CSV], _read_kb)
 
-    if model is None or le is None or not cols:
-        return {"error": "Saved model is invalid or incomplete."}
 
-    descriptions, precautions = load_kb()
-
-    import re
-    text = symptoms_text.lower()
-    words = set(re.findall(r"\w+", text))
-
-    synonyms = {
-        'rash': ['rash', 'skin_rash'],
-        'blister': ['blister', 'blisters', 'skin_rash'],
-        'itchy': ['itchy', 'skin_rash'],
-        'loss': ['loss_of_appetite', 'loss', 'appetite'],
-        'appetite': ['loss_of_appetite', 'appetite'],
-        'vomit': ['vomiting', 'nausea', 'vomit'],
-        'fever': ['fever', 'high_fever'],
-        'cough': ['cough'],
-        'headache': ['headache']
+def _read_model():
+    # Memory-mapped arrays are shared by every process on the host
+    model = None
+    if model_backend() == 'compiled' and is_current(COMPILED_MODEL_PATH, MODEL_PATH):
+        try:
+            model = CompiledModel.load(COMPILED_MODEL_PATH)
+            cols, classes = model.cols, model.classes_
+        except (OSError, ValueError):
+            model = None
+    if model is None:
+        import joblib
+        package = joblib.load(MODEL_PATH)
+        model = package.get('model')
+        cols = list(package.get('cols', []))
+        le = package.get('le')
+        classes = le.classes_ if le is not None else None
+    return {
+        'model': model,
+        'classes': classes,
+        'cols': cols,
+        'symptoms_dict': {symptom: idx for idx, symptom in enumerate(cols)}
     }
 
-    extracted_set = set()
 
-    for col in cols:
-        name = col.replace('_', ' ').lower()
-        col_words = set(name.split())
-        if col_words & words:
-            extracted_set.add(col)
-            continue
+def load_model():
+    manifest = os.path.join(COMPILED_MODEL_PATH, MANIFEST_NAME)
+    return cached_artifact('model', [MODEL_PATH, manifest], _read_model)
 
-    for w in words:
-        if w in synonyms:
-            for mapped in synonyms[w]:
-                for col in cols:
-                    if mapped.replace('_', ' ') in col.replace('_', ' '):
-                        extracted_set.add(col)
 
-    extracted = list(extracted_set)
+def load_responses(classes, descriptions, precautions):
+    """Per-class (name, description, precautions) table, rebuilt when the model or KB files change."""
+    manifest = os.path.join(COMPILED_MODEL_PATH, MANIFEST_NAME)
+    return cached_artifact(
+        'responses', [MODEL_PATH, manifest, DESCRIPTION_CSV, PRECAUTION_CSV],
+        lambda: ResponseTable(
+            classes, descriptions, precautions,
+            'No description available.', ['Consult a healthcare professional']
+        )
+    )
 
-    if not extracted:
-        return {"error": "No symptoms detected in input."}
 
-    symptoms_dict = {symptom: idx for idx, symptom in enumerate(cols)}
-    input_vec = np.zeros(len(cols))
-    for s in extracted:
-        if s in symptoms_dict:
-            input_vec[symptoms_dict[s]] = 1
+def predict_from_model(symptoms_text):
+    results = predict_batch_from_model([symptoms_text])
+    return results if isinstance(results, dict) else results[0]
 
-    probs = model.predict_proba([input_vec])[0]
-    top_idxs = np.argsort(probs)[-3:][::-1]
 
-    results = []
-    for idx in top_idxs:
-        try:
-            disease = le.inverse_transform([idx])[0]
-        except Exception:
-            disease = str(idx)
-        confidence = float(probs[idx] * 100)
-        if confidence <= 0.0:
-            continue
-        results.append({
-            'disease': disease,
-            'confidence': round(confidence, 2),
-            'description': descriptions.get(disease, 'No description available.'),
-            'precautions': precautions.get(disease, ['Consult a healthcare professional'])
-        })
-
-    while len(results) < 3:
-        results.append({
-            'disease': 'Unknown',
-            'confidence': 0.0,
-            'description': 'Unable to determine with given symptoms.',
-            'precautions': ['Consult a healthcare professional']
-        })
-
-    return results[:3]
+def predict_batch_from_model(texts):
+    """
+    Score many symptom texts with one predict_proba call.
+    Returns a list with one result list (or error dict) per text.
+    """
+    if not ensure_model():
+        return {"error": "Model not available and training failed."}
+
+    with METRICS.span('load_model'):
+        package = load_model()
+    model = package['model']
+    classes = package['classes']
+    cols = package['cols']
+
+    if model is None or classes is None or not cols:
+        return {"error": "Saved model is invalid or incomplete."}
+
+    with METRICS.span('load_kb'):
+        responses = load_responses(classes, *load_kb())
+
+    METRICS.incr('predictions', len(texts))
+    extractor = get_extractor(cols)
+    with METRICS.span('extract_dictionary'):
+        extracted = extractor.extract_batch(texts)
+    METRICS.incr('symptoms_extracted', sum(len(symptoms) for symptoms in extracted))
+    outputs = [{"error": "No symptoms detected in input."} for _ in texts]
+    rows = [i for i, symptoms in enumerate(extracted) if symptoms]
+    if not rows:
+        return outputs
+
+    with METRICS.span('vectorize'):
+        input_matrix = extractor.vectorize([extracted[i] for i in rows])
+
+    with METRICS.span('predict_proba'):
+        probs = model.predict_proba(input_matrix)
+    top_idxs = top_k(probs, 3)
+    top_confidences = np.take_along_axis(probs, top_idxs, axis=1) * 100
+
+    with METRICS.span('kb_lookup'):
+        _fill_outputs(outputs, rows, responses, top_idxs, top_confidences)
+    return outputs
+
+
+def _fill_outputs(outputs, rows, responses, top_idxs, top_confidences):
+    for row, i in enumerate(rows):
+        picked = top_confidences[row] > 0.0
+        results = [
+            {
+                'disease': disease,
+                'confidence': round(float(confidence), 2),
+                'description': description,
+                'precautions': precaution_list
+            }
+            for (disease, description, precaution_list), confidence
+            in zip(responses[top_idxs[row][picked]], top_confidences[row][picked])
+        ]
+
+        while len(results) < 3:
+            results.append({
+                'disease': 'Unknown',
+                'confidence': 0.0,
+                'description': 'Unable to determine with given symptoms.',
+                'precautions': ['Consult a healthcare professional']
+            })
+
+        outputs[i] = results[:3]
 
 
 if __name__ == '__main__':
@@ -150,3 +219,5 @@ if __name__ == '__main__':
     text = sys.argv[1]
     out = predict_from_model(text)
     print(json.dumps(out))
+    if METRICS.enabled and trace_enabled():
+        print(METRICS.trace_line(), file=sys.stderr)
@@ -138,6 +138,56 @@ const PREDICTION_CONTRACT_ABI = [
         ],
         "stateMutability": "view",
         "type": "function"
+    },
+    {
+        "inputs": [
+            { "internalType": "bytes32", "name": "_merkleRoot", "type": "bytes32" },
+            { "internalType": "uint256", "name": "_leafCount", "type": "uint256" }
+        ],
+        "name": "logPredictionBatch",
+        "outputs": [
+            { "internalType": "uint256", "name": "", "type": "uint256" }
+        ],
+        "stateMutability": "nonpayable",
+        "type": "function"
+    },
+    {
+        "inputs": [
+            { "internalType": "uint256", "name": "_batchId", "type": "uint256" },
+            { "internalType": "bytes32", "name": "_leaf", "type": "bytes32" },
+            { "internalType": "uint256", "name": "_index", "type": "uint256" },
+            { "internalType": "bytes32[]", "name": "_proof", "type": "bytes32[]" }
+        ],
+        "name": "verifyPrediction",
+        "outputs": [
+            { "internalType": "bool", "name": "", "type": "bool" }
+        ],
+        "stateMutability": "view",
+        "type": "function"
+    },
+    {
+        "inputs": [
+            { "internalType": "uint256", "name": "", "type": "uint256" }
+        ],
+        "name": "batches",
+        "outputs": [
+            { "internalType": "bytes32", "name": "merkleRoot", "type": "bytes32" },
+            { "internalType": "uint256", "name": "leafCount", "type": "uint256" },
+            { "internalType": "uint256", "name": "timestamp", "type": "uint256" },
+            { "internalType": "address", "name": "submitter", "type": "address" }
+        ],
+        "stateMutability": "view",
+        "type": "function"
+    },
+    {
+        "anonymous": false,
+        "inputs": [
+            { "indexed": true, "internalType": "uint256", "name": "batchId", "type": "uint256" },
+            { "indexed": false, "internalType": "bytes32", "name": "merkleRoot", "type": "bytes32" },
+            { "indexed": false, "internalType": "uint256", "name": "leafCount", "type": "uint256" }
+        ],
+        "name": "PredictionBatchLogged",
+        "type": "event"
     }
 ];
 
@@ -1109,6 +1159,99 @@ app.get('/api/cases/status/:status', async (req, res) => {
     }
 });
 
+// Batched proofs: with PROOF_SERVICE_URL set (prediction_service.py --proofs),
+// a diagnosis becomes a leaf of a Merkle tree whose root is logged once per
+// batch with logPredictionBatch, instead of one logPrediction tx per diagnosis
+const PROOF_SERVICE_URL = process.env.PROOF_SERVICE_URL;
+
+async function requestProofService(method, route, body) {
+    const response = await fetch(`${PROOF_SERVICE_URL}${route}`, {
+        method,
+        headers: { 'Content-Type': 'application/json' },
+        body: body ? JSON.stringify(body) : undefined
+    });
+    const data = await response.json();
+    if (!response.ok) {
+        throw new Error(data.error || `Proof service returned ${response.status}`);
+    }
+    return data;
+}
+
+async function storeBatchedProof(res, docRef, { symptoms, prediction, patientName, confidence }) {
+    console.log('\n🌳 Adding diagnosis to the next proof batch...');
+    const proof = await requestProofService('POST', '/proofs', {
+        id: docRef.id,
+        symptoms,
+        predictions: prediction,
+        wait: true
+    });
+
+    if (proof.status !== 'recorded') {
+        // The batch is not mined yet; GET /api/proof/:docId completes the record later
+        console.log('   ⏳ Batch still pending, leaf:', proof.leaf);
+        await docRef.update({
+            status: 'Proof Pending',
+            proofLeaf: proof.leaf,
+            updatedAt: new Date().toISOString()
+        });
+        return res.json({ status: 'Pending', docId: docRef.id, patientName, confidence });
+    }
+
+    console.log('   ✅ Included in batch', proof.batch_id, 'TxHash:', proof.tx_hash);
+    await docRef.update({
+        txHash: proof.tx_hash,
+        blockNumber: proof.block_number,
+        merkleRoot: proof.root,
+        proofBatchId: proof.batch_id,
+        proofLeaf: proof.leaf,
+        proofIndex: proof.index,
+        status: 'Proof Recorded',
+        updatedAt: new Date().toISOString()
+    });
+
+    const block = await provider.getBlock(proof.block_number);
+    return res.json({
+        status: 'Success',
+        txHash: proof.tx_hash,
+        timestamp: new Date(block.timestamp * 1000).toLocaleString('en-US'),
+        blockNumber: proof.block_number,
+        docId: docRef.id,
+        patientName,
+        confidence,
+        merkleRoot: proof.root,
+        batchId: proof.batch_id
+    });
+}
+
+// Inclusion proof of a batched diagnosis, checked against the root on chain
+app.get('/api/proof/:docId', async (req, res) => {
+    if (!PROOF_SERVICE_URL) {
+        return res.status(404).json({ error: 'Proof batching is not enabled.' });
+    }
+    try {
+        const proof = await requestProofService('GET', `/proofs/${encodeURIComponent(req.params.docId)}`);
+        if (proof.status !== 'recorded') {
+            return res.json({ status: 'Pending', proof });
+        }
+        const verified = await predictionContract.verifyPrediction(
+            proof.batch_id, proof.leaf, proof.index, proof.proof
+        );
+        await db.collection('diagnosis_records').doc(req.params.docId).update({
+            txHash: proof.tx_hash,
+            blockNumber: proof.block_number,
+            merkleRoot: proof.root,
+            proofBatchId: proof.batch_id,
+            proofIndex: proof.index,
+            status: 'Proof Recorded',
+            updatedAt: new Date().toISOString()
+        }).catch(err => console.log('   ⚠️ Could not update record:', err.message));
+        return res.json({ status: 'Success', verified, proof });
+    } catch (error) {
+        console.error('❌ Error fetching proof:', error);
+        return res.status(500).json({ status: 'Error', error: `Failed to fetch proof: ${error.message}` });
+    }
+});
+
 // U. Update store-proof endpoint to save more details for case review
 // REPLACE your existing /api/store-proof endpoint with this enhanced version
 app.post('/api/store-proof', async (req, res) => {
@@ -1214,6 +1357,10 @@ app.post('/api/store-proof', async (req, res) => {
         console.log('✅ Saved with ID:', docRef.id);
 
         // ===== STEP 5: BLOCKCHAIN TRANSACTION =====
+        if (PROOF_SERVICE_URL) {
+            return await storeBatchedProof(res, docRef, { symptoms, prediction, patientName, confidence });
+        }
+
         console.log('\n🔗 Creating blockchain transaction...');
         const symptomsHash = crypto.createHash('sha256').update(symptoms).digest('hex');
         console.log('   Symptoms hash:', symptomsHash.substring(0, 20) + '...');
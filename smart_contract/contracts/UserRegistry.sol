@@ -2,6 +2,13 @@
 pragma solidity ^0.8.0;
 
 contract UserRegistry {
+    // Deployer; may log prediction batches along with registered doctors
+    address public owner;
+
+    constructor() {
+        owner = msg.sender;
+    }
+
     // ============================================
     // USER REGISTRATION STORAGE
     // ============================================
@@ -50,6 +57,21 @@ contract UserRegistry {
         uint256 recordId, 
         string prediction
     );
+
+    // Merkle roots of prediction batches (see ai-model/proof_batcher.py):
+    // leaf = sha256(0x00 || record), node = sha256(0x01 || left || right),
+    // an odd node at the end of a level is promoted unchanged
+    struct PredictionBatch {
+        bytes32 merkleRoot;
+        uint256 leafCount;
+        uint256 timestamp;
+        address submitter;
+    }
+
+    mapping(uint256 => PredictionBatch) public batches;
+    uint256 public batchCount;
+
+    event PredictionBatchLogged(uint256 indexed batchId, bytes32 merkleRoot, uint256 leafCount);
     
     // ============================================
     // USER REGISTRATION FUNCTIONS - FIXED
@@ -148,4 +170,51 @@ contract UserRegistry {
         
         emit PredictionLogged(msg.sender, recordCount, _topPrediction);
     }
-}
\ No newline at end of file
+
+    function logPredictionBatch(bytes32 _merkleRoot, uint256 _leafCount) public returns (uint256) {
+        require(
+            msg.sender == owner || (
+                users[msg.sender].isActive &&
+                keccak256(bytes(users[msg.sender].role)) == keccak256(bytes("doctor"))
+            ),
+            "Only the owner or a registered doctor can log batches"
+        );
+        require(_leafCount > 0, "Empty batch");
+        batchCount++;
+        batches[batchCount] = PredictionBatch(_merkleRoot, _leafCount, block.timestamp, msg.sender);
+
+        emit PredictionBatchLogged(batchCount, _merkleRoot, _leafCount);
+        return batchCount;
+    }
+
+    // Check that _leaf is leaf _index of batch _batchId, given its sibling hashes from the leaf up
+    function verifyPrediction(
+        uint256 _batchId,
+        bytes32 _leaf,
+        uint256 _index,
+        bytes32[] memory _proof
+    ) public view returns (bool) {
+        PredictionBatch memory batch = batches[_batchId];
+        if (batch.leafCount == 0 || _index >= batch.leafCount) {
+            return false;
+        }
+
+        bytes32 node = _leaf;
+        uint256 n = batch.leafCount;
+        uint256 used = 0;
+        while (n > 1) {
+            if (_index % 2 == 1 || _index + 1 < n) {
+                if (used == _proof.length) {
+                    return false;
+                }
+                node = _index % 2 == 1
+                    ? sha256(abi.encodePacked(bytes1(0x01), _proof[used], node))
+                    : sha256(abi.encodePacked(bytes1(0x01), node, _proof[used]));
+                used++;
+            }
+            _index /= 2;
+            n = (n + 1) / 2;
+        }
+        return used == _proof.length && node == batch.merkleRoot;
+    }
+}
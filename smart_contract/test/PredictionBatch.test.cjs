@@ -0,0 +1,117 @@
+// test/PredictionBatch.test.cjs
+// verifyPrediction must accept exactly the proofs ai-model/proof_batcher.py hands out,
+// so the trees and proofs here come from its MerkleTree (python on PATH, or $PYTHON).
+const { expect } = require("chai");
+const { ethers } = require("hardhat");
+const { loadFixture } = require("@nomicfoundation/hardhat-toolbox/network-helpers");
+const { spawnSync } = require("child_process");
+const { createHash } = require("crypto");
+const path = require("path");
+
+const BATCH_SIZES = [1, 2, 3, 4, 5, 7, 8, 9, 16, 17, 33];
+
+const TREES_SCRIPT = `
+import json, sys
+from proof_batcher import MerkleTree, _hex, leaf_hash
+
+trees = []
+for n in map(int, sys.argv[1:]):
+    leaves = [leaf_hash(f"record-{i}", f"fever {i}", [{"disease": "Common Cold", "confidence": i}]) for i in range(n)]
+    tree = MerkleTree(leaves)
+    trees.append({
+        "root": _hex(tree.root),
+        "leaves": [_hex(leaf) for leaf in leaves],
+        "proofs": [[_hex(node) for node in tree.proof(i)] for i in range(n)],
+        "levels": [[_hex(node) for node in level] for level in tree.levels],
+    })
+print(json.dumps(trees))
+`;
+
+function merkleTrees(sizes) {
+  const result = spawnSync(process.env.PYTHON || "python", ["-c", TREES_SCRIPT, ...sizes.map(String)], {
+    cwd: path.resolve(__dirname, "../../ai-model"),
+    encoding: "utf8",
+  });
+  if (result.status !== 0) {
+    throw new Error(`proof_batcher.py trees failed: ${result.error || result.stderr}`);
+  }
+  return JSON.parse(result.stdout);
+}
+
+function sha256(hex) {
+  return "0x" + createHash("sha256").update(Buffer.from(hex.slice(2), "hex")).digest("hex");
+}
+
+describe("UserRegistry prediction batches", function () {
+  const trees = merkleTrees(BATCH_SIZES);
+
+  async function deployFixture() {
+    const [owner, doctor, patient, stranger] = await ethers.getSigners();
+    const UserRegistry = await ethers.getContractFactory("UserRegistry");
+    const registry = await UserRegistry.deploy();
+    await registry.waitForDeployment();
+
+    await registry.registerUser(doctor.address, "name", "nric", "doctor@example.com", "doctor");
+    await registry.registerUser(patient.address, "name", "nric", "patient@example.com", "patient");
+    return { registry, owner, doctor, patient, stranger };
+  }
+
+  async function logBatch(registry, signer, tree) {
+    await registry.connect(signer).logPredictionBatch(tree.root, tree.leaves.length);
+    return registry.batchCount();
+  }
+
+  it("accepts every proof from MerkleTree.proof", async function () {
+    const { registry, owner } = await loadFixture(deployFixture);
+
+    for (const tree of trees) {
+      const batchId = await logBatch(registry, owner, tree);
+      for (let i = 0; i < tree.leaves.length; i++) {
+        expect(await registry.verifyPrediction(batchId, tree.leaves[i], i, tree.proofs[i]),
+          `leaf ${i} of ${tree.leaves.length}`).to.equal(true);
+      }
+    }
+  });
+
+  it("rejects tampered leaves, indices and proofs", async function () {
+    const { registry, owner } = await loadFixture(deployFixture);
+    const tree = trees[BATCH_SIZES.indexOf(7)];
+    const batchId = await logBatch(registry, owner, tree);
+    const leaf = tree.leaves[4];
+    const proof = tree.proofs[4];
+
+    expect(await registry.verifyPrediction(batchId, leaf, 4, proof)).to.equal(true);
+    expect(await registry.verifyPrediction(batchId, sha256(leaf), 4, proof)).to.equal(false);
+    expect(await registry.verifyPrediction(batchId, leaf, 5, proof)).to.equal(false);
+    expect(await registry.verifyPrediction(batchId, leaf, 7, proof)).to.equal(false);
+    expect(await registry.verifyPrediction(batchId, leaf, 4, proof.slice(0, -1))).to.equal(false);
+    expect(await registry.verifyPrediction(batchId, leaf, 4, [...proof, tree.leaves[0]])).to.equal(false);
+    expect(await registry.verifyPrediction(batchId + 1n, leaf, 4, proof)).to.equal(false);
+  });
+
+  it("does not let an inner node pass for a leaf", async function () {
+    const { registry, owner } = await loadFixture(deployFixture);
+    const tree = trees[BATCH_SIZES.indexOf(4)];
+    const batchId = await logBatch(registry, owner, tree);
+    const [inner, sibling] = tree.levels[1];
+
+    for (let i = 0; i < 4; i++) {
+      expect(await registry.verifyPrediction(batchId, inner, i, [sibling])).to.equal(false);
+    }
+  });
+
+  it("only lets the owner or a registered doctor log batches", async function () {
+    const { registry, owner, doctor, patient, stranger } = await loadFixture(deployFixture);
+    const tree = trees[BATCH_SIZES.indexOf(3)];
+    const message = "Only the owner or a registered doctor can log batches";
+
+    await expect(registry.connect(stranger).logPredictionBatch(tree.root, 3)).to.be.revertedWith(message);
+    await expect(registry.connect(patient).logPredictionBatch(tree.root, 3)).to.be.revertedWith(message);
+    await expect(registry.connect(owner).logPredictionBatch(tree.root, 0)).to.be.revertedWith("Empty batch");
+
+    await expect(registry.connect(doctor).logPredictionBatch(tree.root, 3))
+      .to.emit(registry, "PredictionBatchLogged")
+      .withArgs(1, tree.root, 3);
+    expect(await registry.verifyPrediction(1, tree.leaves[2], 2, tree.proofs[2])).to.equal(true);
+  });
+});